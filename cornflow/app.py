@@ -8,9 +8,20 @@ from flask_restful import Api
 
 from .config import app_config
 from .endpoints import resources
+from .endpoints.execution import start_execution
+from .shared.airflow import init_airflow_client
+from .shared.authentication import init_identity_cache
 from .shared.compress import init_compress
+from .shared.const import NEXT_CURSOR_HEADER
+from .shared.events import init_state_hub
 from .shared.exceptions import _initialize_errorhandlers
+from .shared.executors import init_executors
+from .shared.permissions import init_permissions
+from .shared.scheduler import init_scheduler
+from .shared.schema_registry import init_schema_registry
+from .shared.storage import init_storage
 from .shared.utils import db, bcrypt
+from .shared.workers import init_worker_pool
 
 
 def create_app(env_name="development"):
@@ -23,7 +34,7 @@ def create_app(env_name="development"):
 
     app = Flask(__name__)
     app.config.from_object(app_config[env_name])
-    CORS(app)
+    CORS(app, expose_headers=[NEXT_CURSOR_HEADER])
     bcrypt.init_app(app)
     db.init_app(app)
     api = Api(app)
@@ -36,6 +47,15 @@ def create_app(env_name="development"):
 
     _initialize_errorhandlers(app)
     init_compress(app)
+    init_permissions(app)
+    init_identity_cache(app)
+    init_storage(app)
+    init_airflow_client(app)
+    init_schema_registry(app)
+    init_executors(app)
+    init_scheduler(app, start_execution)
+    init_worker_pool(app)
+    init_state_hub(app)
     return app
 
 
@@ -4,10 +4,14 @@ Initialization file for the commands module
 
 from .commands import (
     AccessInitialization,
+    BenchmarkValidation,
     RegisterBasePermissions,
     CreateAdminUser,
     CreateServiceUser,
+    CleanDataBlobs,
     CleanHistoricData,
+    CompressStoredData,
+    ReconcileExecutions,
     RegisterActions,
     RegisterRoles,
     RegisterViews,
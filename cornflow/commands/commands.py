@@ -2,12 +2,17 @@
 File with the different defined commands
 """
 # Import from libraries
+from cornflow_client import get_pulp_jsonschema
+from flask import current_app
 from flask_script import Command, Option
+import sqlalchemy as sa
+import time
 
 # Import from internal modules
 from cornflow.models import (
     ActionModel,
     ApiViewModel,
+    DataBlobModel,
     PermissionViewRoleModel,
     RoleModel,
     UserModel,
@@ -22,7 +27,13 @@ from cornflow.shared.const import (
     SERVICE_ROLE,
 )
 from cornflow.endpoints import resources
+from cornflow.endpoints.instance import revalidate_instances
+from cornflow.shared.permissions import bump_permissions_version
+from cornflow.shared.reconciler import reconcile_executions
+from cornflow.shared.scheduler import get_scheduler
+from cornflow.shared.storage import CompressedJSON, CompressedText, recompress_rows
 from cornflow.shared.utils import db
+from cornflow.shared.validators import build_schema_class, VALIDATION_ENGINES
 
 username_option = Option(
     "-u", "--username", dest="username", help="User username", type=str
@@ -154,6 +165,230 @@ class CleanHistoricData(Command):
         pass
 
 
+class CleanDataBlobs(Command):
+    def get_options(self):
+        return (verbose_option,)
+
+    def run(self, verbose=0):
+        """
+        Method to delete the data blobs that are not referenced by any instance, execution or case
+
+        :param int verbose: verbose of the command
+        :return: a boolean if the execution went right
+        :rtype: bool
+        """
+        deleted = DataBlobModel.delete_unreferenced()
+
+        if verbose == 1:
+            print("{} data blobs deleted".format(deleted))
+
+        return True
+
+
+class CompressStoredData(Command):
+    # (table, primary key, column, type) of the columns stored compressed
+    COLUMNS = [
+        ("data_blobs", "hash", "data", CompressedJSON()),
+        ("executions", "id", "log_text", CompressedText()),
+        ("executions", "id", "log_json", CompressedJSON()),
+        ("execution_progress", "id", "content", CompressedJSON()),
+        ("execution_log_chunks", "id", "content", CompressedText()),
+    ]
+
+    def get_options(self):
+        return (
+            Option(
+                "-a",
+                "--algorithm",
+                dest="algorithm",
+                help="Compression to use: none, gzip or zstd. By default, the configured one",
+                type=str,
+            ),
+            Option(
+                "-b",
+                "--batch-size",
+                dest="batch_size",
+                help="Number of rows rewritten in each transaction",
+                type=int,
+                default=100,
+            ),
+            verbose_option,
+        )
+
+    def run(self, algorithm=None, batch_size=100, verbose=0):
+        """
+        Method to rewrite the stored data (and the data stored before compressing it) with the given compression.
+        The rows are processed in batches and each batch is committed on its own,
+        so the command can be stopped and launched again at any time.
+
+        :param str algorithm: the compression to use, by default the configured one
+        :param int batch_size: the number of rows of each batch
+        :param int verbose: verbose of the command
+        :return: a boolean if the execution went right
+        :rtype: bool
+        """
+        if algorithm is None:
+            algorithm = current_app.config["STORAGE_COMPRESSION"]
+        min_size = current_app.config["STORAGE_COMPRESSION_MIN_SIZE"]
+
+        with db.engine.connect() as connection:
+            for table_name, key, column, column_type in self.COLUMNS:
+                table = sa.table(
+                    table_name, sa.column(key), sa.column(column, sa.LargeBinary)
+                )
+                read, rewritten = 0, 0
+                transaction = connection.begin()
+                for batch_read, batch_rewritten in recompress_rows(
+                    connection,
+                    table,
+                    key,
+                    column,
+                    column_type,
+                    algorithm,
+                    min_size,
+                    batch_size,
+                ):
+                    transaction.commit()
+                    transaction = connection.begin()
+                    read += batch_read
+                    rewritten += batch_rewritten
+                transaction.commit()
+
+                if verbose == 1:
+                    print(
+                        "{}.{}: {} rows read, {} rows rewritten".format(
+                            table_name, column, read, rewritten
+                        )
+                    )
+
+        return True
+
+
+class ReconcileExecutions(Command):
+    def get_options(self):
+        return (
+            Option(
+                "-i",
+                "--interval",
+                dest="interval",
+                help="Seconds between reconciliations. With 0, it is done only once",
+                type=float,
+                default=0,
+            ),
+            verbose_option,
+        )
+
+    def run(self, interval=0, verbose=0):
+        """
+        Method to update the state of the running executions with the state of their dag runs in airflow,
+        to validate again the instances whose asynchronous validation was lost
+        and to launch the pending executions that fit in the room left (if the scheduler is enabled).
+        It can be run periodically (by cron) or be kept running with an interval
+
+        :param float interval: seconds between reconciliations, 0 to do it only once
+        :param int verbose: verbose of the command
+        :return: a boolean if the execution went right
+        :rtype: bool
+        """
+        while True:
+            updated = reconcile_executions()
+            validated = revalidate_instances()
+            launched = get_scheduler().schedule()
+            if verbose == 1:
+                print("{} executions updated".format(updated))
+                print("{} instances validated".format(validated))
+                print("{} executions launched".format(launched))
+            if not interval:
+                return True
+            db.session.remove()
+            time.sleep(interval)
+
+
+class BenchmarkValidation(Command):
+    def get_options(self):
+        return (
+            Option(
+                "-n",
+                "--size",
+                dest="size",
+                help="Number of variables and constraints of the model validated",
+                type=int,
+                default=10000,
+            ),
+            Option(
+                "-r",
+                "--repeat",
+                dest="repeat",
+                help="Number of times the model is validated with each engine",
+                type=int,
+                default=3,
+            ),
+        )
+
+    @staticmethod
+    def build_model(size):
+        """
+        Builds a pulp model that fits the pulp schema
+
+        :param int size: the number of variables and constraints
+        :return: the model
+        :rtype: dict
+        """
+        names = ["x_{}".format(i) for i in range(size)]
+        variables = [
+            dict(name=name, lowBound=0, upBound=None, cat="Continuous", varValue=None)
+            for name in names
+        ]
+        constraints = [
+            dict(
+                name="c_{}".format(i),
+                sense=-1,
+                pi=None,
+                constant=-10,
+                coefficients=[
+                    dict(name=names[i], value=1),
+                    dict(name=names[i - 1], value=2),
+                ],
+            )
+            for i in range(size)
+        ]
+        objective = dict(
+            name="objective", coefficients=[dict(name=name, value=1) for name in names]
+        )
+        parameters = dict(name="benchmark", sense=1, status=0, sol_status=0)
+        return dict(
+            objective=objective,
+            constraints=constraints,
+            variables=variables,
+            parameters=parameters,
+            sos1=[],
+            sos2=[],
+        )
+
+    def run(self, size=10000, repeat=3):
+        """
+        Method to compare the time each validation engine takes to validate a pulp model
+
+        :param int size: the number of variables and constraints of the model
+        :param int repeat: the number of times the model is validated with each engine
+        :return: the best time (in seconds) of each engine
+        :rtype: dict
+        """
+        jsonschema = get_pulp_jsonschema()
+        data = self.build_model(size)
+        results = dict()
+        for engine in VALIDATION_ENGINES:
+            schema_class = build_schema_class(jsonschema, engine)
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                schema_class().load(data)
+                times.append(time.perf_counter() - start)
+            results[engine] = min(times)
+            print("{}: {:.3f} seconds".format(engine, results[engine]))
+        return results
+
+
 class RegisterActions(Command):
     def get_options(self):
         return (verbose_option,)
@@ -174,6 +409,7 @@ class RegisterActions(Command):
         ]
         db.session.bulk_save_objects(actions_list)
         db.session.commit()
+        bump_permissions_version()
 
         if verbose == 1:
             print("Actions successfully registered")
@@ -208,6 +444,7 @@ class RegisterViews(Command):
         ]
         db.session.bulk_save_objects(views_list)
         db.session.commit()
+        bump_permissions_version()
 
         if verbose == 1:
             print("Endpoints successfully registered")
@@ -240,6 +477,7 @@ class UpdateViews(Command):
         ]
         db.session.bulk_save_objects(views_list)
         db.session.commit()
+        bump_permissions_version()
 
         if verbose == 1:
             print("Views successfully updated")
@@ -268,6 +506,7 @@ class RegisterRoles(Command):
         ]
         db.session.bulk_save_objects(role_list)
         db.session.commit()
+        bump_permissions_version()
 
         if verbose == 1:
             print("Roles successfully registered")
@@ -326,6 +565,7 @@ class RegisterBasePermissions(Command):
 
         db.session.bulk_save_objects(assign_list)
         db.session.commit()
+        bump_permissions_version()
 
         if verbose == 1:
             print("Base permissions successfully registered")
@@ -10,6 +10,15 @@ class DefaultConfig(object):
     AIRFLOW_URL = os.getenv("AIRFLOW_URL")
     AIRFLOW_USER = os.getenv("AIRFLOW_USER")
     AIRFLOW_PWD = os.getenv("AIRFLOW_PWD")
+    # connections to airflow: timeouts (seconds), retries of the failed calls and size of the pool
+    AIRFLOW_CONNECT_TIMEOUT = float(os.getenv("AIRFLOW_CONNECT_TIMEOUT", 5))
+    AIRFLOW_TIMEOUT = float(os.getenv("AIRFLOW_TIMEOUT", 30))
+    AIRFLOW_RETRIES = int(os.getenv("AIRFLOW_RETRIES", 3))
+    AIRFLOW_RETRY_BACKOFF = float(os.getenv("AIRFLOW_RETRY_BACKOFF", 0.5))
+    AIRFLOW_POOL_SIZE = int(os.getenv("AIRFLOW_POOL_SIZE", 10))
+    # seconds the health of airflow and the information of the DAGs are kept
+    AIRFLOW_ALIVE_TTL = float(os.getenv("AIRFLOW_ALIVE_TTL", 10))
+    AIRFLOW_DAG_INFO_TTL = float(os.getenv("AIRFLOW_DAG_INFO_TTL", 60))
     AUTH_TYPE = int(os.getenv("AUTH_TYPE", AUTH_DB))
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
     SQLALCHEMY_TRACK_MODIFICATIONS = True
@@ -48,6 +57,83 @@ class DefaultConfig(object):
 
     # compress config
     COMPRESS_REGISTER = False
+    # maximum size (in bytes) of the compressed payloads of the data endpoints kept in memory
+    COMPRESS_PAYLOAD_CACHE_SIZE = int(
+        os.getenv("COMPRESS_PAYLOAD_CACHE_SIZE", 64 * 1024 * 1024)
+    )
+
+    # seconds between checks of the permissions version in the database
+    PERMISSION_CACHE_TTL = int(os.getenv("PERMISSION_CACHE_TTL", 10))
+
+    # cache of the users (and their roles) resolved from the tokens, checked against their version on every request
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", 30))
+    IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 1000))
+
+    # maximum size (in bytes) of the instances and cases uploaded, as sent and once decompressed
+    UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", 256 * 1024 * 1024))
+    UPLOAD_MAX_INFLATED_SIZE = int(
+        os.getenv("UPLOAD_MAX_INFLATED_SIZE", 1024 * 1024 * 1024)
+    )
+
+    # seconds after which the schemas of the DAGs are fetched again from airflow
+    SCHEMA_REGISTRY_TTL = int(os.getenv("SCHEMA_REGISTRY_TTL", 300))
+    # engine used to validate the data against the schemas: marshmallow or jsonschema.
+    # It can be chosen for each schema with pairs like: "pulp=jsonschema,timer=marshmallow"
+    DEFAULT_VALIDATION_ENGINE = os.getenv("DEFAULT_VALIDATION_ENGINE", "marshmallow")
+    VALIDATION_ENGINES = os.getenv("VALIDATION_ENGINES", "")
+
+    # number of threads of each worker that run the background tasks (like the asynchronous validations).
+    # Their CPU-heavy steps run in a pool of as many processes (or in the threads, with WORKER_POOL_PROCESSES=0):
+    # with the gevent workers of gunicorn the threads are greenlets, so a long validation would block the worker
+    WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", 4))
+    WORKER_POOL_PROCESSES = int(os.getenv("WORKER_POOL_PROCESSES", 1)) == 1
+    # seconds after which the instances still waiting to be validated are validated again by the reconciler
+    # (their task is lost if the worker stops, and it is not retried if airflow or the database fail)
+    VALIDATION_RETRY_AFTER = int(os.getenv("VALIDATION_RETRY_AFTER", 600))
+
+    # backend that runs the new executions: airflow or local.
+    # The local backend runs the solve function of each DAG, given with pairs like "solve_model_dag=module:function",
+    # in a pool of LOCAL_EXECUTOR_WORKERS processes (or threads of the worker, with LOCAL_EXECUTOR_PROCESSES=0).
+    # The threads cannot be used with the gevent workers of gunicorn: a solver would block the whole worker
+    EXECUTOR_BACKEND = os.getenv("EXECUTOR_BACKEND", "airflow")
+    LOCAL_EXECUTOR_FUNCTIONS = os.getenv("LOCAL_EXECUTOR_FUNCTIONS", "")
+    LOCAL_EXECUTOR_WORKERS = int(os.getenv("LOCAL_EXECUTOR_WORKERS", 2))
+    LOCAL_EXECUTOR_PROCESSES = int(os.getenv("LOCAL_EXECUTOR_PROCESSES", 1)) == 1
+    # seconds between the marks of the local executions in the queue of a worker as alive.
+    # The reconciler sets as failed the ones not marked for LOCAL_EXECUTOR_TIMEOUT seconds: their worker stopped
+    LOCAL_EXECUTOR_HEARTBEAT = int(os.getenv("LOCAL_EXECUTOR_HEARTBEAT", 60))
+    LOCAL_EXECUTOR_TIMEOUT = int(os.getenv("LOCAL_EXECUTOR_TIMEOUT", 600))
+
+    # scheduling of the new executions: with EXECUTION_SCHEDULER=1 they wait until there is room for them,
+    # with SCHEDULER_CAPACITY executions running at the same time, SCHEDULER_USER_QUOTA for each user
+    # and the quotas of some roles given with pairs like "3:20" (role id:quota)
+    EXECUTION_SCHEDULER = int(os.getenv("EXECUTION_SCHEDULER", 0)) == 1
+    SCHEDULER_CAPACITY = int(os.getenv("SCHEDULER_CAPACITY", 20))
+    SCHEDULER_USER_QUOTA = int(os.getenv("SCHEDULER_USER_QUOTA", 5))
+    SCHEDULER_ROLE_QUOTAS = os.getenv("SCHEDULER_ROLE_QUOTAS", "")
+
+    # maximum number of executions created with one call to the batch endpoint,
+    # and number of dag runs it creates at the same time
+    EXECUTION_BATCH_MAX_SIZE = int(os.getenv("EXECUTION_BATCH_MAX_SIZE", 1000))
+    EXECUTION_BATCH_CONCURRENCY = int(os.getenv("EXECUTION_BATCH_CONCURRENCY", 8))
+
+    # reuse of the solution of an execution for the new executions of the same data, configuration and DAG
+    # created less than EXECUTION_RESULT_CACHE_TTL seconds later. It can be skipped with ?cache=0
+    EXECUTION_RESULT_CACHE = int(os.getenv("EXECUTION_RESULT_CACHE", 0)) == 1
+    EXECUTION_RESULT_CACHE_TTL = int(os.getenv("EXECUTION_RESULT_CACHE_TTL", 86400))
+
+    # watching the state of the executions: seconds between reads of the database of each worker,
+    # and maximum seconds a long-poll request and an event stream are kept open
+    STATUS_POLL_INTERVAL = float(os.getenv("STATUS_POLL_INTERVAL", 2))
+    STATUS_WAIT_MAX = float(os.getenv("STATUS_WAIT_MAX", 60))
+    STATUS_STREAM_MAX = float(os.getenv("STATUS_STREAM_MAX", 3600))
+
+    # the status endpoints only read the database, when the reconcile_executions command keeps it up to date
+    STATUS_FROM_DB = int(os.getenv("STATUS_FROM_DB", 0)) == 1
+
+    # compression of the json and logs stored in the database: none, gzip or zstd
+    STORAGE_COMPRESSION = os.getenv("STORAGE_COMPRESSION", "gzip")
+    STORAGE_COMPRESSION_MIN_SIZE = int(os.getenv("STORAGE_COMPRESSION_MIN_SIZE", 1024))
 
 
 class Development(DefaultConfig):
@@ -15,14 +15,18 @@ from .case import (
     CaseToInstance,
     CaseCompare,
 )
-from .dag import DAGEndpoint, DAGEndpointManual
+from .dag import DAGEndpoint, DAGEndpointManual, DAGProgressEndpoint
 
 from .execution import (
     ExecutionEndpoint,
+    ExecutionBatchEndpoint,
     ExecutionDetailsEndpoint,
+    ExecutionQueueEndpoint,
     ExecutionStatusEndpoint,
+    ExecutionStatusListEndpoint,
     ExecutionDataEndpoint,
     ExecutionLogEndpoint,
+    ExecutionProgressEndpoint,
 )
 
 from .health import HealthEndpoint
@@ -72,6 +76,21 @@ resources = [
         urls="/execution/<string:idx>/status/",
         endpoint="execution-status",
     ),
+    dict(
+        resource=ExecutionStatusListEndpoint,
+        urls="/execution/status/",
+        endpoint="execution-status-list",
+    ),
+    dict(
+        resource=ExecutionBatchEndpoint,
+        urls="/execution/batch/",
+        endpoint="execution-batch",
+    ),
+    dict(
+        resource=ExecutionQueueEndpoint,
+        urls="/execution/queue/",
+        endpoint="execution-queue",
+    ),
     dict(
         resource=ExecutionDataEndpoint,
         urls="/execution/<string:idx>/data/",
@@ -82,8 +101,18 @@ resources = [
         urls="/execution/<string:idx>/log/",
         endpoint="execution-log",
     ),
+    dict(
+        resource=ExecutionProgressEndpoint,
+        urls="/execution/<string:idx>/progress/",
+        endpoint="execution-progress",
+    ),
     dict(resource=ExecutionEndpoint, urls="/execution/", endpoint="execution"),
     dict(resource=DAGEndpoint, urls="/dag/<string:idx>/", endpoint="dag"),
+    dict(
+        resource=DAGProgressEndpoint,
+        urls="/dag/<string:idx>/progress/",
+        endpoint="dag-progress",
+    ),
     dict(resource=DAGEndpointManual, urls="/dag/", endpoint="dag-manual"),
     dict(resource=UserEndpoint, urls="/user/", endpoint="user"),
     dict(
@@ -5,8 +5,8 @@ These endpoints have different access url, but manage the same data entities
 """
 
 # Import from libraries
-from cornflow_client.airflow.api import get_schema, validate_and_continue
-from flask import current_app
+from cornflow_client.airflow.api import validate_and_continue
+from flask import request
 from flask_apispec import marshal_with, use_kwargs, doc
 from flask_apispec.views import MethodResource
 from flask_inflate import inflate
@@ -29,10 +29,16 @@ from ..schemas.case import (
     CaseCompareResponse,
 )
 
-from ..schemas.model_json import DataSchema
 from ..shared.authentication import Auth
-from ..shared.compress import compressed
+from ..shared.compress import (
+    cache_response,
+    cached_compressed,
+    get_cached_response,
+)
+from ..shared.etag import with_etag
 from ..shared.exceptions import InvalidData, ObjectDoesNotExist
+from ..shared.schema_registry import get_schema, PULP_SCHEMA
+from ..shared.upload import inflate_upload
 
 
 class CaseEndpoint(MetaResource, MethodResource):
@@ -40,6 +46,12 @@ class CaseEndpoint(MetaResource, MethodResource):
     Endpoint used to create a new case or get all the cases and their related information
     """
 
+    def __init__(self):
+        super().__init__()
+        self.model = CaseModel
+        self.query = CaseModel.get_all_objects
+        self.primary_key = "id"
+
     @doc(description="Get all cases", tags=["Cases"])
     @Auth.auth_required
     @marshal_with(CaseListResponse(many=True))
@@ -53,13 +65,13 @@ class CaseEndpoint(MetaResource, MethodResource):
         :return: a dictionary with a tree structure of the cases and an integer with the HTTP status code
         :rtype: Tuple(dict, integer)
         """
-        response = CaseModel.get_all_objects(self.get_user(), **kwargs)
+        response = self.get_list(CaseListResponse, **kwargs)
         log.debug("User {} gets all cases".format(self.get_user_id()))
         return response
 
     @doc(description="Create a new case from raw data", tags=["Cases"])
     @Auth.auth_required
-    @inflate
+    @inflate_upload
     @marshal_with(CaseListResponse)
     @use_kwargs(CaseRawRequest, location="json")
     def post(self, **kwargs):
@@ -99,28 +111,32 @@ class CaseFromInstanceExecutionEndpoint(MetaResource, MethodResource):
             )
         user = self.get_user()
 
+        # the case references the same data blobs as the instance and the execution
         def get_instance_data(instance_id):
             instance = InstanceModel.get_one_object_from_user(user, instance_id)
             if instance is None:
                 raise ObjectDoesNotExist("Instance does not exist")
-            return dict(data=instance.data, schema=instance.schema)
+            return dict(data_hash=instance.data_hash, schema=instance.schema)
 
         def get_execution_data(execution_id):
             execution = ExecutionModel.get_one_object_from_user(user, execution_id)
             if execution is None:
                 raise ObjectDoesNotExist("Execution does not exist")
             data = get_instance_data(execution.instance_id)
-            data["solution"] = execution.data
+            data["solution_hash"] = execution.data_hash
             return data
 
         if instance_id is not None:
-            data = {**data, **get_instance_data(instance_id)}
-        elif execution_id is not None:
-            data = {**data, **get_execution_data(execution_id)}
+            blobs = get_instance_data(instance_id)
+        else:
+            blobs = get_execution_data(execution_id)
 
         data = dict(data)
+        data["schema"] = blobs.pop("schema")
         data["user_id"] = self.get_user_id()
         item = CaseModel.from_parent_id(user, data)
+        for key, value in blobs.items():
+            setattr(item, key, value)
         item.save()
         log.info(
             "User {} creates case {} from instance/execution".format(
@@ -143,11 +159,11 @@ class CaseCopyEndpoint(MetaResource, MethodResource):
         self.fields_to_copy = [
             "name",
             "description",
-            "data",
             "schema",
-            "solution",
             "path",
         ]
+        # the data and the solution are shared with the original case
+        self.blobs_to_copy = ["data_hash", "solution_hash"]
         self.fields_to_modify = ["name"]
 
     @doc(description="Copies a case to a new one", tags=["Cases"])
@@ -156,21 +172,21 @@ class CaseCopyEndpoint(MetaResource, MethodResource):
     def post(self, idx):
         """ """
         case = self.model.get_one_object_from_user(self.get_user(), idx)
-        data = case.__dict__
-        payload = dict()
-        for key in data.keys():
-            if key in self.fields_to_copy:
-                payload[key] = data[key]
-            if key in self.fields_to_modify:
-                payload[key] = "Copy_" + payload[key]
-
-        response = self.post_list(payload)
+        if case is None:
+            raise ObjectDoesNotExist()
+        payload = {key: getattr(case, key) for key in self.fields_to_copy}
+        for key in self.fields_to_modify:
+            payload[key] = "Copy_" + payload[key]
+        payload["user_id"] = self.get_user_id()
+
+        item = self.model(payload)
+        for key in self.blobs_to_copy:
+            setattr(item, key, getattr(case, key))
+        item.save()
         log.info(
-            "User {} copied case {} into {}".format(
-                self.get_user_id(), idx, response[0].id
-            )
+            "User {} copied case {} into {}".format(self.get_user_id(), idx, item.id)
         )
-        return response
+        return item, 201
 
 
 class CaseDetailsEndpoint(MetaResource, MethodResource):
@@ -190,7 +206,9 @@ class CaseDetailsEndpoint(MetaResource, MethodResource):
         :return: A dictionary with a message and an integer with the HTTP status code.
         :rtype: Tuple(dict, integer)
         """
-        response = CaseModel.get_one_object_from_user(self.get_user(), idx)
+        response = CaseModel.get_one_object_from_user(
+            self.get_user(), idx, response_schema=CaseListResponse
+        )
         log.debug("User {} gets case {}".format(self.get_user_id(), idx))
         return response
 
@@ -239,7 +257,8 @@ class CaseDataEndpoint(CaseDetailsEndpoint):
     @Auth.auth_required
     @marshal_with(CaseBase)
     @MetaResource.get_data_or_404
-    @compressed
+    @cached_compressed(CaseBase)
+    @with_etag
     def get(self, idx):
         """
         API method to get data for a case by the user and its related info.
@@ -311,11 +330,10 @@ class CaseToInstance(MetaResource, MethodResource):
             return self.post_list(payload)
 
         if schema == "pulp" or schema == "solve_model_dag":
-            validate_and_continue(DataSchema(), payload["data"])
+            validate_and_continue(get_schema(PULP_SCHEMA)(), payload["data"])
             return self.post_list(payload)
 
-        config = current_app.config
-        marshmallow_obj = get_schema(config, schema)
+        marshmallow_obj = get_schema(schema)
         validate_and_continue(marshmallow_obj(), payload["data"])
         response = self.post_list(payload)
         log.info(
@@ -344,7 +362,6 @@ class CaseCompare(MetaResource, MethodResource):
     @Auth.auth_required
     @marshal_with(CaseCompareResponse)
     @use_kwargs(QueryCaseCompare, location="query")
-    @compressed
     def get(self, idx1, idx2, **kwargs):
         """
         API method to generate the json patch of two cases given by the user
@@ -374,6 +391,17 @@ class CaseCompare(MetaResource, MethodResource):
 
         data = kwargs.get("data", True)
         solution = kwargs.get("solution", True)
+        # the patches only change when one of the cases changes
+        key = (
+            request.endpoint,
+            case_1.get_version(),
+            case_2.get_version(),
+            data,
+            solution,
+        )
+        response = get_cached_response(key)
+        if response is not None:
+            return response
         payload = dict()
 
         if data:
@@ -385,4 +413,4 @@ class CaseCompare(MetaResource, MethodResource):
         log.debug(
             "User {} compared cases {} and {}".format(self.get_user_id(), idx1, idx2)
         )
-        return payload, 200
+        return cache_response(key, CaseCompareResponse().dump(payload))
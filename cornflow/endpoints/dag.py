@@ -3,34 +3,45 @@ Internal endpoint for getting and posting execution data
 This are the endpoints used by airflow in its communication with cornflow
 """
 # Import from libraries
-from cornflow_client.airflow.api import get_schema, validate_and_continue
+from cornflow_client.airflow.api import validate_and_continue
 from cornflow_client.constants import SOLUTION_SCHEMA
-from flask import current_app
 from flask_apispec import use_kwargs, doc, marshal_with
 from flask_apispec.views import MethodResource
 import logging as log
+from sqlalchemy.exc import IntegrityError
 
 # Import from internal modules
 from .meta_resource import MetaResource
-from ..models import ExecutionModel, InstanceModel
+from ..models import (
+    ExecutionLogChunkModel,
+    ExecutionModel,
+    ExecutionProgressModel,
+    InstanceModel,
+)
 from ..schemas.execution import (
     ExecutionDagPostRequest,
+    ExecutionDagProgressRequest,
+    ExecutionDagProgressResponse,
     ExecutionDagRequest,
     ExecutionDetailsEndpointResponse,
     ExecutionSchema,
 )
 
-from ..schemas.model_json import DataSchema
 from ..shared.authentication import Auth
 from ..shared.const import (
     ADMIN_ROLE,
+    DAG_STATE_TRANSITIONS,
     EXEC_STATE_CORRECT,
     EXEC_STATE_MANUAL,
-    EXECUTION_STATE_MESSAGE_DICT,
     SERVICE_ROLE,
 )
 
-from ..shared.exceptions import ObjectDoesNotExist
+from ..shared.etag import get_etag, is_not_modified, not_modified_response, set_etag
+from ..shared.exceptions import InvalidStateTransition, ObjectDoesNotExist
+from ..shared.reconciler import ACTIVE_STATES
+from ..shared.scheduler import get_scheduler
+from ..shared.schema_registry import get_schema
+from ..shared.utils import db
 
 execution_schema = ExecutionSchema()
 
@@ -63,29 +74,37 @@ class DAGEndpoint(MetaResource, MethodResource):
         if data is None:
             # only check format if executions_results exist
             solution_schema = None
-        if solution_schema == "pulp":
-            validate_and_continue(DataSchema(), data)
-        elif solution_schema is not None:
-            config = current_app.config
-            marshmallow_obj = get_schema(config, solution_schema, SOLUTION_SCHEMA)
+        if solution_schema is not None:
+            marshmallow_obj = get_schema(solution_schema, SOLUTION_SCHEMA)
             validate_and_continue(marshmallow_obj(), data)
             # marshmallow_obj().fields['jobs'].nested().fields['successors']
         execution = ExecutionModel.get_one_object_from_user(self.get_user(), idx)
         if execution is None:
             raise ObjectDoesNotExist()
-        state = req_data.get("state", EXEC_STATE_CORRECT)
-        new_data = dict(
-            state=state,
-            state_message=EXECUTION_STATE_MESSAGE_DICT[state],
-            # because we do not want to store airflow's user:
-            user_id=execution.user_id,
-        )
+        state = req_data.pop("state", EXEC_STATE_CORRECT)
+        log_text = req_data.pop("log_text", None)
         # newly validated data from marshmallow
         if data is not None:
-            new_data["data"] = data
-        req_data.update(new_data)
-        execution.update(req_data)
-        execution.save()
+            req_data["data"] = data
+        for key, item in req_data.items():
+            setattr(execution, key, item)
+        # the whole log replaces the chunks sent while the execution was running
+        if log_text is not None:
+            execution.set_log(log_text)
+        # the results are stored along with the new state, only if the execution can change to it.
+        # The checks of the state made meanwhile do not matter: the transitions allowed already
+        # prevent overwriting a finished execution (but the ones set as failed by those checks)
+        if not execution.update_state(
+            state, versioned=False, transitions=DAG_STATE_TRANSITIONS
+        ):
+            raise InvalidStateTransition(
+                error="The execution cannot change from state {} to {}".format(
+                    execution.state, state
+                ),
+                payload=dict(message=execution.state_message, state=execution.state),
+            )
+        # the execution has ended, so there is room for the next one
+        get_scheduler().schedule()
         return {"message": "results successfully saved"}, 200
 
     @doc(description="Get input data and configuration for an execution", tags=["DAGs"])
@@ -101,7 +120,12 @@ class DAGEndpoint(MetaResource, MethodResource):
           and :class:`DataSchema` and an integer for HTTP status code
         :rtype: Tuple(dict, integer)
         """
-        execution = ExecutionModel.get_one_object_from_user(self.get_user(), idx)
+        execution = ExecutionModel.get_one_object_from_user(
+            self.get_user(),
+            idx,
+            response_schema=ExecutionDetailsEndpointResponse,
+            columns=ExecutionModel.VERSION_COLUMNS,
+        )
         if execution is None:
             raise ObjectDoesNotExist(error="The execution does not exist")
         instance = InstanceModel.get_one_object_from_user(
@@ -109,10 +133,80 @@ class DAGEndpoint(MetaResource, MethodResource):
         )
         if instance is None:
             raise ObjectDoesNotExist(error="The instance does not exist")
+        # the data of the instance is only loaded if the worker does not have it already
+        etag = get_etag(execution.get_version(), instance.get_version())
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        set_etag(etag)
         config = execution.config
         return {"data": instance.data, "config": config}, 200
 
 
+# times the partial results of an execution are tried to be stored
+APPEND_ATTEMPTS = 3
+
+
+class DAGProgressEndpoint(MetaResource, MethodResource):
+    """
+    Endpoint used by the workers to send the partial results of an execution while it runs
+    """
+
+    ROLES_WITH_ACCESS = [ADMIN_ROLE, SERVICE_ROLE]
+
+    @doc(description="Add partial results to an execution", tags=["DAGs"])
+    @Auth.auth_required
+    @marshal_with(ExecutionDagProgressResponse)
+    @use_kwargs(ExecutionDagProgressRequest, location="json")
+    def post(self, idx, **req_data):
+        """
+        API method to add partial results to a running execution: its best solution so far (that replaces
+        the previous one), rows of progress of the solver and a new chunk of its log.
+        This way, the final call to write the results only needs to set the state of the execution.
+        It requires authentication to be passed in the form of a token that has to be linked to
+        an existing session (login) made by the superuser created for the airflow webserver
+
+        :param str idx: ID of the execution
+        :return: A dictionary with a message and the positions of the last row of progress and of the last chunk
+          of the log, and an integer with the HTTP status code
+        :rtype: Tuple(dict, integer)
+        """
+        execution = ExecutionModel.get_one_object_from_user(self.get_user(), idx)
+        if execution is None:
+            raise ObjectDoesNotExist()
+        if execution.state not in ACTIVE_STATES:
+            raise InvalidStateTransition(
+                error="The execution is not running",
+                payload=dict(message=execution.state_message, state=execution.state),
+            )
+        solution = req_data.get("solution")
+        if solution is not None:
+            solution_schema = req_data.get("solution_schema") or execution.schema
+            marshmallow_obj = get_schema(solution_schema, SOLUTION_SCHEMA)
+            validate_and_continue(marshmallow_obj(), solution)
+        log_text = req_data.get("log_text")
+        for attempt in range(1, APPEND_ATTEMPTS + 1):
+            # the requests of an execution append their rows one at a time. Without row locks,
+            # a request that took the same positions as another one fails and is repeated
+            try:
+                ExecutionModel.lock(idx)
+                if solution is not None:
+                    execution.data = solution
+                progress = ExecutionProgressModel.append(
+                    idx, req_data.get("progress", [])
+                )
+                log = ExecutionLogChunkModel.append(
+                    idx, [log_text] if log_text else []
+                )
+                # everything is stored at once
+                execution.update(dict())
+                break
+            except IntegrityError:
+                db.session.rollback()
+                if attempt == APPEND_ATTEMPTS:
+                    raise
+        return dict(message="Results added", progress=progress, log=log), 201
+
+
 class DAGEndpointManual(MetaResource, MethodResource):
     """ """
 
@@ -131,14 +225,12 @@ class DAGEndpointManual(MetaResource, MethodResource):
         if data is None:
             # only check format if executions_results exist
             solution_schema = None
-        if solution_schema == "pulp":
-            validate_and_continue(DataSchema(), data)
-        elif solution_schema is not None:
-            config = current_app.config
-            marshmallow_obj = get_schema(config, solution_schema, SOLUTION_SCHEMA)
+        if solution_schema is not None:
+            marshmallow_obj = get_schema(solution_schema, SOLUTION_SCHEMA)
             validate_and_continue(marshmallow_obj(), data)
 
         kwargs_copy = dict(kwargs)
+        log_text = kwargs_copy.pop("log_text", None)
         # we force the state to manual
         kwargs_copy["state"] = EXEC_STATE_MANUAL
         kwargs_copy["user_id"] = self.get_user_id()
@@ -146,6 +238,9 @@ class DAGEndpointManual(MetaResource, MethodResource):
             kwargs_copy["data"] = data
         item = ExecutionModel(kwargs_copy)
         item.save()
+        if log_text is not None:
+            item.set_log(log_text)
+            item.update(dict())
         log.info(
             "User {} manually created the execution {}".format(
                 self.get_user_id(), item.id
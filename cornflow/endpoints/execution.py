@@ -5,27 +5,44 @@ These endpoints hve different access url, but manage the same data entities
 """
 
 # Import from libraries
-from cornflow_client.airflow.api import Airflow, get_schema, validate_and_continue
+from cornflow_client.airflow.api import validate_and_continue
 from cornflow_client.constants import INSTANCE_SCHEMA
-from flask import request, current_app
+from flask import current_app, request, stream_with_context
 from flask_apispec.views import MethodResource
 from flask_apispec import marshal_with, use_kwargs, doc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import datetime
 import logging as log
 
 # Import from internal modules
 from .meta_resource import MetaResource
-from ..models import InstanceModel, ExecutionModel
+from ..models import (
+    InstanceModel,
+    ExecutionModel,
+    ExecutionProgressModel,
+    ValidationResultModel,
+)
 from ..schemas.execution import (
     ExecutionSchema,
     ExecutionDetailsEndpointResponse,
     ExecutionDataEndpointResponse,
     ExecutionLogEndpointResponse,
+    QueryExecutionLog,
+    ExecutionProgressResponse,
     ExecutionStatusEndpointResponse,
+    QueryExecutionProgress,
+    QueryExecutionStatus,
+    QueryExecutionStatusWatch,
+    ExecutionBatchItemResponse,
+    ExecutionBatchRequest,
     ExecutionRequest,
     ExecutionEditRequest,
+    ExecutionQueueResponse,
     QueryFiltersExecution,
 )
 
+from ..shared.airflow import get_airflow_client
 from ..shared.authentication import Auth
 from ..shared.const import (
     EXEC_STATE_RUNNING,
@@ -36,10 +53,37 @@ from ..shared.const import (
     EXECUTION_STATE_MESSAGE_DICT,
     AIRFLOW_TO_STATE_MAP,
     EXEC_STATE_STOPPED,
+    EXEC_STATE_QUEUED,
+    EXEC_STATE_PENDING,
+    DEFAULT_EXECUTION_CODE,
+    INSTANCE_STATE_INVALID,
+    INSTANCE_STATE_QUEUED,
+    INSTANCE_STATE_VALID,
+    LOG_MIMETYPE,
+    EXECUTOR_AIRFLOW,
+    EXECUTOR_LOCAL,
 )
 
-from ..shared.exceptions import AirflowError, ObjectDoesNotExist
-from ..shared.compress import compressed
+from ..shared.etag import with_etag
+from ..shared.events import get_state_hub, stream_states, SSE_MIMETYPE
+from ..shared.executors import get_executor
+from ..shared.exceptions import (
+    AirflowError,
+    InvalidData,
+    InvalidStateTransition,
+    InvalidUsage,
+    ObjectDoesNotExist,
+)
+from ..shared.compress import cached_compressed, compressed
+from ..shared.reconciler import (
+    ACTIVE_STATES,
+    get_dag_run_states,
+    is_being_launched,
+    update_states,
+)
+from ..shared.scheduler import get_scheduler
+from ..shared.schema_registry import get_schema, get_schema_version
+from ..shared.utils import db
 
 
 # Initialize the schema that all endpoints are going to use
@@ -72,7 +116,7 @@ class ExecutionEndpoint(MetaResource, MethodResource):
           created by the authenticated user) and a integer with the HTTP status code
         :rtype: Tuple(dict, integer)
         """
-        return ExecutionModel.get_all_objects(self.get_user(), **kwargs)
+        return self.get_list(ExecutionDetailsEndpointResponse, **kwargs)
 
     @doc(description="Create an execution", tags=["Executions"])
     @Auth.auth_required
@@ -82,7 +126,9 @@ class ExecutionEndpoint(MetaResource, MethodResource):
         """
         API method to create a new execution linked to an already existing instance
         It requires authentication to be passed in the form of a token that has to be linked to
-        an existing session (login) made by a user
+        an existing session (login) made by a user.
+        If the result cache is enabled, the execution reuses the solution of a recent execution
+        of the same data, configuration and DAG, without going to airflow
 
         :return: A dictionary with a message (error if authentication failed, error if data is not validated or
           the reference_id for the newly created execution if successful) and a integer wit the HTTP status code
@@ -90,13 +136,6 @@ class ExecutionEndpoint(MetaResource, MethodResource):
         """
         # TODO: should validation should be done even if the execution is not going to be run?
         # TODO: should the schema field be cross valdiated with the instance schema field?
-        config = current_app.config
-        airflow_conf = dict(
-            url=config["AIRFLOW_URL"],
-            user=config["AIRFLOW_USER"],
-            pwd=config["AIRFLOW_PWD"],
-        )
-
         if "schema" not in kwargs:
             kwargs["schema"] = "solve_model_dag"
         execution, status_code = self.post_list(kwargs)
@@ -112,64 +151,386 @@ class ExecutionEndpoint(MetaResource, MethodResource):
             execution.update_state(EXEC_STATE_NOT_RUN)
             return execution, 201
 
-        # We now try to launch the task in airflow
-        af_client = Airflow(**airflow_conf)
-        if not af_client.is_alive():
-            err = "Airflow is not accessible"
-            log.error(err)
-            execution.update_state(EXEC_STATE_ERROR_START)
-            raise AirflowError(
-                error=err,
-                payload=dict(
-                    message=EXECUTION_STATE_MESSAGE_DICT[EXEC_STATE_ERROR_START],
-                    state=EXEC_STATE_ERROR_START,
-                ),
+        if instance.validation_state == INSTANCE_STATE_QUEUED:
+            # the execution is held until the instance is validated
+            execution.update_state(EXEC_STATE_QUEUED)
+            # if the validation finished meanwhile, it has not seen this execution
+            db.session.refresh(instance)
+            if instance.validation_state != INSTANCE_STATE_QUEUED:
+                run_queued_executions(instance)
+            log.info(
+                "User {} queues execution {}".format(self.get_user_id(), execution.id)
             )
-        # ask airflow if dag_name exists
-        schema = execution.schema
-        schema_info = af_client.get_dag_info(schema)
-
-        # Validate that instance and dag_name are compatible
-        marshmallow_obj = get_schema(config, schema, INSTANCE_SCHEMA)
-        validate_and_continue(marshmallow_obj(), instance.data)
+            return execution, 201
 
-        info = schema_info.json()
-        if info["is_paused"]:
-            err = "The dag exists but it is paused in airflow"
-            log.error(err)
+        if instance.validation_state == INSTANCE_STATE_INVALID:
             execution.update_state(EXEC_STATE_ERROR_START)
-            raise AirflowError(
-                error=err,
+            raise InvalidData(
+                error="The instance is not valid: {}".format(
+                    instance.validation_message
+                ),
                 payload=dict(
                     message=EXECUTION_STATE_MESSAGE_DICT[EXEC_STATE_ERROR_START],
                     state=EXEC_STATE_ERROR_START,
                 ),
             )
 
-        try:
-            response = af_client.run_dag(execution.id, dag_name=schema)
-        except AirflowError as err:
-            error = "Airflow responded with an error: {}".format(err)
-            log.error(error)
-            execution.update_state(EXEC_STATE_ERROR)
-            raise AirflowError(
-                error=error,
-                payload=dict(
-                    message=EXECUTION_STATE_MESSAGE_DICT[EXEC_STATE_ERROR],
-                    state=EXEC_STATE_ERROR,
-                ),
+        cached = find_cached_result(execution, instance)
+        if cached is not None:
+            execution.copy_result(cached)
+            log.info(
+                "User {} creates execution {} with the result of {}".format(
+                    self.get_user_id(), execution.id, cached.id
+                )
+            )
+            return execution, 201
+
+        scheduler = get_scheduler()
+        if scheduler.enabled:
+            # the execution waits for its turn
+            scheduler.enqueue([execution])
+            log.info(
+                "User {} submits execution {} to the scheduler".format(
+                    self.get_user_id(), execution.id
+                )
             )
+            return execution, 201
 
-        # if we succeed, we register the dag_run_id in the execution table:
-        af_data = response.json()
-        execution.dag_run_id = af_data["dag_run_id"]
-        execution.update_state(EXEC_STATE_RUNNING)
+        run_execution(execution, instance)
         log.info(
             "User {} creates execution {}".format(self.get_user_id(), execution.id)
         )
         return execution, 201
 
 
+def find_cached_result(execution, instance):
+    """
+    Looks for a recent execution that solved the same data with the same configuration and DAG,
+    if the result cache is enabled and the request does not skip it (with ?cache=0)
+
+    :param ExecutionModel execution: the new execution
+    :param InstanceModel instance: the instance it solves
+    :return: the execution whose result can be reused or None
+    :rtype: :class:`ExecutionModel`
+    """
+    config = current_app.config
+    if not config["EXECUTION_RESULT_CACHE"] or request.args.get("cache") == "0":
+        return None
+    since = datetime.datetime.utcnow() - datetime.timedelta(
+        seconds=config["EXECUTION_RESULT_CACHE_TTL"]
+    )
+    return ExecutionModel.get_cached_result(
+        execution.user_id,
+        instance.data_hash,
+        execution.config_hash,
+        execution.schema,
+        since,
+    )
+
+
+def run_execution(execution, instance):
+    """
+    Launches an execution with the configured backend (airflow or local),
+    once its instance has been validated against the schema of the DAG
+
+    :param ExecutionModel execution: the execution
+    :param InstanceModel instance: the instance it solves
+    :return: nothing
+    """
+    executor = get_executor()
+    executor.check(execution)
+    # Validate that instance and dag_name are compatible
+    validate_instance_for_dag(instance, execution.schema)
+    executor.launch(execution, instance)
+
+
+def validate_instance_for_dag(instance, dag_name):
+    """
+    Validates the data of an instance against the instance schema of a DAG.
+    The data that was already found valid against the same version of the schema is not validated again
+
+    :param InstanceModel instance: the instance
+    :param str dag_name: the name of the DAG
+    :return: nothing
+    """
+    marshmallow_obj = get_schema(dag_name, INSTANCE_SCHEMA)
+    schema_hash = get_schema_version(dag_name, INSTANCE_SCHEMA)
+    if ValidationResultModel.is_valid(instance.data_hash, dag_name, schema_hash):
+        return
+    validate_and_continue(marshmallow_obj(), instance.data)
+    ValidationResultModel.add_valid(instance.data_hash, dag_name, schema_hash)
+
+
+def start_execution(execution, instance):
+    """
+    Launches an execution that has already been claimed (marked as running) by whoever launches it.
+    If it cannot be launched, the error is kept in its state
+
+    :param ExecutionModel execution: the execution
+    :param InstanceModel instance: the instance it solves
+    :return: True if the execution started
+    :rtype: bool
+    """
+    if instance is None or instance.validation_state != INSTANCE_STATE_VALID:
+        execution.update_state(EXEC_STATE_ERROR_START)
+        return False
+    try:
+        run_execution(execution, instance)
+    except Exception as e:
+        log.error("Execution {} could not be started: {}".format(execution.id, e))
+        if execution.dag_run_id is None:
+            execution.update_state(EXEC_STATE_ERROR_START)
+        return False
+    return True
+
+
+def run_queued_executions(instance):
+    """
+    Launches the executions that were held while their instance was validated
+    (or hands them to the scheduler, if it is enabled),
+    or marks them as not started if the instance turned out to be invalid.
+    Each execution is claimed with a conditional update first, so it only gets launched once.
+
+    :param InstanceModel instance: the instance, already validated
+    :return: nothing
+    """
+    scheduler = get_scheduler()
+    state = EXEC_STATE_PENDING if scheduler.enabled else EXEC_STATE_RUNNING
+    executions = ExecutionModel.query.filter_by(
+        instance_id=instance.id, state=EXEC_STATE_QUEUED, deleted_at=None
+    ).all()
+    for execution in executions:
+        claimed = ExecutionModel.change_state(
+            execution.id, state, states=[EXEC_STATE_QUEUED]
+        )
+        db.session.commit()
+        if not claimed:
+            continue
+        if instance.validation_state != INSTANCE_STATE_VALID:
+            execution.update_state(EXEC_STATE_ERROR_START)
+        elif not scheduler.enabled:
+            start_execution(execution, instance)
+    scheduler.schedule()
+
+
+class ExecutionBatchEndpoint(MetaResource, MethodResource):
+    """
+    Endpoint used to create many executions at once (like the ones of a sweep of parameters)
+    """
+
+    @doc(description="Create many executions", tags=["Executions"])
+    @Auth.auth_required
+    @marshal_with(ExecutionBatchItemResponse(many=True))
+    @use_kwargs(ExecutionBatchRequest, location="json")
+    def post(self, executions):
+        """
+        API method to create many executions, of one or more instances, in one go.
+        It requires authentication to be passed in the form of a token that has to be linked to
+        an existing session (login) made by a user.
+        Each instance is validated once against each schema, all the executions are stored in one transaction
+        and their dag runs are created concurrently.
+
+        :param list executions: the executions to create, like the ones sent to create an execution
+        :return: A list with the result of each execution (its id and state, or the error found),
+          in the order they were sent, and an integer with the HTTP status code
+        :rtype: Tuple(list, integer)
+        """
+        config = current_app.config
+        if len(executions) > config["EXECUTION_BATCH_MAX_SIZE"]:
+            raise InvalidData(
+                error="At most {} executions can be created at once".format(
+                    config["EXECUTION_BATCH_MAX_SIZE"]
+                )
+            )
+        user = self.get_user()
+        instances = dict()
+        for item in executions:
+            if item["instance_id"] not in instances:
+                instances[item["instance_id"]] = InstanceModel.get_one_object_from_user(
+                    user, item["instance_id"]
+                )
+
+        # this allows testing without airflow interaction:
+        run = request.args.get("run", "1") != "0"
+        results = []
+        created = []
+        ids = set()
+        errors = dict()
+        for item in executions:
+            instance = instances[item["instance_id"]]
+            if instance is None:
+                results.append(
+                    dict(
+                        instance_id=item["instance_id"],
+                        error="The instance to solve does not exist",
+                    )
+                )
+                continue
+            data = dict(item, user_id=user.id)
+            data.setdefault("schema", "solve_model_dag")
+            if not run:
+                data["state"] = EXEC_STATE_NOT_RUN
+            elif instance.validation_state == INSTANCE_STATE_QUEUED:
+                data["state"] = EXEC_STATE_QUEUED
+            elif instance.validation_state == INSTANCE_STATE_INVALID:
+                data["state"] = EXEC_STATE_ERROR_START
+            execution = ExecutionModel(data)
+            while execution.id in ids:
+                # two executions of the same instance created in the same microsecond
+                execution.created_at += datetime.timedelta(microseconds=1)
+                execution.id = execution.generate_id()
+            ids.add(execution.id)
+            if execution.state == EXEC_STATE_ERROR_START:
+                errors[execution.id] = "The instance is not valid: {}".format(
+                    instance.validation_message
+                )
+            created.append(execution)
+            results.append(execution)
+        db.session.add_all(created)
+        db.session.commit()
+
+        if run:
+            launch = []
+            for execution in created:
+                if execution.state != DEFAULT_EXECUTION_CODE:
+                    continue
+                cached = find_cached_result(
+                    execution, instances[execution.instance_id]
+                )
+                if cached is None:
+                    launch.append(execution)
+                else:
+                    execution.copy_result(cached)
+            errors.update(
+                launch_executions(
+                    launch, instances, config["EXECUTION_BATCH_CONCURRENCY"]
+                )
+            )
+            for instance in instances.values():
+                if instance is None or instance.validation_state != INSTANCE_STATE_QUEUED:
+                    continue
+                # if the validation finished meanwhile, it has not seen these executions
+                db.session.refresh(instance)
+                if instance.validation_state != INSTANCE_STATE_QUEUED:
+                    run_queued_executions(instance)
+
+        log.info(
+            "User {} creates {} executions".format(self.get_user_id(), len(created))
+        )
+        return [
+            result
+            if isinstance(result, dict)
+            else dict(
+                id=result.id,
+                instance_id=result.instance_id,
+                state=result.state,
+                message=result.state_message,
+                error=errors.get(result.id),
+            )
+            for result in results
+        ], 201
+
+
+def launch_executions(executions, instances, max_workers):
+    """
+    Launches many executions in airflow. Airflow, each DAG and each instance (against the schema of the DAG)
+    are checked only once, and the dag runs are created by a few threads at the same time.
+    The states of all the executions are stored in a single transaction
+
+    :param list executions: the executions
+    :param dict instances: the instances they solve, by id
+    :param int max_workers: maximum number of dag runs created at the same time
+    :return: the errors of the executions that could not be launched, by id
+    :rtype: dict
+    """
+    errors = dict()
+    scheduler = get_scheduler()
+    if scheduler.enabled:
+        # the executions wait for their turn
+        scheduler.enqueue(executions)
+        return errors
+    if get_executor().name != EXECUTOR_AIRFLOW:
+        # the other backends just queue the executions
+        for execution in executions:
+            try:
+                run_execution(execution, instances[execution.instance_id])
+            except InvalidUsage as e:
+                errors[execution.id] = e.error
+        return errors
+
+    failed = dict()
+
+    def fail(execution, state, error):
+        failed[execution.id] = state
+        errors[execution.id] = error
+
+    af_client = get_airflow_client()
+    if executions and not af_client.is_alive():
+        log.error("Airflow is not accessible")
+        for execution in executions:
+            fail(execution, EXEC_STATE_ERROR_START, "Airflow is not accessible")
+
+    # the error of each DAG, and of each instance with each DAG (None if everything is fine)
+    checked = dict()
+    for execution in executions:
+        if execution.id in failed:
+            continue
+        schema = execution.schema
+        if schema not in checked:
+            try:
+                if af_client.get_dag_info(schema).json()["is_paused"]:
+                    checked[schema] = "The dag exists but it is paused in airflow"
+                else:
+                    checked[schema] = None
+            except InvalidUsage as e:
+                checked[schema] = getattr(e, "error", None) or str(e)
+        key = (execution.instance_id, schema)
+        if checked[schema] is None and key not in checked:
+            try:
+                validate_instance_for_dag(instances[execution.instance_id], schema)
+                checked[key] = None
+            except InvalidUsage as e:
+                checked[key] = getattr(e, "error", None) or str(e)
+        error = checked[schema] or checked[key]
+        if error is not None:
+            fail(execution, EXEC_STATE_ERROR_START, error)
+
+    launch = [execution for execution in executions if execution.id not in failed]
+    if launch:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(launch))) as pool:
+            futures = [
+                pool.submit(af_client.run_dag, execution.id, dag_name=execution.schema)
+                for execution in launch
+            ]
+        for execution, future in zip(launch, futures):
+            try:
+                execution.dag_run_id = future.result().json()["dag_run_id"]
+            except AirflowError as err:
+                error = "Airflow responded with an error: {}".format(err.error)
+                log.error(error)
+                fail(execution, EXEC_STATE_ERROR, error)
+            except Exception as err:
+                # the rest of the dag runs exist: their executions have to be stored
+                error = "Airflow responded with an unexpected answer: {}".format(
+                    repr(err)
+                )
+                log.error(error)
+                fail(execution, EXEC_STATE_ERROR, error)
+
+    if not executions:
+        return errors
+    for execution in executions:
+        if execution.id not in failed:
+            execution.executor = EXECUTOR_AIRFLOW
+    update_states(
+        {
+            execution.id: failed.get(execution.id, EXEC_STATE_RUNNING)
+            for execution in executions
+        }
+    )
+    return errors
+
+
 class ExecutionDetailsEndpointBase(MetaResource, MethodResource):
     """
     Endpoint used to get the information of a certain execution. But not the data!
@@ -199,7 +560,9 @@ class ExecutionDetailsEndpoint(ExecutionDetailsEndpointBase):
           the data of the execution) and an integer with the HTTP status code.
         :rtype: Tuple(dict, integer)
         """
-        return ExecutionModel.get_one_object_from_user(user=self.get_user(), idx=idx)
+        return ExecutionModel.get_one_object_from_user(
+            user=self.get_user(), idx=idx, response_schema=ExecutionDetailsEndpointResponse
+        )
 
     @doc(description="Edit an execution", tags=["Executions"], inherit=False)
     @Auth.auth_required
@@ -235,25 +598,22 @@ class ExecutionDetailsEndpoint(ExecutionDetailsEndpointBase):
     @doc(description="Stop an execution", tags=["Executions"], inherit=False)
     @Auth.auth_required
     def post(self, idx):
-        config = current_app.config
-        airflow_conf = dict(
-            url=config["AIRFLOW_URL"],
-            user=config["AIRFLOW_USER"],
-            pwd=config["AIRFLOW_PWD"],
-        )
         execution = ExecutionModel.get_one_object_from_user(
             user=self.get_user(), idx=idx
         )
         if execution is None:
             raise ObjectDoesNotExist()
-        af_client = Airflow(**airflow_conf)
-        if not af_client.is_alive():
-            raise AirflowError(error="Airflow is not accessible")
-        response = af_client.set_dag_run_to_fail(
-            dag_name=execution.schema, dag_run_id=execution.dag_run_id
-        )
+        if not execution.can_change_state(execution.state, EXEC_STATE_STOPPED):
+            raise InvalidStateTransition(
+                error="The execution has already finished",
+                payload=dict(message=execution.state_message, state=execution.state),
+            )
+        if execution.state not in [EXEC_STATE_QUEUED, EXEC_STATE_PENDING]:
+            # the executions that are waiting have not been launched yet
+            get_executor(execution.executor or EXECUTOR_AIRFLOW).cancel(execution)
         execution.update_state(EXEC_STATE_STOPPED)
         log.info("User {} stopped execution {}".format(self.get_user_id(), idx))
+        get_scheduler().schedule()
         return {"message": "The execution has been stopped"}, 200
 
 
@@ -265,30 +625,56 @@ class ExecutionStatusEndpoint(MetaResource, MethodResource):
     @doc(description="Get status of an execution", tags=["Executions"])
     @Auth.auth_required
     @marshal_with(ExecutionStatusEndpointResponse)
-    def get(self, idx):
+    @use_kwargs(QueryExecutionStatusWatch, location="query")
+    def get(self, idx, **kwargs):
         """
         API method to get the status of the execution created by the user
         It requires authentication to be passed in the form of a token that has to be linked to
         an existing session (login) made by a user.
+        The clients can also watch the execution instead of polling, without airflow being asked:
+        with ?wait=<seconds>&state=<known state> the answer waits until the state is different,
+        and with the header Accept: text/event-stream each change of state is sent as a server-sent event.
 
         :param str idx:  ID of the execution
         :return: A dictionary with a message (error if the execution does not exist or status of the execution)
             and an integer with the HTTP status code.
         :rtype: Tuple(dict, integer)
         """
-        airflow_conf = dict(
-            url=current_app.config["AIRFLOW_URL"],
-            user=current_app.config["AIRFLOW_USER"],
-            pwd=current_app.config["AIRFLOW_PWD"],
-        )
-
         execution = ExecutionModel.get_one_object_from_user(
-            user=self.get_user(), idx=idx
+            user=self.get_user(),
+            idx=idx,
+            response_schema=ExecutionStatusEndpointResponse,
+            columns=(
+                "dag_run_id",
+                "schema",
+                "executor",
+                "state_version",
+                "updated_at",
+            ),
         )
         if execution is None:
             raise ObjectDoesNotExist()
-        if execution.state not in [EXEC_STATE_RUNNING, EXEC_STATE_UNKNOWN]:
-            # we only care on asking airflow if the status is unknown or is running.
+        config = current_app.config
+        if request.accept_mimetypes.best == SSE_MIMETYPE:
+            return stream_states(execution, config["STATUS_STREAM_MAX"])
+        if "wait" in kwargs:
+            # long-poll: the changes are pushed by the hub of the worker
+            state = kwargs.get("state", execution.state)
+            if state == execution.state:
+                wait = min(kwargs["wait"], config["STATUS_WAIT_MAX"])
+                # the connection goes back to the pool while waiting,
+                # and the execution is read again afterwards
+                db.session.commit()
+                get_state_hub().wait(idx, state, wait)
+            return execution, 200
+        if (
+            config["STATUS_FROM_DB"]
+            or execution.state not in ACTIVE_STATES
+            or execution.executor == EXECUTOR_LOCAL
+        ):
+            # we only care on asking airflow if the status is unknown or is running,
+            # and only if the reconciler does not keep the states up to date.
+            # The local backend writes the state of its executions itself.
             return execution, 200
 
         def _raise_af_error(execution, error, state=EXEC_STATE_UNKNOWN):
@@ -298,6 +684,9 @@ class ExecutionStatusEndpoint(MetaResource, MethodResource):
 
         dag_run_id = execution.dag_run_id
         if not dag_run_id:
+            if is_being_launched(execution):
+                # the dag run is stored right after the execution is set as running
+                return execution, 200
             # it's safe to say we will never get anything if we did not store the dag_run_id
             _raise_af_error(
                 execution,
@@ -305,7 +694,7 @@ class ExecutionStatusEndpoint(MetaResource, MethodResource):
                 error="The execution has no dag_run associated",
             )
 
-        af_client = Airflow(**airflow_conf)
+        af_client = get_airflow_client()
         if not af_client.is_alive():
             _raise_af_error(execution, "Airflow is not accessible")
 
@@ -321,10 +710,109 @@ class ExecutionStatusEndpoint(MetaResource, MethodResource):
 
         data = response.json()
         state = AIRFLOW_TO_STATE_MAP.get(data["state"], EXEC_STATE_UNKNOWN)
-        execution.update_state(state)
+        # the checks of a running execution do not write anything
+        if state != execution.state:
+            execution.update_state(state)
         return execution, 200
 
 
+class ExecutionStatusListEndpoint(MetaResource, MethodResource):
+    """
+    Endpoint used to get the status of many executions at once
+    """
+
+    @doc(description="Get status of many executions", tags=["Executions"])
+    @Auth.auth_required
+    @marshal_with(ExecutionStatusEndpointResponse(many=True))
+    @use_kwargs(QueryExecutionStatus, location="query")
+    def get(self, **kwargs):
+        """
+        API method to get the status of the executions created by the user:
+        the ones given in the id parameter (it can be repeated) or else all the running ones.
+        It requires authentication to be passed in the form of a token that has to be linked to
+        an existing session (login) made by a user.
+
+        :return: A list with the status of the executions and an integer with the HTTP status code.
+        :rtype: Tuple(list, integer)
+        """
+        executions = ExecutionModel.get_status_from_user(
+            self.get_user(),
+            ids=kwargs.get("id"),
+            response_schema=ExecutionStatusEndpointResponse,
+            columns=("dag_run_id", "schema", "created_at", "updated_at", "executor"),
+        )
+        if not current_app.config["STATUS_FROM_DB"]:
+            refresh_execution_states(executions)
+        return executions, 200
+
+
+class ExecutionQueueEndpoint(MetaResource, MethodResource):
+    """
+    Endpoint used to see the queue of the executions waiting for the scheduler
+    """
+
+    @doc(description="Get the queue of the executions", tags=["Executions"])
+    @Auth.auth_required
+    @marshal_with(ExecutionQueueResponse(many=True))
+    def get(self):
+        """
+        API method to get how many executions are waiting and running, and how long they have been waiting.
+        The admin users get the queue of every user, the rest of the users get their own.
+        It requires authentication to be passed in the form of a token that has to be linked to
+        an existing session (login) made by a user.
+
+        :return: A list with the queue of each user and an integer with the HTTP status code.
+        :rtype: Tuple(list, integer)
+        """
+        user_id = None if self.is_admin() else self.get_user_id()
+        return get_scheduler().get_queue(user_id), 200
+
+
+def refresh_execution_states(executions):
+    """
+    Asks airflow the state of the executions that are running, with one listing of dag runs per DAG,
+    and stores the changes with a single UPDATE
+
+    :param list executions: the executions
+    :return: nothing
+    """
+    changed = dict()
+
+    def set_state(execution, state):
+        if execution.state != state:
+            changed[execution.id] = state
+
+    by_dag = defaultdict(list)
+    for execution in executions:
+        if execution.state not in ACTIVE_STATES:
+            continue
+        if execution.executor == EXECUTOR_LOCAL:
+            # the local backend writes the state of its executions itself
+            continue
+        if not execution.dag_run_id:
+            # it's safe to say we will never get anything if we did not store the dag_run_id,
+            # unless the execution is still being launched
+            if not is_being_launched(execution):
+                set_state(execution, EXEC_STATE_ERROR)
+            continue
+        by_dag[execution.schema].append(execution)
+
+    af_client = get_airflow_client()
+    alive = len(by_dag) > 0 and af_client.is_alive()
+    for dag_name, dag_executions in by_dag.items():
+        states = dict()
+        if alive:
+            try:
+                states = get_dag_run_states(af_client, dag_name, dag_executions)
+            except AirflowError as err:
+                log.error("Airflow responded with an error: {}".format(err))
+        for execution in dag_executions:
+            set_state(execution, states.get(execution.id, EXEC_STATE_UNKNOWN))
+
+    if changed:
+        update_states(changed)
+
+
 class ExecutionDataEndpoint(ExecutionDetailsEndpointBase):
     """
     Endpoint used to get the solution of a certain execution.
@@ -338,7 +826,8 @@ class ExecutionDataEndpoint(ExecutionDetailsEndpointBase):
     @Auth.auth_required
     @marshal_with(ExecutionDataEndpointResponse)
     @MetaResource.get_data_or_404
-    @compressed
+    @cached_compressed(ExecutionDataEndpointResponse)
+    @with_etag
     def get(self, idx):
         """
 
@@ -347,7 +836,12 @@ class ExecutionDataEndpoint(ExecutionDetailsEndpointBase):
           the data of the execution) and an integer with the HTTP status code.
         :rtype: Tuple(dict, integer)
         """
-        return ExecutionModel.get_one_object_from_user(user=self.get_user(), idx=idx)
+        return ExecutionModel.get_one_object_from_user(
+            user=self.get_user(),
+            idx=idx,
+            response_schema=ExecutionDataEndpointResponse,
+            columns=ExecutionModel.VERSION_COLUMNS,
+        )
 
 
 class ExecutionLogEndpoint(ExecutionDetailsEndpointBase):
@@ -358,14 +852,86 @@ class ExecutionLogEndpoint(ExecutionDetailsEndpointBase):
     @doc(description="Get log of an execution", tags=["Executions"], inherit=False)
     @Auth.auth_required
     @marshal_with(ExecutionLogEndpointResponse)
+    @use_kwargs(QueryExecutionLog, location="query")
     @MetaResource.get_data_or_404
     @compressed
-    def get(self, idx):
+    def get(self, idx, offset=None, length=None, tail=None):
         """
+        API method to get the log of an execution.
+        The log is stored in chunks, so a part of it can be read without loading the whole log:
+        a range of characters (?offset= and ?length=) or the last lines (?tail=).
+        The clients that accept text/plain get the log (from ?offset=) streamed as text.
+        It requires authentication to be passed in the form of a token that has to be linked to
+        an existing session (login) made by a user.
 
         :param str idx: ID of the execution.
+        :param int offset: the offset of the first character of the log to get
+        :param int length: the maximum number of characters of the log to get
+        :param int tail: the number of lines to get from the end of the log
         :return: A dictionary with a message (error if authentication failed, or the execution does not exist or
-          the data of the execution) and an integer with the HTTP status code.
+          the data of the execution, with the size of the log and the part of it asked for)
+          and an integer with the HTTP status code.
         :rtype: Tuple(dict, integer)
         """
-        return ExecutionModel.get_one_object_from_user(user=self.get_user(), idx=idx)
+        execution = ExecutionModel.get_one_object_from_user(
+            user=self.get_user(), idx=idx, response_schema=ExecutionLogEndpointResponse
+        )
+        if execution is None:
+            return None
+        if request.accept_mimetypes.best == LOG_MIMETYPE:
+            return stream_log(execution, offset or 0)
+        execution.log_size = execution.get_log_size()
+        if tail is not None:
+            execution.log_offset, execution.log_part = execution.get_log_tail(tail)
+        elif offset is not None or length is not None:
+            execution.log_offset = offset or 0
+            execution.log_part = execution.get_log(execution.log_offset, length)
+        return execution
+
+
+def stream_log(execution, offset=0):
+    """
+    Builds a response with the log of an execution, read chunk by chunk while it is sent
+
+    :param ExecutionModel execution: the execution
+    :param int offset: the offset of the first character
+    :return: the streamed response
+    :rtype: :class:`Response`
+    """
+    response = current_app.response_class(
+        stream_with_context(execution.iterate_log(offset)), mimetype=LOG_MIMETYPE
+    )
+    response.headers["Content-Disposition"] = "attachment; filename={}.log".format(
+        execution.id
+    )
+    return response
+
+
+class ExecutionProgressEndpoint(ExecutionDetailsEndpointBase):
+    """
+    Endpoint used to follow the progress of the solver of a certain execution.
+    """
+
+    @doc(description="Get progress of an execution", tags=["Executions"], inherit=False)
+    @Auth.auth_required
+    @marshal_with(ExecutionProgressResponse(many=True))
+    @use_kwargs(QueryExecutionProgress, location="query")
+    def get(self, idx, after=0, limit=None):
+        """
+        API method to get the rows of progress sent by the solver of an execution.
+        The clients that follow an execution only ask for the rows after the last one they have (?after=)
+        It requires authentication to be passed in the form of a token that has to be linked to
+        an existing session (login) made by a user.
+
+        :param str idx: ID of the execution.
+        :param int after: the position of the last row already known
+        :param int limit: maximum number of rows
+        :return: A list with the rows of progress, in order, and an integer with the HTTP status code.
+        :rtype: Tuple(list, integer)
+        """
+        execution = ExecutionModel.get_one_object_from_user(
+            user=self.get_user(), idx=idx
+        )
+        if execution is None:
+            raise ObjectDoesNotExist()
+        return ExecutionProgressModel.get_after(idx, after, limit), 200
@@ -3,14 +3,13 @@
 """
 
 # Import from libraries
-from cornflow_client.airflow.api import Airflow
-from flask import current_app
 from flask_apispec.views import MethodResource
 from flask_apispec import marshal_with, doc
 
 # Import from internal modules
 from .meta_resource import MetaResource
 from ..schemas.health import HealthResponse
+from ..shared.airflow import get_airflow_client
 from ..shared.const import STATUS_HEALTHY, STATUS_UNHEALTHY
 from ..shared.utils import db
 
@@ -19,13 +18,7 @@ class HealthEndpoint(MetaResource, MethodResource):
     @doc(description="Health check", tags=["Health"])
     @marshal_with(HealthResponse)
     def get(self):
-        config = current_app.config
-        airflow_conf = dict(
-            url=config["AIRFLOW_URL"],
-            user=config["AIRFLOW_USER"],
-            pwd=config["AIRFLOW_PWD"],
-        )
-        af_client = Airflow(**airflow_conf)
+        af_client = get_airflow_client()
         airflow_status = STATUS_HEALTHY
         cornflow_status = STATUS_HEALTHY
         if not af_client.is_alive():
@@ -4,11 +4,11 @@ or get only one.
 These endpoints have different access url, but manage the same data entities
 """
 # Import from libraries
-from cornflow_client.airflow.api import get_schema, validate_and_continue
-from flask import request, current_app
+from cornflow_client.airflow.api import validate_and_continue
+import datetime
+from flask import current_app, request
 from flask_apispec import marshal_with, use_kwargs, doc
 from flask_apispec.views import MethodResource
-from flask_inflate import inflate
 from marshmallow.exceptions import ValidationError
 import os
 import pulp
@@ -16,6 +16,7 @@ from werkzeug.utils import secure_filename
 import logging as log
 
 # Import from internal modules
+from .execution import run_queued_executions
 from .meta_resource import MetaResource
 from ..models import InstanceModel
 from ..schemas.instance import (
@@ -27,12 +28,24 @@ from ..schemas.instance import (
     InstanceEditRequest,
     InstanceFileRequest,
     QueryFiltersInstance,
+    QueryInstanceValidation,
 )
 
-from ..schemas.model_json import DataSchema
 from ..shared.authentication import Auth
-from ..shared.compress import compressed
+from ..shared.compress import cached_compressed
+from ..shared.const import (
+    INSTANCE_STATE_INVALID,
+    INSTANCE_STATE_QUEUED,
+    INSTANCE_STATE_VALID,
+    VALIDATION_MODE_ASYNC,
+)
+from ..shared.etag import with_etag
 from ..shared.exceptions import InvalidUsage
+from ..shared.schema_registry import get_schema, get_schema_source, PULP_SCHEMA
+from ..shared.upload import inflate_upload
+from ..shared.utils import db
+from ..shared.validators import validate_data
+from ..shared.workers import run_in_process, submit_task
 
 
 # Initialize the schema that all endpoints are going to use
@@ -63,18 +76,21 @@ class InstanceEndpoint(MetaResource, MethodResource):
         :return: a list of objects with the data and an integer with the HTTP status code
         :rtype: Tuple(dict, integer)
         """
-        return self.model.get_all_objects(self.get_user(), **kwargs)
+        return self.get_list(InstanceEndpointResponse, **kwargs)
 
     @doc(description="Create an instance", tags=["Instances"])
     @Auth.auth_required
-    @inflate
+    @inflate_upload
     @marshal_with(InstanceDetailsEndpointResponse)
     @use_kwargs(InstanceRequest, location="json")
-    def post(self, **kwargs):
+    @use_kwargs(QueryInstanceValidation, location="query")
+    def post(self, validation_mode=None, **kwargs):
         """
         API (POST) method to create a new instance
         It requires authentication to be passed in the form of a token that has to be linked to
-        an existing session (login) made by a user
+        an existing session (login) made by a user.
+        With ?validate=async the instance is stored before being validated, and it is validated in the background.
+        Its validation_state tells when it is done, the executions created meanwhile wait for it.
 
         :return: an object with the data for the created instance and an integer with the HTTP status code
         :rtype: Tuple(dict, integer)
@@ -85,15 +101,19 @@ class InstanceEndpoint(MetaResource, MethodResource):
             # no schema provided, no validation to do
             return self.post_list(kwargs)
 
-        if data_schema == "pulp" or data_schema == "solve_model_dag":
-            # this one we have the schema stored inside cornflow
-            validate_and_continue(DataSchema(), kwargs["data"])
-            return self.post_list(kwargs)
+        if validation_mode == VALIDATION_MODE_ASYNC:
+            # the instance is stored right away and validated in the background
+            kwargs["validation_state"] = INSTANCE_STATE_QUEUED
+            response = self.post_list(kwargs)
+            submit_task(validate_instance, response[0].id, data_schema)
+            log.info(
+                "User {} creates instance {} (validated in the background)".format(
+                    self.get_user_id(), response[0].id
+                )
+            )
+            return response
 
-        # for the rest of the schemas: we need to ask airflow for the schema
-        config = current_app.config
-        marshmallow_obj = get_schema(config, data_schema)
-        validate_and_continue(marshmallow_obj(), kwargs["data"])
+        validate_and_continue(get_instance_schema(data_schema)(), kwargs["data"])
 
         # if we're here, we validated and the data seems to fit the schema
         response = self.post_list(kwargs)
@@ -103,6 +123,109 @@ class InstanceEndpoint(MetaResource, MethodResource):
         return response
 
 
+def get_instance_schema_name(data_schema):
+    """
+    :param str data_schema: the schema of the instance
+    :return: the name the schema has in the registry
+    :rtype: str
+    """
+    if data_schema == "pulp" or data_schema == "solve_model_dag":
+        # this one we have the schema stored inside cornflow
+        return PULP_SCHEMA
+    # for the rest of the schemas: we need to ask airflow for the schema
+    return data_schema
+
+
+def get_instance_schema(data_schema):
+    """
+    Gets the class that validates the data of the instances of a schema
+
+    :param str data_schema: the schema of the instance
+    :return: the marshmallow class (or a class with the same load method)
+    """
+    return get_schema(get_instance_schema_name(data_schema))
+
+
+def validate_instance(idx, data_schema):
+    """
+    Background task that validates an instance stored with ?validate=async
+    and then launches the executions held while it was being validated.
+    The data is checked in the pool of processes of the worker.
+    If the validation cannot be done (airflow or the database fail) the instance keeps waiting,
+    and it is validated again later (see :func:`revalidate_instances`)
+
+    :param str idx: ID of the instance
+    :param str data_schema: the schema the instance is validated against
+    :return: the validation state of the instance
+    :rtype: int
+    """
+    instance = InstanceModel.query.filter_by(id=idx, deleted_at=None).first()
+    if instance is None:
+        return None
+    try:
+        schema_hash, jsonschema, engine = get_schema_source(
+            get_instance_schema_name(data_schema)
+        )
+        error = run_in_process(
+            validate_data, schema_hash, jsonschema, engine, instance.data
+        )
+    except Exception as e:
+        log.warning(
+            "Instance {} could not be validated, "
+            "it waits to be validated again: {}".format(idx, e)
+        )
+        db.session.rollback()
+        return INSTANCE_STATE_QUEUED
+    if error is not None:
+        log.info("Instance {} is not valid: {}".format(idx, error))
+        instance.update_validation_state(INSTANCE_STATE_INVALID, error)
+    else:
+        instance.update_validation_state(INSTANCE_STATE_VALID)
+    run_queued_executions(instance)
+    return instance.validation_state
+
+
+def revalidate_instances(retry_after=None):
+    """
+    Validates again the instances that have been waiting to be validated for too long:
+    their background task was lost (the worker stopped) or it could not be done.
+    Each instance is claimed first with a conditional update, so only one reconciler validates it
+
+    :param float retry_after: seconds an instance waits before being validated again.
+      By default, VALIDATION_RETRY_AFTER
+    :return: the number of instances validated
+    :rtype: int
+    """
+    if retry_after is None:
+        retry_after = current_app.config["VALIDATION_RETRY_AFTER"]
+    now = datetime.datetime.utcnow()
+    waiting_since = now - datetime.timedelta(seconds=retry_after)
+    model = InstanceModel
+    waiting = (
+        db.session.query(model.id, model.schema)
+        .filter(
+            model.validation_state == INSTANCE_STATE_QUEUED,
+            model.deleted_at == None,
+            model.updated_at < waiting_since,
+        )
+        .all()
+    )
+    validated = 0
+    for idx, data_schema in waiting:
+        claimed = model.query.filter(
+            model.id == idx,
+            model.validation_state == INSTANCE_STATE_QUEUED,
+            model.updated_at < waiting_since,
+        ).update(dict(updated_at=now), synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            continue
+        state = validate_instance(idx, data_schema or "solve_model_dag")
+        if state != INSTANCE_STATE_QUEUED:
+            validated += 1
+    return validated
+
+
 class InstanceDetailsEndpointBase(MetaResource, MethodResource):
     """
     Endpoint used to get the information of a single instance, edit it or delete it
@@ -130,7 +253,9 @@ class InstanceDetailsEndpointBase(MetaResource, MethodResource):
           the data of the instance) and an integer with the HTTP status code.
         :rtype: Tuple(dict, integer)
         """
-        return InstanceModel.get_one_object_from_user(self.get_user(), idx)
+        return InstanceModel.get_one_object_from_user(
+            self.get_user(), idx, response_schema=InstanceDetailsEndpointResponse
+        )
 
 
 class InstanceDetailsEndpoint(InstanceDetailsEndpointBase):
@@ -182,7 +307,8 @@ class InstanceDataEndpoint(InstanceDetailsEndpointBase):
     @Auth.auth_required
     @marshal_with(InstanceDataEndpointResponse)
     @MetaResource.get_data_or_404
-    @compressed
+    @cached_compressed(InstanceDataEndpointResponse)
+    @with_etag
     def get(self, idx):
         """
         API method to get an instance data by the user and its related info.
@@ -194,7 +320,12 @@ class InstanceDataEndpoint(InstanceDetailsEndpointBase):
           the data of the instance) and an integer with the HTTP status code.
         :rtype: Tuple(dict, integer)
         """
-        return InstanceModel.get_one_object_from_user(self.get_user(), idx)
+        return InstanceModel.get_one_object_from_user(
+            self.get_user(),
+            idx,
+            response_schema=InstanceDataEndpointResponse,
+            columns=InstanceModel.VERSION_COLUMNS,
+        )
 
 
 class InstanceFileEndpoint(MetaResource, MethodResource):
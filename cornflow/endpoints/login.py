@@ -12,7 +12,7 @@ import logging as log
 from .meta_resource import MetaResource
 from ..models import UserModel, UserRoleModel
 from ..schemas.user import UserSchema, LoginEndpointRequest
-from ..shared.authentication import Auth
+from ..shared.authentication import Auth, invalidate_identity
 from ..shared.const import AUTH_DB, AUTH_LDAP
 from ..shared.exceptions import InvalidUsage, InvalidCredentials
 from ..shared.ldap import LDAP
@@ -99,4 +99,5 @@ class LoginEndpoint(MetaResource, MethodResource):
         except:
             # or we rollback
             db.session.rollback()
+        invalidate_identity(user.id)
         return user
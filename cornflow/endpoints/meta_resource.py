@@ -8,8 +8,9 @@ from flask_restful import Resource
 from functools import wraps
 
 # Import from internal modules
+from ..models.meta_model import DEFAULT_PAGE_SIZE
 from ..shared.authentication import Auth
-from ..shared.const import ALL_DEFAULT_ROLES
+from ..shared.const import ALL_DEFAULT_ROLES, NEXT_CURSOR_HEADER
 from ..shared.exceptions import InvalidUsage, ObjectDoesNotExist, NoPermission
 
 
@@ -28,11 +29,11 @@ class MetaResource(Resource):
 
     def get_user(self):
         """
-        :return: a user of a request
-        :rtype: UserModel
+        :return: the identity of the user of a request
+        :rtype: :class:`Identity`
         """
         if self.user is None:
-            self.user = Auth.get_user_obj_from_header(request.headers)
+            self.user = Auth.get_request_identity(request)
             if self.user is None:
                 raise InvalidUsage("Error authenticating user")
         return self.user
@@ -75,6 +76,27 @@ class MetaResource(Resource):
 
         return decorated_func
 
+    def get_list(self, response_schema, **kwargs):
+        """
+        Gets one page of the objects of the user.
+        The cursor to the next page (if there is one) is sent in a header
+
+        :param response_schema: the schema used to serialize the objects
+        :param kwargs: the filters of the query
+        :return: the objects, the HTTP status code and the headers
+        :rtype: Tuple(list, integer, dict)
+        """
+        items = self.model.get_all_objects(
+            self.get_user(), response_schema=response_schema, **kwargs
+        )
+        headers = dict()
+        next_cursor = self.model.get_next_cursor(
+            items, kwargs.get("limit", DEFAULT_PAGE_SIZE)
+        )
+        if next_cursor is not None:
+            headers[NEXT_CURSOR_HEADER] = next_cursor
+        return items, 200, headers
+
     def post_list(self, data, trace_field="user_id"):
         data = dict(data)
         data[trace_field] = self.get_user_id()
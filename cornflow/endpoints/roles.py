@@ -17,9 +17,10 @@ from ..schemas.roles import (
     UserRoleRequest,
     UserRoleResponse,
 )
-from ..shared.authentication import Auth
+from ..shared.authentication import Auth, invalidate_identity
 from ..shared.const import ADMIN_ROLE, AUTH_LDAP
 from ..shared.exceptions import EndpointNotImplemented, ObjectAlreadyExists
+from ..shared.permissions import bump_permissions_version
 
 
 class RolesListEndpoint(MetaResource, MethodResource):
@@ -68,7 +69,9 @@ class RolesListEndpoint(MetaResource, MethodResource):
             raise EndpointNotImplemented(
                 "The roles have to be created in the directory."
             )
-        return self.post_list(kwargs)
+        response = self.post_list(kwargs)
+        bump_permissions_version()
+        return response
 
 
 class RoleDetailEndpoint(MetaResource, MethodResource):
@@ -119,7 +122,9 @@ class RoleDetailEndpoint(MetaResource, MethodResource):
             raise EndpointNotImplemented(
                 "The roles have to be modified in the directory."
             )
-        return self.put_detail(kwargs, idx)
+        response = self.put_detail(kwargs, idx)
+        bump_permissions_version()
+        return response
 
     @doc(description="Deletes one role", tags=["Roles"])
     @Auth.auth_required
@@ -192,11 +197,13 @@ class UserRoleListEndpoint(MetaResource, MethodResource):
 
         # Check if the assignation is disabled, or it does exist
         if UserRoleModel.check_if_role_assigned_disabled(**kwargs):
-            return self.activate_item(**kwargs)
+            response = self.activate_item(**kwargs)
         elif UserRoleModel.check_if_role_assigned(**kwargs):
             raise ObjectAlreadyExists
         else:
-            return self.post_list(kwargs, trace_field="admin_id")
+            response = self.post_list(kwargs, trace_field="admin_id")
+        invalidate_identity(kwargs.get("user_id"))
+        return response
 
 
 class UserRoleDetailEndpoint(MetaResource, MethodResource):
@@ -247,4 +254,6 @@ class UserRoleDetailEndpoint(MetaResource, MethodResource):
             raise EndpointNotImplemented(
                 "The roles have to be created in the directory."
             )
-        return self.delete_detail(user_id, role_id)
+        response = self.delete_detail(user_id, role_id)
+        invalidate_identity(user_id)
+        return response
@@ -3,7 +3,6 @@ Endpoints to get the schemas
 """
 
 # Import from libraries
-from cornflow_client.airflow.api import Airflow
 from flask import current_app
 from flask_apispec.views import MethodResource
 from flask_apispec import doc
@@ -11,6 +10,7 @@ import logging as log
 
 # Import from internal modules
 from .meta_resource import MetaResource
+from ..shared.airflow import get_airflow_client
 from ..shared.exceptions import AirflowError
 
 
@@ -25,19 +25,13 @@ class SchemaEndpoint(MetaResource, MethodResource):
     @doc(description="Get instance, solution and config schema", tags=["Schemas"])
     def get(self, dag_name):
         """
-        API method to get the input, output and config schemas for a given dag
+        API method to get the input, output and config schemas for a given dag.
+        The schemas fetched are also refreshed in the schema registry of the worker
 
         :return: A dictionary with a message and a integer with the HTTP status code
         :rtype: Tuple(dict, integer)
         """
-        config = current_app.config
-        airflow_conf = dict(
-            url=config["AIRFLOW_URL"],
-            user=config["AIRFLOW_USER"],
-            pwd=config["AIRFLOW_PWD"],
-        )
-
-        af_client = Airflow(**airflow_conf)
+        af_client = get_airflow_client()
         if not af_client.is_alive():
             log.error("Airflow not accessible when getting schema {}".format(dag_name))
             raise AirflowError(error="Airflow is not accessible")
@@ -47,4 +41,6 @@ class SchemaEndpoint(MetaResource, MethodResource):
 
         log.debug("User gets schema {}".format(dag_name))
         # it exists: we try to get its schemas
-        return af_client.get_schemas_for_dag_name(dag_name)
+        schemas = af_client.get_schemas_for_dag_name(dag_name)
+        current_app.extensions["schema_registry"].update(dag_name, schemas)
+        return schemas
@@ -18,7 +18,7 @@ from ..schemas.user import (
     UserEditRequest,
 )
 
-from ..shared.authentication import Auth
+from ..shared.authentication import Auth, invalidate_identity
 from ..shared.const import ADMIN_ROLE, AUTH_LDAP
 from ..shared.exceptions import (
     InvalidUsage,
@@ -101,6 +101,7 @@ class UserDetailsEndpoint(MetaResource, MethodResource):
         if user_obj.is_service_user():
             raise NoPermission()
         user_obj.delete()
+        invalidate_identity(user_id)
         log.info("User {} was deleted by user {}".format(user_id, self.get_user_id()))
         return {"message": "The object has been deleted"}, 200
 
@@ -159,5 +160,6 @@ class ToggleUserAdmin(MetaResource, MethodResource):
         else:
             UserRoleModel.query.filter_by(user_id=user_id, role_id=ADMIN_ROLE).delete()
             db.session.commit()
+        invalidate_identity(user_id)
 
         return user_obj, 200
@@ -3,9 +3,13 @@ Initialization file for the models module
 """
 from .action import ActionModel
 from .apiview import ApiViewModel
+from .cache_version import CacheVersionModel
 from .case import CaseModel
+from .data_blob import DataBlobModel
 from .execution import ExecutionModel
+from .execution_progress import ExecutionLogChunkModel, ExecutionProgressModel
 from .instance import InstanceModel
 from .permission import PermissionViewRoleModel
 from .roles import RoleModel, UserRoleModel
 from .user import UserModel
+from .validation_result import ValidationResultModel
@@ -0,0 +1,79 @@
+"""
+Model used to keep track of the version of the data cached by each worker
+"""
+
+# Import from libraries
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+
+# Import from internal modules
+from .meta_model import EmptyModel
+from ..shared.utils import db
+
+
+class CacheVersionModel(EmptyModel):
+    """
+    Model class for the version counters of the in-process caches.
+    Every time the data behind one of the caches changes, its counter gets bumped so the rest of the workers
+    know they have to rebuild their copy.
+
+    The :class:`CacheVersionModel` has the following fields:
+
+    - **name**: str, the name of the cache, primary key of the table.
+    - **version**: int, the current version of the cached data.
+    """
+
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(128), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, data):
+        super().__init__()
+        self.name = data.get("name")
+        self.version = data.get("version", 0)
+
+    @staticmethod
+    def get_version(name):
+        """
+        Query to get the current version of a cache.
+        It goes directly to the database to avoid getting a stale value from the session
+
+        :param str name: the name of the cache
+        :return: the version of the cache, 0 if it has never been bumped
+        :rtype: int
+        """
+        version = (
+            db.session.query(CacheVersionModel.version)
+            .filter(CacheVersionModel.name == name)
+            .scalar()
+        )
+        return version or 0
+
+    @staticmethod
+    def bump(name):
+        """
+        Increases by one the version of a cache.
+        The row of the cache is created first if it does not exist yet (nothing happens if another
+        request creates it at the same time), so the increment is always a single atomic update
+
+        :param str name: the name of the cache
+        :return: nothing
+        """
+        table = CacheVersionModel.__table__
+        dialect = db.engine.dialect.name
+        if dialect == "postgresql":
+            statement = postgresql_insert(table).values(name=name, version=0)
+            statement = statement.on_conflict_do_nothing()
+        else:
+            statement = table.insert().values(name=name, version=0)
+            if dialect == "sqlite":
+                statement = statement.prefix_with("OR IGNORE")
+        db.session.execute(statement)
+        CacheVersionModel.query.filter_by(name=name).update(
+            {CacheVersionModel.version: CacheVersionModel.version + 1},
+            synchronize_session=False,
+        )
+        db.session.commit()
+
+    def __repr__(self):
+        return "<Cache {}. Version: {}>".format(self.name, self.version)
@@ -4,9 +4,9 @@ Model for the cases
 
 # Import from libraries
 import jsonpatch
-from sqlalchemy.dialects.postgresql import JSON
 
 # Import from internal modules
+from .data_blob import BlobAttribute
 from .meta_model import BaseDataModel
 from ..shared.exceptions import InvalidPatch, ObjectDoesNotExist, InvalidData
 from ..shared.utils import db, hash_json_256
@@ -46,9 +46,12 @@ class CaseModel(BaseDataModel):
             path.concat(id).concat(SEPARATOR + "%")
         ),
     )
-    solution = db.Column(JSON, nullable=True)
+    # the json is stored in the data_blobs table, referenced by solution_hash
+    solution = BlobAttribute("solution_hash")
     solution_hash = db.Column(db.String(256), nullable=False)
 
+    VERSION_COLUMNS = BaseDataModel.VERSION_COLUMNS + ("solution_hash", "path")
+
     # TODO: maybe implement this while making it compatible with sqlite:
     # Finding the ancestors is a little bit trickier. We need to create a fake
     # secondary table since this behaves like a many-to-many join.
@@ -91,7 +94,6 @@ class CaseModel(BaseDataModel):
             self.path = parent.path + str(parent.id) + SEPARATOR
 
         self.solution = data.get("solution", None)
-        self.solution_hash = hash_json_256(self.solution)
 
     @classmethod
     def from_parent_id(cls, user, data):
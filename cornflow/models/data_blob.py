@@ -0,0 +1,201 @@
+"""
+Model for the content-addressed storage of the json data of instances, executions and cases
+"""
+# Import from libraries
+import hashlib
+from sqlalchemy import type_coerce, LargeBinary
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+
+# Import from internal modules
+from ..shared.exceptions import ObjectDoesNotExist
+from ..shared.storage import CompressedJSON, SerializedJSON, iter_decompress
+from ..shared.utils import db, serialize_json, EMPTY_DATA_HASH
+
+# marker used when the content of a blob is not known, only its hash
+_NO_DATA = object()
+
+
+class DataBlobModel(db.Model):
+    """
+    Model class for the data blobs.
+    Each distinct json is stored only once, with its hash as primary key,
+    and the rest of the models reference it by its hash.
+    The rows are never handled through the session: the reference counter is kept
+    up to date by the flush events of the models that reference the blobs.
+
+    The :class:`DataBlobModel` has the following fields:
+
+    - **hash**: str, the SHA256 hash of the json, primary key of the table.
+    - **data**: dict (JSON), the json. It is stored compressed (:class:`CompressedJSON`).
+    - **ref_count**: int, the number of objects that reference the blob.
+      Blobs that are not referenced anymore are deleted by the clean_data_blobs command.
+    """
+
+    __tablename__ = "data_blobs"
+
+    hash = db.Column(db.String(256), primary_key=True)
+    data = db.Column(CompressedJSON, nullable=True)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def get_data(data_hash):
+        """
+        Query to get the json stored for a hash
+
+        :param str data_hash: the hash of the json
+        :return: the json or None if the hash is the one of an empty json
+        :rtype: dict
+        """
+        if data_hash is None or data_hash == EMPTY_DATA_HASH:
+            return None
+        data = (
+            db.session.query(DataBlobModel.data)
+            .filter(DataBlobModel.hash == data_hash)
+            .first()
+        )
+        if data is None:
+            raise ObjectDoesNotExist("The data {} does not exist".format(data_hash))
+        return data[0]
+
+    @staticmethod
+    def iter_serialized_data(data_hash):
+        """
+        Query to get the serialized json stored for a hash, without deserializing it.
+        The stored value is fetched right away and decompressed in chunks as the result is iterated.
+
+        :param str data_hash: the hash of the json
+        :return: the chunks of the serialized json
+        :rtype: Iterator[bytes]
+        """
+        if data_hash is None or data_hash == EMPTY_DATA_HASH:
+            return iter([b"null"])
+        raw = (
+            db.session.query(type_coerce(DataBlobModel.data, LargeBinary))
+            .filter(DataBlobModel.hash == data_hash)
+            .first()
+        )
+        if raw is None:
+            raise ObjectDoesNotExist("The data {} does not exist".format(data_hash))
+        return iter_decompress(raw[0])
+
+    @staticmethod
+    def acquire(connection, data_hash, data=_NO_DATA):
+        """
+        Adds a reference to a blob. If the blob does not exist it gets created with the given data
+
+        :param connection: the connection of the flush
+        :param str data_hash: the hash of the json
+        :param data: the json (or :class:`SerializedJSON`), if known
+        :return: nothing
+        """
+        if data_hash == EMPTY_DATA_HASH:
+            return
+        table = DataBlobModel.__table__
+        if data is not _NO_DATA and connection.dialect.name == "postgresql":
+            # postgres lets us insert or update atomically
+            statement = postgresql_insert(table).values(
+                hash=data_hash, data=data, ref_count=1
+            )
+            connection.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[table.c.hash],
+                    set_={"ref_count": table.c.ref_count + 1},
+                )
+            )
+            return
+        updated = connection.execute(
+            table.update()
+            .where(table.c.hash == data_hash)
+            .values(ref_count=table.c.ref_count + 1)
+        )
+        if updated.rowcount:
+            return
+        if data is _NO_DATA:
+            raise ObjectDoesNotExist("The data {} does not exist".format(data_hash))
+        connection.execute(table.insert().values(hash=data_hash, data=data, ref_count=1))
+
+    @staticmethod
+    def release(connection, data_hash):
+        """
+        Removes a reference to a blob
+
+        :param connection: the connection of the flush
+        :param str data_hash: the hash of the json
+        :return: nothing
+        """
+        if data_hash is None or data_hash == EMPTY_DATA_HASH:
+            return
+        table = DataBlobModel.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.hash == data_hash)
+            .values(ref_count=table.c.ref_count - 1)
+        )
+
+    @staticmethod
+    def delete_unreferenced():
+        """
+        Deletes the blobs that are not referenced by any object
+
+        :return: the number of blobs deleted
+        :rtype: int
+        """
+        deleted = DataBlobModel.query.filter(DataBlobModel.ref_count <= 0).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        return deleted
+
+    def __repr__(self):
+        return "<Data blob {}. References: {}>".format(self.hash, self.ref_count)
+
+
+class BlobAttribute:
+    """
+    Attribute of a model with a json that is stored in the data_blobs table.
+    The model only stores the hash of the json, in the given column.
+    Setting the attribute serializes the json once, to compute its hash and to store it,
+    and keeps it until it is flushed,
+    while assigning directly the hash column makes the object share the json of another one.
+
+    :param str hash_column: the name of the column with the hash of the json
+    """
+
+    def __init__(self, hash_column):
+        self.hash_column = hash_column
+        self.name = None
+        self.key = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.key = "_blob_" + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        data_hash = getattr(obj, self.hash_column)
+        cached = obj.__dict__.get(self.key)
+        if cached is not None and cached[0] == data_hash:
+            return cached[1]
+        data = DataBlobModel.get_data(data_hash)
+        obj.__dict__[self.key] = (data_hash, data, _NO_DATA)
+        return data
+
+    def __set__(self, obj, data):
+        serialized = serialize_json(data)
+        data_hash = hashlib.sha256(serialized).hexdigest()
+        setattr(obj, self.hash_column, data_hash)
+        obj.__dict__[self.key] = (data_hash, data, SerializedJSON(serialized))
+
+    def get_pending_data(self, obj):
+        """
+        Gets the json set in the object, if it has been set and not only referenced by its hash
+
+        :param obj: the object
+        :return: the serialized json or a marker if it is not known
+        :rtype: :class:`SerializedJSON`
+        """
+        cached = obj.__dict__.get(self.key)
+        if cached is not None and cached[0] == getattr(obj, self.hash_column):
+            return cached[2]
+        return _NO_DATA
@@ -3,16 +3,27 @@ Model for the executions
 """
 
 # Import from libraries
+import datetime
 import hashlib
 
 # Imports from sqlalchemy
+from sqlalchemy import case, event, inspect
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.dialects.postgresql import TEXT
 
 # Imports from internal modules
+from .execution_progress import ExecutionLogChunkModel, get_tail_index
 from .meta_model import BaseDataModel
-from ..shared.const import DEFAULT_EXECUTION_CODE, EXECUTION_STATE_MESSAGE_DICT
-from ..shared.utils import db
+from ..shared.const import (
+    DEFAULT_EXECUTION_CODE,
+    EXEC_STATE_CORRECT,
+    EXEC_STATE_RUNNING,
+    EXEC_STATE_UNKNOWN,
+    EXECUTION_STATE_MESSAGE_DICT,
+    EXECUTION_STATE_TRANSITIONS,
+)
+from ..shared.storage import CompressedJSON, CompressedText
+from ..shared.utils import db, hash_json_256
 
 
 class ExecutionModel(BaseDataModel):
@@ -29,9 +40,12 @@ class ExecutionModel(BaseDataModel):
     - **description**: str, the description of the execution given by the user. It is optional.
     - **config**: dict (JSON), the configuration to be used in the execution (:class:`ConfigSchema`).
     - **data**: dict (JSON), the results from the execution (:class:`DataSchema`).
-    - **log_text**: text, the log generated by the airflow webserver during execution. This log is stored as text.
+      It is stored in the data blobs table (:class:`DataBlobModel`) and referenced by data_hash.
+    - **log_text**: text, the log generated by the airflow webserver during execution, for the executions
+      that ended before the logs were stored in chunks (:class:`ExecutionLogChunkModel`, see :meth:`set_log`).
+      This log is stored as compressed text (:class:`CompressedText`).
     - **log_json**: dict (JSON), the log generated by the airflow webserver during execution.
-      This log is stored as a dict (JSON).
+      This log is stored as a compressed dict (:class:`CompressedJSON`).
     - **user_id**: int, the foreign key for the user (:class:`UserModel`). It links the execution to its owner.
     - **created_at**: datetime, the datetime when the execution was created (in UTC).
       This datetime is generated automatically, the user does not need to provide it.
@@ -43,7 +57,15 @@ class ExecutionModel(BaseDataModel):
       This datetime is generated automatically, the user does not need to provide it.
     - **state**: int, value representing state of the execution (finished, in progress, error, etc.)
     - **state_message**: str, a string value of state with human readable status message.
+    - **state_version**: int, the number of times the state has changed. The state is only changed
+      if it has not been changed by someone else since it was read (see :meth:`change_state`).
     - **data_hash**: a hash of the data json using SHA256
+    - **executor**: str, the backend that runs the execution (airflow or local). Empty for the executions
+      that have not been launched (or that were launched in airflow before there were other backends).
+    - **priority**: int, the priority of the execution among the ones of its user waiting for the scheduler,
+      and in the queue of the local backend (higher goes first).
+    - **config_hash**: a hash of the config json using SHA256, used to find the executions
+      that solved the same problem (see :meth:`get_cached_result`)
 
     :param dict data: the parsed json got from an endpoint that contains all the required information to
       create a new execution
@@ -58,21 +80,44 @@ class ExecutionModel(BaseDataModel):
         db.String(256), db.ForeignKey("instances.id"), nullable=False
     )
     config = db.Column(JSON, nullable=False)
+    config_hash = db.Column(db.String(256), nullable=True, index=True)
     dag_run_id = db.Column(db.String(256), nullable=True)
-    log_text = db.Column(TEXT, nullable=True)
-    log_json = db.Column(JSON, nullable=True)
+    executor = db.Column(db.String(32), nullable=True)
+    priority = db.Column(db.SmallInteger, nullable=False, default=0)
+    log_text = db.Column(CompressedText, nullable=True)
+    log_json = db.Column(CompressedJSON, nullable=True)
     state = db.Column(db.SmallInteger, default=DEFAULT_EXECUTION_CODE, nullable=False)
     state_message = db.Column(
         TEXT,
         default=EXECUTION_STATE_MESSAGE_DICT[DEFAULT_EXECUTION_CODE],
         nullable=True,
     )
+    state_version = db.Column(db.Integer, nullable=False, default=0)
 
     def __init__(self, data):
         super().__init__(data)
         self.user_id = data.get("user_id")
         self.instance_id = data.get("instance_id")
-        self.id = hashlib.sha1(
+        self.id = self.generate_id()
+
+        self.dag_run_id = data.get("dag_run_id")
+        self.executor = data.get("executor")
+        self.priority = data.get("priority", 0)
+        self.state = data.get("state", DEFAULT_EXECUTION_CODE)
+        self.state_message = EXECUTION_STATE_MESSAGE_DICT[self.state]
+        self.config = data.get("config")
+        self.config_hash = hash_json_256(self.config)
+        self.log_text = data.get("log_text")
+        self.log_json = data.get("log_json")
+
+    def generate_id(self):
+        """
+        Method to generate the id of the execution
+
+        :return: the hash of the creation date, the user and the instance
+        :rtype: str
+        """
+        return hashlib.sha1(
             (
                 str(self.created_at)
                 + " "
@@ -82,23 +127,248 @@ class ExecutionModel(BaseDataModel):
             ).encode()
         ).hexdigest()
 
-        self.dag_run_id = data.get("dag_run_id")
-        self.state = data.get("state", DEFAULT_EXECUTION_CODE)
-        self.state_message = EXECUTION_STATE_MESSAGE_DICT[self.state]
-        self.config = data.get("config")
-        self.log_text = data.get("log_text")
-        self.log_json = data.get("log_json")
-
-    def update_state(self, code):
+    def update_state(self, code, message=None, versioned=True, transitions=None):
         """
-        Method to update the state code and message of an execution
+        Method to update the state code and message of an execution, along with the rest of the changes made to it.
+        The state is written with a conditional UPDATE (see :meth:`change_state`), that is not applied
+        if the change is not allowed or, if versioned, if someone else changed the state since the execution was read.
+        In that case, the changes made to the execution are discarded and it gets the state stored.
+        The rest of the changes of the session are kept as they are
 
         :param int code: State code for the execution
+        :param str message: the state message, by default the one of the state
+        :param bool versioned: if the state must not have changed since the execution was read
+        :param dict transitions: the changes of state allowed, by default EXECUTION_STATE_TRANSITIONS
+        :return: if the state was changed
+        :rtype: bool
+        """
+        db.session.add(self)
+        if inspect(self).pending:
+            db.session.flush()
+        version = self.state_version if versioned else None
+        # the changes of the execution are only written if the state changes
+        with db.session.no_autoflush:
+            changed = self.change_state(
+                self.id, code, message, version=version, transitions=transitions
+            )
+        if changed:
+            db.session.commit()
+        else:
+            self.__dict__.pop("_new_log", None)
+            db.session.expire(self)
+        return changed
+
+    @classmethod
+    def change_state(
+        cls, idx, code, message=None, states=None, version=None, transitions=None
+    ):
+        """
+        Changes the state of an execution with a single conditional UPDATE, inside the current transaction.
+        The state is only changed if the change is allowed from the state stored (see EXECUTION_STATE_TRANSITIONS),
+        so two requests that change the state at the same time cannot overwrite each other
+
+        :param str idx: ID of the execution
+        :param int code: the new state code
+        :param str message: the state message, by default the one of the state
+        :param list states: if given, the only states it can be changed from
+        :param int version: if given, the state_version the execution must have
+        :param dict transitions: the changes of state allowed, by default EXECUTION_STATE_TRANSITIONS
+        :return: if the state was changed
+        :rtype: bool
+        """
+        if message is None:
+            message = EXECUTION_STATE_MESSAGE_DICT[code]
+        if transitions is None:
+            transitions = EXECUTION_STATE_TRANSITIONS
+        sources = [
+            state
+            for state, targets in transitions.items()
+            if code in targets and (states is None or state in states)
+        ]
+        query = cls.query.filter(cls.id == idx, cls.state.in_(sources))
+        if version is not None:
+            query = query.filter(cls.state_version == version)
+        changed = query.update(
+            dict(
+                state=code,
+                state_message=message,
+                # writing the same state again (like the checks of a running execution) is not a change
+                state_version=case(
+                    [(cls.state == code, cls.state_version)],
+                    else_=cls.state_version + 1,
+                ),
+                updated_at=datetime.datetime.utcnow(),
+            ),
+            synchronize_session=False,
+        )
+        if changed:
+            record_states(db.session, {idx: code})
+        return changed > 0
+
+    @classmethod
+    def touch(cls, ids, states):
+        """
+        Marks some executions as alive, moving their updated_at, if they are still in some states.
+        It is done with a single UPDATE, inside the current transaction
+
+        :param list ids: the IDs of the executions
+        :param list states: the states the executions must have
+        :return: the number of executions updated
+        :rtype: int
+        """
+        return cls.query.filter(cls.id.in_(ids), cls.state.in_(states)).update(
+            dict(updated_at=datetime.datetime.utcnow()), synchronize_session=False
+        )
+
+    @classmethod
+    def lock(cls, idx):
+        """
+        Locks the row of an execution until the end of the current transaction (SELECT ... FOR UPDATE),
+        so the requests that append rows to it (see :class:`ExecutionAppendModel`) wait for each other.
+        The databases without row locks (like sqlite) ignore it
+
+        :param str idx: ID of the execution
+        :return: nothing
+        """
+        db.session.query(cls.id).filter(cls.id == idx).with_for_update().scalar()
+
+    @staticmethod
+    def can_change_state(state, code):
+        """
+        :param int state: the current state code
+        :param int code: the new state code
+        :return: if an execution can change from one state to the other
+        :rtype: bool
+        """
+        return code in EXECUTION_STATE_TRANSITIONS.get(state, [])
+
+    def copy_result(self, execution):
+        """
+        Method to reuse the solution and the log of another execution that solved the same problem.
+        The solution is not copied: both executions reference the same data blob
+
+        :param ExecutionModel execution: the execution that solved the problem
         :return: nothing
         """
-        self.state = code
-        self.state_message = EXECUTION_STATE_MESSAGE_DICT[code]
-        super().update({})
+        self.data_hash = execution.data_hash
+        self.log_text = execution.log_text
+        self.log_json = execution.log_json
+        # the chunks reference the execution, so it has to be stored first
+        db.session.add(self)
+        db.session.flush()
+        ExecutionLogChunkModel.copy(execution.id, self.id)
+        self.update_state(EXEC_STATE_CORRECT)
+
+    def set_log(self, text):
+        """
+        Method to replace the log of the execution. It is written in chunks when the execution is flushed
+        (so it is discarded along with the rest of its changes if :meth:`update_state` cannot change the state)
+
+        :param str text: the new log
+        :return: nothing
+        """
+        self.log_text = None
+        self.updated_at = datetime.datetime.utcnow()
+        self._new_log = text
+
+    def get_log_size(self):
+        """
+        :return: the number of characters of the log of the execution
+        :rtype: int
+        """
+        if self.log_text is not None:
+            return len(self.log_text)
+        return ExecutionLogChunkModel.get_end(self.id)[1]
+
+    def get_log(self, offset=0, length=None):
+        """
+        Method to get a part of the log of the execution
+
+        :param int offset: the offset of the first character
+        :param int length: the maximum number of characters, by default until the end of the log
+        :return: the text
+        :rtype: str
+        """
+        if self.log_text is not None:
+            end = None if length is None else offset + length
+            return self.log_text[offset:end]
+        return ExecutionLogChunkModel.get_range(self.id, offset, length)
+
+    def get_log_tail(self, lines):
+        """
+        Method to get the last lines of the log of the execution
+
+        :param int lines: the number of lines
+        :return: the offset of the first line and the text
+        :rtype: tuple
+        """
+        if self.log_text is not None:
+            index = get_tail_index(self.log_text, lines)
+            return index, self.log_text[index:]
+        return ExecutionLogChunkModel.get_tail(self.id, lines)
+
+    def iterate_log(self, offset=0):
+        """
+        Method to read the log of the execution part by part, without loading it whole
+
+        :param int offset: the offset of the first character
+        :return: a generator of the parts of the log
+        """
+        if self.log_text is not None:
+            return iter([self.log_text[offset:]])
+        return ExecutionLogChunkModel.iterate(self.id, offset)
+
+    @classmethod
+    def get_cached_result(cls, user_id, data_hash, config_hash, schema, since):
+        """
+        Query to get the last execution of a user that solved correctly the same data
+        with the same configuration and DAG
+
+        :param int user_id: ID of the user
+        :param str data_hash: the hash of the data of the instance
+        :param str config_hash: the hash of the configuration
+        :param str schema: the name of the DAG
+        :param datetime since: the executions created before (in UTC) are not reused
+        :return: the execution or None if there is none
+        :rtype: :class:`ExecutionModel`
+        """
+        return (
+            cls.query.filter(
+                cls.user_id == user_id,
+                cls.config_hash == config_hash,
+                cls.schema == schema,
+                cls.state == EXEC_STATE_CORRECT,
+                cls.deleted_at == None,
+                cls.created_at >= since,
+                cls.instances.has(data_hash=data_hash),
+            )
+            .order_by(cls.created_at.desc())
+            .first()
+        )
+
+    @classmethod
+    def get_status_from_user(cls, user, ids=None, response_schema=None, columns=()):
+        """
+        Query to get, in one go, the executions whose status the user wants to know:
+        the given ones, or else all the ones that are running
+
+        :param UserModel user: user object performing the query
+        :param list ids: IDs of the executions
+        :param response_schema: if given, only the columns dumped by this schema are fetched
+        :param columns: extra columns to fetch along the ones of the response schema
+        :return: the executions
+        :rtype: list(:class:`ExecutionModel`)
+        """
+        query = cls.query.filter(cls.deleted_at == None)
+        if response_schema is not None:
+            query = query.options(*cls.get_query_options(response_schema, columns))
+        if not user.is_admin() and not user.is_service_user():
+            query = query.filter(cls.user_id == user.id)
+        if ids:
+            query = query.filter(cls.id.in_(ids))
+        else:
+            query = query.filter(cls.state.in_([EXEC_STATE_RUNNING, EXEC_STATE_UNKNOWN]))
+        return query.all()
 
     def __repr__(self):
         """
@@ -117,3 +387,29 @@ class ExecutionModel(BaseDataModel):
         :rtype: str
         """
         return "<id {}>".format(self.id)
+
+
+def record_states(session, states):
+    """
+    Keeps the new states of some executions, to publish them once the session is committed
+    (see :mod:`cornflow.shared.events`)
+
+    :param session: the database session
+    :param dict states: the new state of each execution, by id
+    """
+    session.info.setdefault("execution_states", dict()).update(states)
+
+
+@event.listens_for(db.session, "before_flush")
+def _write_logs(session, flush_context, instances):
+    # the logs set with ExecutionModel.set_log
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, ExecutionModel) and "_new_log" in obj.__dict__:
+            ExecutionLogChunkModel.replace(obj.id, obj.__dict__.pop("_new_log"))
+
+
+@event.listens_for(ExecutionModel, "before_update")
+def _increase_state_version(mapper, connection, target):
+    # the states written without a conditional UPDATE (like the ones of new executions) count too
+    if inspect(target).attrs.state.history.has_changes():
+        target.state_version = ExecutionModel.state_version + 1
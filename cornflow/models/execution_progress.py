@@ -0,0 +1,339 @@
+"""
+Models for the partial results that the solvers send while an execution runs:
+the rows of progress of the solver and the chunks of its log.
+They are appended, in order, by the worker that runs the execution
+"""
+# Import from libraries
+import datetime
+from sqlalchemy.ext.declarative import declared_attr
+
+# Import from internal modules
+from .meta_model import EmptyModel
+from ..shared.storage import CompressedJSON, CompressedText
+from ..shared.utils import db
+
+
+class ExecutionAppendModel(EmptyModel):
+    """
+    Abstract model for the rows appended to an execution.
+
+    - **id**: int, the primary key, autoincremented.
+    - **execution_id**: str, the foreign key for the execution (:class:`ExecutionModel`).
+    - **position**: int, the position of the row among the ones of the execution, starting with 1.
+    - **created_at**: datetime, the datetime when the row was received (in UTC).
+    - **content**: the content of the row.
+    """
+
+    __abstract__ = True
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    position = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    @declared_attr
+    def execution_id(cls):
+        return db.Column(
+            db.String(256),
+            db.ForeignKey("executions.id", ondelete="CASCADE"),
+            nullable=False,
+            index=True,
+        )
+
+    @declared_attr
+    def __table_args__(cls):
+        return (db.UniqueConstraint("execution_id", "position"),)
+
+    def __init__(self, data):
+        super().__init__()
+        self.execution_id = data.get("execution_id")
+        self.position = data.get("position")
+        self.content = data.get("content")
+        self.created_at = datetime.datetime.utcnow()
+
+    @classmethod
+    def get_last_position(cls, execution_id):
+        """
+        Query to get the position of the last row of an execution
+
+        :param str execution_id: ID of the execution
+        :return: the position, 0 if there are no rows
+        :rtype: int
+        """
+        last = (
+            db.session.query(db.func.max(cls.position))
+            .filter(cls.execution_id == execution_id)
+            .scalar()
+        )
+        return last or 0
+
+    @classmethod
+    def append(cls, execution_id, contents):
+        """
+        Adds some rows after the last one of an execution.
+        They are stored with the next commit of the session
+
+        :param str execution_id: ID of the execution
+        :param list contents: the content of each row
+        :return: the position of the last row
+        :rtype: int
+        """
+        position = cls.get_last_position(execution_id)
+        for content in contents:
+            position += 1
+            db.session.add(
+                cls(dict(execution_id=execution_id, position=position, content=content))
+            )
+        return position
+
+    @classmethod
+    def get_after(cls, execution_id, after=0, limit=None):
+        """
+        Query to get the rows of an execution after a position, in order
+
+        :param str execution_id: ID of the execution
+        :param int after: the position of the last row already known
+        :param int limit: maximum number of rows
+        :return: the rows
+        :rtype: list
+        """
+        query = cls.query.filter(
+            cls.execution_id == execution_id, cls.position > after
+        ).order_by(cls.position)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+
+class ExecutionProgressModel(ExecutionAppendModel):
+    """
+    Model class for the rows of progress of the executions, like the ones of the log of a MIP solver
+    (time, nodes, best solution, best bound, gap...).
+    It inherits from :class:`ExecutionAppendModel`, and the content of each row is a dict (JSON)
+    stored compressed (:class:`CompressedJSON`).
+    """
+
+    __tablename__ = "execution_progress"
+
+    content = db.Column(CompressedJSON, nullable=False)
+
+    def __repr__(self):
+        return "<Progress {} of {}>".format(self.position, self.execution_id)
+
+
+class ExecutionLogChunkModel(ExecutionAppendModel):
+    """
+    Model class for the chunks of the logs of the executions.
+    The log of an execution is stored split in chunks of at most CHUNK_SIZE characters,
+    so a part of it (a range or the last lines) can be read without loading the whole log.
+    It inherits from :class:`ExecutionAppendModel`, and the content of each chunk is text
+    stored compressed (:class:`CompressedText`).
+
+    - **start**: int, the offset (in characters) of the first character of the chunk in the log.
+    - **size**: int, the number of characters of the chunk.
+    """
+
+    __tablename__ = "execution_log_chunks"
+
+    # maximum number of characters of a chunk
+    CHUNK_SIZE = 256 * 1024
+    # number of chunks read with each query
+    CHUNKS_PER_QUERY = 16
+
+    start = db.Column(db.BigInteger, nullable=False, default=0)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    content = db.Column(CompressedText, nullable=False)
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.start = data.get("start", 0)
+        self.size = len(self.content)
+
+    def __repr__(self):
+        return "<Log chunk {} of {}>".format(self.position, self.execution_id)
+
+    @classmethod
+    def get_end(cls, execution_id):
+        """
+        Query to get the position of the last chunk of the log of an execution and the size of the log
+
+        :param str execution_id: ID of the execution
+        :return: the position (0 if there are no chunks) and the size of the log
+        :rtype: tuple
+        """
+        position, end = (
+            db.session.query(
+                db.func.max(cls.position), db.func.max(cls.start + cls.size)
+            )
+            .filter(cls.execution_id == execution_id)
+            .one()
+        )
+        return position or 0, end or 0
+
+    @classmethod
+    def append(cls, execution_id, contents):
+        """
+        Adds some text at the end of the log of an execution, in chunks of at most CHUNK_SIZE characters.
+        They are stored with the next commit of the session
+
+        :param str execution_id: ID of the execution
+        :param list contents: the texts to add
+        :return: the position of the last chunk
+        :rtype: int
+        """
+        position, start = cls.get_end(execution_id)
+        for content in contents:
+            for index in range(0, len(content), cls.CHUNK_SIZE):
+                text = content[index : index + cls.CHUNK_SIZE]
+                position += 1
+                db.session.add(
+                    cls(
+                        dict(
+                            execution_id=execution_id,
+                            position=position,
+                            start=start,
+                            content=text,
+                        )
+                    )
+                )
+                start += len(text)
+        return position
+
+    @classmethod
+    def replace(cls, execution_id, text):
+        """
+        Replaces the whole log of an execution. The changes are stored with the next commit of the session
+
+        :param str execution_id: ID of the execution
+        :param str text: the new log
+        :return: the position of the last chunk
+        :rtype: int
+        """
+        cls.query.filter(cls.execution_id == execution_id).delete(
+            synchronize_session=False
+        )
+        return cls.append(execution_id, [text] if text else [])
+
+    @classmethod
+    def copy(cls, source_id, execution_id):
+        """
+        Copies the log of an execution to another one, inside the database.
+        The changes are stored with the next commit of the session
+
+        :param str source_id: ID of the execution with the log
+        :param str execution_id: ID of the execution that gets the log
+        :return: nothing
+        """
+        cls.query.filter(cls.execution_id == execution_id).delete(
+            synchronize_session=False
+        )
+        columns = ["position", "created_at", "start", "size", "content"]
+        table = cls.__table__
+        select = db.select(
+            [db.literal(execution_id)] + [table.c[column] for column in columns]
+        ).where(table.c.execution_id == source_id)
+        db.session.execute(
+            table.insert().from_select(["execution_id"] + columns, select)
+        )
+
+    @classmethod
+    def iterate(cls, execution_id, offset=0):
+        """
+        Reads the log of an execution chunk by chunk, from an offset.
+        Only CHUNKS_PER_QUERY chunks are loaded at the same time
+
+        :param str execution_id: ID of the execution
+        :param int offset: the offset of the first character
+        :return: a generator of the parts of the log
+        """
+        position = 0
+        while True:
+            chunks = (
+                cls.query.filter(
+                    cls.execution_id == execution_id,
+                    cls.position > position,
+                    cls.start + cls.size > offset,
+                )
+                .order_by(cls.position)
+                .limit(cls.CHUNKS_PER_QUERY)
+                .all()
+            )
+            for chunk in chunks:
+                yield chunk.content[max(offset - chunk.start, 0) :]
+            if len(chunks) < cls.CHUNKS_PER_QUERY:
+                return
+            position = chunks[-1].position
+
+    @classmethod
+    def get_range(cls, execution_id, offset=0, length=None):
+        """
+        Query to get a part of the log of an execution
+
+        :param str execution_id: ID of the execution
+        :param int offset: the offset of the first character
+        :param int length: the maximum number of characters, by default until the end of the log
+        :return: the text
+        :rtype: str
+        """
+        query = cls.query.filter(
+            cls.execution_id == execution_id, cls.start + cls.size > offset
+        )
+        if length is not None:
+            query = query.filter(cls.start < offset + length)
+        chunks = query.order_by(cls.position).all()
+        if not chunks:
+            return ""
+        text = "".join(chunk.content for chunk in chunks)
+        text = text[offset - chunks[0].start :]
+        if length is not None:
+            text = text[:length]
+        return text
+
+    @classmethod
+    def get_tail(cls, execution_id, lines):
+        """
+        Query to get the last lines of the log of an execution.
+        The chunks are read from the end until they have enough lines
+
+        :param str execution_id: ID of the execution
+        :param int lines: the number of lines
+        :return: the offset of the first line and the text
+        :rtype: tuple
+        """
+        chunks = []
+        newlines = 0
+        position = None
+        while newlines <= lines:
+            query = cls.query.filter(cls.execution_id == execution_id)
+            if position is not None:
+                query = query.filter(cls.position < position)
+            found = (
+                query.order_by(cls.position.desc()).limit(cls.CHUNKS_PER_QUERY).all()
+            )
+            for chunk in found:
+                chunks.append(chunk)
+                newlines += chunk.content.count("\n")
+                if newlines > lines:
+                    break
+            if len(found) < cls.CHUNKS_PER_QUERY:
+                break
+            position = found[-1].position
+        if not chunks:
+            return 0, ""
+        text = "".join(chunk.content for chunk in reversed(chunks))
+        index = get_tail_index(text, lines)
+        return chunks[-1].start + index, text[index:]
+
+
+def get_tail_index(text, lines):
+    """
+    :param str text: a text
+    :param int lines: the number of lines
+    :return: the index where the last lines of the text start. The text can end with a new line or not
+    :rtype: int
+    """
+    index = len(text) - 1 if text.endswith("\n") else len(text)
+    for _ in range(lines):
+        index = text.rfind("\n", 0, index)
+        if index == -1:
+            return 0
+    return index + 1
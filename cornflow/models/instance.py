@@ -2,9 +2,11 @@
 
 # Import from libraries
 import hashlib
+from sqlalchemy.dialects.postgresql import TEXT
 
 # Imported from internal models
 from .meta_model import BaseDataModel
+from ..shared.const import INSTANCE_STATE_MESSAGE_DICT, INSTANCE_STATE_VALID
 from ..shared.utils import db
 
 
@@ -17,7 +19,8 @@ class InstanceModel(BaseDataModel):
 
     - **id**: int, the primary key for the executions, a hash generated upon creation of the instance
       and the id given back to the user.The hash is generated from the creation time and the user id.
-    - **data**: dict (JSON), the data structure of the instance (:class:`DataSchema`)
+    - **data**: dict (JSON), the data structure of the instance (:class:`DataSchema`).
+      It is stored in the data blobs table (:class:`DataBlobModel`) and referenced by data_hash.
     - **name**: str, the name given to the instance by the user.
     - **description**: str, the description given to the instance by the user. It is optional.
     - **executions**: relationship, not a field in the model but the relationship between the _class:`InstanceModel`
@@ -32,6 +35,9 @@ class InstanceModel(BaseDataModel):
       after a certain time of its deletion.
       This datetime is generated automatically, the user does not need to provide it.
     - **data_hash**: a hash of the data json using SHA256
+    - **validation_state**: int, value representing the validation of the data against its schema
+      (valid, waiting to be validated or invalid).
+    - **validation_message**: str, a human readable message of the validation, with the errors found if any.
     """
 
     # Table name in the database
@@ -46,6 +52,10 @@ class InstanceModel(BaseDataModel):
         primaryjoin="and_(InstanceModel.id==ExecutionModel.instance_id, "
         "ExecutionModel.deleted_at==None)",
     )
+    validation_state = db.Column(
+        db.SmallInteger, default=INSTANCE_STATE_VALID, nullable=False
+    )
+    validation_message = db.Column(TEXT, nullable=True)
 
     def __init__(self, data):
         """
@@ -56,6 +66,20 @@ class InstanceModel(BaseDataModel):
         self.id = hashlib.sha1(
             (str(self.created_at) + " " + str(self.user_id)).encode()
         ).hexdigest()
+        self.validation_state = data.get("validation_state", INSTANCE_STATE_VALID)
+        self.validation_message = INSTANCE_STATE_MESSAGE_DICT[self.validation_state]
+
+    def update_validation_state(self, code, message=None):
+        """
+        Method to update the validation state code and message of an instance
+
+        :param int code: validation state code for the instance
+        :param str message: the message, if it is not the default one of the state
+        :return: nothing
+        """
+        self.validation_state = code
+        self.validation_message = message or INSTANCE_STATE_MESSAGE_DICT[code]
+        super().update({})
 
     def __repr__(self):
         """
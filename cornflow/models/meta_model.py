@@ -2,14 +2,24 @@
 
 """
 # Import from libraries
+import base64
 import datetime
-from sqlalchemy import desc
-from sqlalchemy.dialects.postgresql import JSON
+import hashlib
+import json
+from functools import lru_cache
+from marshmallow import fields
+from sqlalchemy import desc, event, inspect, tuple_
 from sqlalchemy.dialects.postgresql import TEXT
 from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.orm import load_only, selectinload
 
 # Import from internal modules
-from ..shared.utils import db, hash_json_256
+from .data_blob import BlobAttribute, DataBlobModel
+from ..shared.exceptions import InvalidCursor
+from ..shared.utils import db
+
+CURSOR_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+DEFAULT_PAGE_SIZE = 10
 
 
 class EmptyModel(db.Model):
@@ -62,20 +72,36 @@ class BaseDataModel(TraceAttributes):
 
     __abstract__ = True
 
-    data = db.Column(JSON, nullable=True)
+    # the json is stored in the data_blobs table, referenced by data_hash
+    data = BlobAttribute("data_hash")
     name = db.Column(db.String(256), nullable=False)
     description = db.Column(TEXT, nullable=True)
     data_hash = db.Column(db.String(256), nullable=False)
     schema = db.Column(db.String(256), nullable=True)
 
+    # columns that identify the version of an object: one of them changes whenever the object changes
+    VERSION_COLUMNS = ("id", "updated_at", "data_hash")
+
     @declared_attr
     def user_id(cls):
         return db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
 
+    @declared_attr
+    def __table_args__(cls):
+        # indexes used by the cursor pagination of the listings
+        return (
+            db.Index("ix_{}_created_at_id".format(cls.__tablename__), "created_at", "id"),
+            db.Index(
+                "ix_{}_user_id_created_at_id".format(cls.__tablename__),
+                "user_id",
+                "created_at",
+                "id",
+            ),
+        )
+
     def __init__(self, data):
         self.user_id = data.get("user_id")
         self.data = data.get("data") or data.get("execution_results")
-        self.data_hash = hash_json_256(self.data)
         self.name = data.get("name")
         self.description = data.get("description")
         self.schema = data.get("schema")
@@ -104,6 +130,46 @@ class BaseDataModel(TraceAttributes):
         db.session.delete(self)
         db.session.commit()
 
+    def get_version(self):
+        """
+        Gets an identifier of the current version of the object, built from the columns in VERSION_COLUMNS,
+        so the json data does not need to be loaded
+
+        :return: the SHA256 hash of the version columns
+        :rtype: str
+        """
+        values = "|".join(str(getattr(self, column)) for column in self.VERSION_COLUMNS)
+        return hashlib.sha256(values.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_blob_attributes(cls):
+        """
+        :return: the attributes of the model that are stored as data blobs
+        :rtype: list(:class:`BlobAttribute`)
+        """
+        return _get_blob_attributes(cls)
+
+    @classmethod
+    def get_query_options(cls, response_schema, columns=()):
+        """
+        Builds the loading options that make a query only fetch the columns that a response schema dumps.
+        The rest of the columns (usually the heavy json ones) are deferred.
+
+        :param response_schema: marshmallow schema (class or object) used to serialize the response
+        :param columns: extra columns to load, needed by the endpoint but not dumped
+        :return: the options to pass to the query
+        :rtype: list
+        """
+        if not isinstance(response_schema, type):
+            response_schema = type(response_schema)
+        own_columns, relationships = _get_response_profile(cls, response_schema)
+        options = [load_only(*(own_columns + tuple(columns)))]
+        for name, related_columns in relationships:
+            options.append(
+                selectinload(getattr(cls, name)).load_only(*related_columns)
+            )
+        return options
+
     @classmethod
     def get_all_objects(
         cls,
@@ -112,7 +178,9 @@ class BaseDataModel(TraceAttributes):
         creation_date_gte=None,
         creation_date_lte=None,
         offset=0,
-        limit=10,
+        limit=DEFAULT_PAGE_SIZE,
+        cursor=None,
+        response_schema=None,
     ):
         """
         Query to get all objects from a user
@@ -123,10 +191,14 @@ class BaseDataModel(TraceAttributes):
         :param string creation_date_lte: created_at needs to be smaller or equal to this
         :param int offset: query offset for pagination
         :param int limit: query size limit
+        :param str cursor: cursor returned by a previous query. If given, the offset is ignored
+        :param response_schema: if given, only the columns dumped by this schema are fetched
         :return: The objects
         :rtype: list(:class:`BaseDataModel`)
         """
         query = cls.query.filter(cls.deleted_at == None)
+        if response_schema is not None:
+            query = query.options(*cls.get_query_options(response_schema))
         # TODO: in airflow they use: query = session.query(ExecutionModel)
         if not user.is_admin() and not user.is_service_user():
             query = query.filter(cls.user_id == user.id)
@@ -139,19 +211,159 @@ class BaseDataModel(TraceAttributes):
             query = query.filter(cls.created_at <= creation_date_lte)
         # if airflow they also return total_entries = query.count(), for some reason
 
-        return query.order_by(desc(cls.created_at)).offset(offset).limit(limit).all()
+        query = query.order_by(desc(cls.created_at), desc(cls.id))
+        if cursor:
+            created_at, idx = cls.decode_cursor(cursor)
+            query = query.filter(tuple_(cls.created_at, cls.id) < (created_at, idx))
+        else:
+            query = query.offset(offset)
+        return query.limit(limit).all()
+
+    @staticmethod
+    def encode_cursor(obj):
+        """
+        Builds the cursor that points to the objects created after the given one
+
+        :param obj: the last object of a page
+        :return: an opaque cursor
+        :rtype: str
+        """
+        payload = json.dumps([obj.created_at.strftime(CURSOR_DATE_FORMAT), obj.id])
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("utf-8")
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Reads a cursor built by :meth:`encode_cursor`
+
+        :param str cursor: the cursor
+        :return: the creation date and the id of the last object of the previous page
+        :rtype: Tuple(datetime, str or int)
+        """
+        try:
+            created_at, idx = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+            created_at = datetime.datetime.strptime(created_at, CURSOR_DATE_FORMAT)
+        except (ValueError, TypeError):
+            raise InvalidCursor()
+        return created_at, idx
 
     @classmethod
-    def get_one_object_from_user(cls, user, idx):
+    def get_next_cursor(cls, items, limit=DEFAULT_PAGE_SIZE):
+        """
+        Gets the cursor to the next page of a listing
+
+        :param list items: the objects of the current page
+        :param int limit: the size of the page
+        :return: the cursor or None if there are no more pages
+        :rtype: str
+        """
+        if not items or len(items) < limit:
+            return None
+        return cls.encode_cursor(items[-1])
+
+    @classmethod
+    def get_one_object_from_user(cls, user, idx, response_schema=None, columns=()):
         """
         Query to get one object from the user and the id.
 
         :param UserModel user: user object performing the query
         :param str or int idx: ID from the object to get
+        :param response_schema: if given, only the columns dumped by this schema are fetched
+        :param columns: extra columns to fetch along the ones of the response schema
         :return: The object or None if it does not exist
         :rtype: :class:`BaseDataModel`
         """
         query = cls.query.filter_by(id=idx, deleted_at=None)
+        if response_schema is not None:
+            query = query.options(*cls.get_query_options(response_schema, columns))
         if not user.is_admin() and not user.is_service_user():
             query = query.filter_by(user_id=user.id)
         return query.first()
+
+
+@event.listens_for(BaseDataModel, "before_insert", propagate=True)
+def _acquire_blobs(mapper, connection, target):
+    for blob in target.get_blob_attributes():
+        DataBlobModel.acquire(
+            connection, getattr(target, blob.hash_column), blob.get_pending_data(target)
+        )
+
+
+@event.listens_for(BaseDataModel, "before_update", propagate=True)
+def _update_blobs(mapper, connection, target):
+    state = inspect(target)
+    for blob in target.get_blob_attributes():
+        history = state.attrs[blob.hash_column].history
+        if not history.has_changes():
+            continue
+        for data_hash in history.added:
+            DataBlobModel.acquire(connection, data_hash, blob.get_pending_data(target))
+        for data_hash in history.deleted:
+            DataBlobModel.release(connection, data_hash)
+
+
+@event.listens_for(BaseDataModel, "before_delete", propagate=True)
+def _release_blobs(mapper, connection, target):
+    state = inspect(target)
+    for blob in target.get_blob_attributes():
+        # if the hash has been modified, the stored one is the one to release
+        history = state.attrs[blob.hash_column].load_history()
+        for data_hash in history.deleted or history.unchanged:
+            DataBlobModel.release(connection, data_hash)
+
+
+@lru_cache(maxsize=None)
+def _get_blob_attributes(model):
+    """
+    Gets the attributes of a model (and its parents) that are stored as data blobs
+    """
+    return [
+        value
+        for klass in model.__mro__
+        for value in vars(klass).values()
+        if isinstance(value, BlobAttribute)
+    ]
+
+
+def _get_nested_schema(field):
+    """
+    Returns the schema of a nested field (directly or inside a list)
+    """
+    if isinstance(field, fields.List):
+        field = field.inner
+    if isinstance(field, fields.Nested):
+        return field.schema
+    return None
+
+
+@lru_cache(maxsize=None)
+def _get_response_profile(model, response_schema):
+    """
+    Gets the columns of a model (and of its relationships) that a response schema dumps.
+    It is computed once per model and schema.
+
+    :param model: the model class
+    :param response_schema: the marshmallow schema class
+    :return: a tuple with the columns of the model and a tuple with the relationships and their columns
+    :rtype: Tuple(tuple, tuple)
+    """
+    mapper = inspect(model)
+    model_columns = {column.key for column in mapper.column_attrs}
+    blob_columns = {blob.name: blob.hash_column for blob in _get_blob_attributes(model)}
+    primary_keys = {mapper.get_property_by_column(c).key for c in mapper.primary_key}
+    schema = response_schema()
+    columns = set(primary_keys)
+    relationships = []
+    for name, field in schema.dump_fields.items():
+        attribute = field.attribute or name
+        # blobs are fetched when accessed, only their hash is needed
+        attribute = blob_columns.get(attribute, attribute)
+        if attribute in model_columns:
+            columns.add(attribute)
+            continue
+        nested = _get_nested_schema(field)
+        if attribute in mapper.relationships and nested is not None:
+            related = mapper.relationships[attribute].mapper.class_
+            related_columns, _ = _get_response_profile(related, type(nested))
+            relationships.append((attribute, related_columns))
+    return tuple(sorted(columns)), tuple(relationships)
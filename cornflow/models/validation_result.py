@@ -0,0 +1,90 @@
+"""
+Model used to remember the data that has already been validated against the schemas of the DAGs
+"""
+# Import from libraries
+import datetime
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+
+# Import from internal modules
+from .meta_model import EmptyModel
+from ..shared.utils import db
+
+
+class ValidationResultModel(EmptyModel):
+    """
+    Model class for the results of the validations of the instances.
+    Each row says that a json (by its hash) is valid against a version of the instance schema of a DAG,
+    so launching another execution of the same data does not validate it again.
+    Only the valid results are stored: the invalid data is validated again to get its errors.
+
+    The :class:`ValidationResultModel` has the following fields:
+
+    - **data_hash**: str, the hash of the json validated (see :class:`DataBlobModel`).
+    - **dag_name**: str, the name of the DAG.
+    - **schema_hash**: str, the hash of the jsonschema the json was validated against.
+    - **created_at**: datetime, the datetime when the json was validated (in UTC).
+    """
+
+    __tablename__ = "validation_results"
+
+    data_hash = db.Column(db.String(256), primary_key=True)
+    dag_name = db.Column(db.String(256), primary_key=True)
+    schema_hash = db.Column(db.String(256), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def __init__(self, data):
+        super().__init__()
+        self.data_hash = data.get("data_hash")
+        self.dag_name = data.get("dag_name")
+        self.schema_hash = data.get("schema_hash")
+        self.created_at = datetime.datetime.utcnow()
+
+    @staticmethod
+    def is_valid(data_hash, dag_name, schema_hash):
+        """
+        Query to know if a json has already been found valid against a schema of a DAG
+
+        :param str data_hash: the hash of the json
+        :param str dag_name: the name of the DAG
+        :param str schema_hash: the hash of the jsonschema
+        :return: True if it was found valid
+        :rtype: bool
+        """
+        found = (
+            db.session.query(ValidationResultModel.data_hash)
+            .filter_by(data_hash=data_hash, dag_name=dag_name, schema_hash=schema_hash)
+            .first()
+        )
+        return found is not None
+
+    @staticmethod
+    def add_valid(data_hash, dag_name, schema_hash):
+        """
+        Stores that a json is valid against a schema of a DAG.
+        Nothing happens if it was already stored (by another request at the same time)
+
+        :param str data_hash: the hash of the json
+        :param str dag_name: the name of the DAG
+        :param str schema_hash: the hash of the jsonschema
+        :return: nothing
+        """
+        table = ValidationResultModel.__table__
+        values = dict(
+            data_hash=data_hash,
+            dag_name=dag_name,
+            schema_hash=schema_hash,
+            created_at=datetime.datetime.utcnow(),
+        )
+        dialect = db.engine.dialect.name
+        if dialect == "postgresql":
+            statement = postgresql_insert(table).values(**values)
+            statement = statement.on_conflict_do_nothing()
+        else:
+            statement = table.insert().values(**values)
+            if dialect == "sqlite":
+                statement = statement.prefix_with("OR IGNORE")
+        db.session.execute(statement)
+        db.session.commit()
+
+    def __repr__(self):
+        return "<Validation of {} with {}>".format(self.data_hash, self.dag_name)
@@ -9,6 +9,7 @@ from marshmallow import fields, Schema
 # Import from internal modules
 from .common import QueryFilters, PatchOperation
 from .common import BaseDataEndpointResponse
+from ..shared.utils import EMPTY_DATA_HASH
 
 
 class CaseRawRequest(Schema):
@@ -28,7 +29,7 @@ class CaseListResponse(BaseDataEndpointResponse):
     updated_at = fields.DateTime()
     dependents = fields.List(fields.Int())
     is_dir = fields.Function(
-        lambda obj: obj.data is None, deserialize=lambda v: bool(v)
+        lambda obj: obj.data_hash == EMPTY_DATA_HASH, deserialize=lambda v: bool(v)
     )
     # uppername = fields.Function(lambda obj: obj.name.upper())
 
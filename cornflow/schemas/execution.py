@@ -9,6 +9,15 @@ class QueryFiltersExecution(QueryFilters):
     # status = fields.Int(required=False)
 
 
+class QueryExecutionStatus(Schema):
+    id = fields.List(fields.Str(), required=False)
+
+
+class QueryExecutionStatusWatch(Schema):
+    wait = fields.Float(required=False, validate=validate.Range(min=0))
+    state = fields.Int(required=False)
+
+
 class ConfigSchema(Schema):
     solver = fields.Str(default="PULP_CBC_CMD", required=False)
     mip = fields.Boolean(required=False)
@@ -56,6 +65,13 @@ class ExecutionRequest(Schema):
     description = fields.Str(required=False)
     instance_id = fields.Str(required=True)
     schema = fields.Str(required=False)
+    priority = fields.Int(required=False, validate=validate.Range(min=-100, max=100))
+
+
+class ExecutionBatchRequest(Schema):
+    executions = fields.List(
+        fields.Nested(ExecutionRequest), required=True, validate=validate.Length(min=1)
+    )
 
 
 class ExecutionEditRequest(Schema):
@@ -72,6 +88,19 @@ class ExecutionDagRequest(Schema):
     solution_schema = fields.Str(required=False, allow_none=True)
 
 
+class ExecutionDagProgressRequest(Schema):
+    solution = fields.Raw(required=False)
+    solution_schema = fields.Str(required=False, allow_none=True)
+    progress = fields.List(fields.Dict(), required=False)
+    log_text = fields.Str(required=False)
+
+
+class ExecutionDagProgressResponse(Schema):
+    message = fields.Str()
+    progress = fields.Int()
+    log = fields.Int()
+
+
 class ExecutionDagPostRequest(ExecutionRequest, ExecutionDagRequest):
     pass
 
@@ -90,9 +119,46 @@ class ExecutionStatusEndpointResponse(Schema):
     data_hash = fields.Str(dump_only=True)
 
 
+class ExecutionBatchItemResponse(Schema):
+    id = fields.Str()
+    instance_id = fields.Str()
+    state = fields.Int()
+    message = fields.Str()
+    error = fields.Str()
+
+
+class QueryExecutionProgress(Schema):
+    after = fields.Int(required=False, validate=validate.Range(min=0))
+    limit = fields.Int(required=False, validate=validate.Range(min=1))
+
+
+class QueryExecutionLog(Schema):
+    offset = fields.Int(required=False, validate=validate.Range(min=0))
+    length = fields.Int(required=False, validate=validate.Range(min=1))
+    tail = fields.Int(required=False, validate=validate.Range(min=1))
+
+
+class ExecutionProgressResponse(Schema):
+    position = fields.Int()
+    created_at = fields.DateTime()
+    values = fields.Raw(attribute="content")
+
+
+class ExecutionQueueResponse(Schema):
+    user_id = fields.Int()
+    pending = fields.Int()
+    running = fields.Int()
+    quota = fields.Int()
+    max_wait = fields.Float()
+    mean_wait = fields.Float()
+
+
 class ExecutionDataEndpointResponse(ExecutionDetailsEndpointResponse):
     data = fields.Raw()
 
 
 class ExecutionLogEndpointResponse(ExecutionDetailsEndpointResponse):
     log = fields.Nested(LogSchema, attribute="log_json")
+    log_size = fields.Int()
+    log_offset = fields.Int()
+    log_text = fields.Str(attribute="log_part")
@@ -1,6 +1,7 @@
-from marshmallow import fields, Schema
+from marshmallow import fields, Schema, validate
 from .execution import ExecutionSchema, ExecutionDetailsEndpointResponse
 from .common import QueryFilters, BaseDataEndpointResponse
+from ..shared.const import VALIDATION_MODE_ASYNC
 
 
 class QueryFiltersInstance(QueryFilters):
@@ -30,6 +31,14 @@ class InstanceRequest(Schema):
     schema = fields.Str(required=False)
 
 
+class QueryInstanceValidation(Schema):
+    validation_mode = fields.Str(
+        required=False,
+        data_key="validate",
+        validate=validate.OneOf([VALIDATION_MODE_ASYNC]),
+    )
+
+
 class InstanceFileRequest(Schema):
     name = fields.Str(required=True)
     description = fields.Str(required=False)
@@ -47,6 +56,8 @@ class InstanceEndpointResponse(BaseDataEndpointResponse):
 
 class InstanceDetailsEndpointResponse(InstanceEndpointResponse):
     executions = fields.List(fields.Nested(ExecutionDetailsEndpointResponse))
+    validation_state = fields.Int()
+    validation_message = fields.Str()
 
 
 class InstanceDataEndpointResponse(InstanceEndpointResponse):
@@ -0,0 +1,188 @@
+"""
+Airflow client shared by all the requests of a worker.
+It keeps a pool of keep-alive connections to the Airflow server, with timeouts and retries with backoff,
+and it remembers for a few seconds whether the server is alive and the information of each DAG,
+so launching an execution only takes the call that creates the dag run.
+"""
+# Import from libraries
+from cornflow_client.airflow.api import Airflow
+from cornflow_client.constants import AirflowError
+from flask import current_app
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+
+# answers of airflow that are worth retrying
+RETRY_STATUS = (502, 503, 504)
+
+
+class AirflowClient(Airflow):
+    """
+    Airflow client that reuses its connections
+
+    :param str url: url of the Airflow server
+    :param str user: user of the Airflow API
+    :param str pwd: password of the user
+    :param tuple timeout: seconds to wait to connect and to wait for each answer
+    :param int retries: times a failed call is retried. Only the calls that were not received
+      and the idempotent ones (not the ones that create dag runs) are retried
+    :param float backoff_factor: the retries wait {backoff factor} * 2 ^ (retry - 1) seconds
+    :param int pool_size: maximum number of connections kept open
+    :param float alive_ttl: seconds the result of the health check is used
+    :param float dag_info_ttl: seconds the information of a DAG is used
+    """
+
+    def __init__(
+        self,
+        url,
+        user,
+        pwd,
+        timeout=(5, 30),
+        retries=3,
+        backoff_factor=0.5,
+        pool_size=10,
+        alive_ttl=10,
+        dag_info_ttl=60,
+    ):
+        super().__init__(url, user, pwd)
+        self.timeout = timeout
+        self.alive_ttl = alive_ttl
+        self.dag_info_ttl = dag_info_ttl
+        self.session = requests.Session()
+        self.session.auth = self.auth
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # (checked_at, alive)
+        self.alive = None
+        # dag_name: (fetched_at, response)
+        self.dag_info = dict()
+
+    def is_alive(self):
+        """
+        Checks if the metadatabase and the scheduler of Airflow are healthy.
+        The result is kept for alive_ttl seconds
+
+        :return: True if Airflow is healthy
+        :rtype: bool
+        """
+        checked = self.alive
+        if checked is not None and time.monotonic() - checked[0] < self.alive_ttl:
+            return checked[1]
+        try:
+            response = self.session.get(self.url + "/health", timeout=self.timeout)
+            data = response.json()
+            alive = (
+                data["metadatabase"]["status"] == "healthy"
+                and data["scheduler"]["status"] == "healthy"
+            )
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            alive = False
+        self.alive = (time.monotonic(), alive)
+        return alive
+
+    def request_headers_auth(self, status=200, **kwargs):
+        def_headers = {"Content-type": "application/json", "Accept": "application/json"}
+        headers = kwargs.pop("headers", def_headers)
+        try:
+            response = self.session.request(
+                headers=headers, timeout=self.timeout, **kwargs
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # the next health check goes to the server again
+            self.alive = None
+            raise AirflowError(error="Airflow is not accessible: {}".format(e))
+        if status is None:
+            return response
+        if response.status_code != status:
+            raise AirflowError(error=response.text, status_code=response.status_code)
+        return response
+
+    def get_dag_info(self, dag_name, method="GET"):
+        """
+        Gets the information of a DAG. It is kept for dag_info_ttl seconds
+
+        :param str dag_name: the name of the DAG
+        :param str method: the method of the call
+        :return: the response of airflow
+        """
+        if method != "GET":
+            return super().get_dag_info(dag_name, method)
+        cached = self.dag_info.get(dag_name)
+        if cached is not None and time.monotonic() - cached[0] < self.dag_info_ttl:
+            return cached[1]
+        response = super().get_dag_info(dag_name)
+        self.dag_info[dag_name] = (time.monotonic(), response)
+        return response
+
+    def get_dag_runs(
+        self, dag_name, dag_run_ids, execution_date_gte=None, page_limit=100
+    ):
+        """
+        Gets some dag runs of a DAG with the batch listing of airflow.
+        The pages of the listing are fetched until all the dag runs are found
+
+        :param str dag_name: the name of the DAG
+        :param dag_run_ids: the ids of the dag runs
+        :param datetime execution_date_gte: the dag runs started before (in UTC) are not listed
+        :param int page_limit: the size of the pages
+        :return: the dag runs found, by id
+        :rtype: dict
+        """
+        pending = set(dag_run_ids)
+        dag_runs = dict()
+        payload = dict(dag_ids=[dag_name], page_offset=0, page_limit=page_limit)
+        if execution_date_gte is not None:
+            payload["execution_date_gte"] = execution_date_gte.isoformat() + "+00:00"
+        url = "{}/dags/~/dagRuns/list".format(self.url)
+        while pending:
+            response = self.request_headers_auth(method="POST", url=url, json=payload)
+            page = response.json()["dag_runs"]
+            for dag_run in page:
+                if dag_run["dag_run_id"] in pending:
+                    pending.discard(dag_run["dag_run_id"])
+                    dag_runs[dag_run["dag_run_id"]] = dag_run
+            if len(page) < page_limit:
+                break
+            payload["page_offset"] += page_limit
+        return dag_runs
+
+    def clear(self):
+        """
+        Forgets the health and the information of the DAGs, so they are asked again
+        """
+        self.alive = None
+        self.dag_info.clear()
+
+
+def get_airflow_client():
+    """
+    :return: the Airflow client of the current application
+    :rtype: :class:`AirflowClient`
+    """
+    return current_app.extensions["airflow_client"]
+
+
+def init_airflow_client(flask_app):
+    """Initialize the Airflow client shared by the requests of the worker"""
+    config = flask_app.config
+    flask_app.extensions["airflow_client"] = AirflowClient(
+        url=config["AIRFLOW_URL"] or "",
+        user=config["AIRFLOW_USER"],
+        pwd=config["AIRFLOW_PWD"],
+        timeout=(config["AIRFLOW_CONNECT_TIMEOUT"], config["AIRFLOW_TIMEOUT"]),
+        retries=config["AIRFLOW_RETRIES"],
+        backoff_factor=config["AIRFLOW_RETRY_BACKOFF"],
+        pool_size=config["AIRFLOW_POOL_SIZE"],
+        alive_ttl=config["AIRFLOW_ALIVE_TTL"],
+        dag_info_ttl=config["AIRFLOW_DAG_INFO_TTL"],
+    )
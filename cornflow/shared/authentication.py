@@ -1,11 +1,53 @@
 import datetime
-from flask import request, g, current_app
+from flask import current_app, g, has_request_context, request
 from functools import wraps
 import jwt
 
-from ..models import ApiViewModel, UserModel, UserRoleModel, PermissionViewRoleModel
-from ..shared.const import PERMISSION_METHOD_MAP
+from ..models import CacheVersionModel, UserModel, UserRoleModel
+from ..shared.cache import TTLCache
+from ..shared.const import ADMIN_ROLE, PERMISSION_METHOD_MAP, SERVICE_ROLE
 from ..shared.exceptions import InvalidCredentials, ObjectDoesNotExist, NoPermission
+from ..shared.permissions import get_permission_matrix
+
+# name of the version counter of the identity of each user
+IDENTITY_CACHE = "identity-{}"
+
+
+class Identity:
+    """
+    The authenticated user of a request with its roles already resolved.
+    It is loaded once per request (and cached for a short time per user and version) so the decorator,
+    the endpoints and the model queries do not need to ask the database again.
+
+    :param int user_id: the id of the user
+    :param str username: the username of the user
+    :param role_ids: the ids of the roles assigned to the user
+    """
+
+    def __init__(self, user_id, username, role_ids):
+        self.id = user_id
+        self.username = username
+        self.role_ids = frozenset(role_ids)
+
+    @classmethod
+    def from_user(cls, user):
+        """
+        Creates the identity of a user, loading its roles
+
+        :param UserModel user: the user
+        :rtype: :class:`Identity`
+        """
+        user_roles = UserRoleModel.get_one_user(user_id=user.id)
+        return cls(user.id, user.username, [ur.role_id for ur in user_roles])
+
+    def is_admin(self):
+        return ADMIN_ROLE in self.role_ids
+
+    def is_service_user(self):
+        return SERVICE_ROLE in self.role_ids
+
+    def __repr__(self):
+        return "<Identity {}>".format(self.id)
 
 
 class Auth:
@@ -85,22 +127,48 @@ class Auth:
         return user
 
     @staticmethod
-    def get_permission_for_request(req, user_id):
-        method, url = Auth.get_request_info(req)
-        user_role = UserRoleModel.get_one_user(user_id=user_id)
-        if user_role is None:
-            raise NoPermission("You do not have permission to access this endpoint")
+    def get_request_identity(req):
+        """
+        returns the identity of the user of the request. It is only resolved once per request.
 
-        action_id = PERMISSION_METHOD_MAP[method]
-        view_id = ApiViewModel.query.filter_by(url_rule=url).first().id
+        :return: the identity of the user
+        :rtype: :class:`Identity`
+        """
+        identity = g.get("identity")
+        if identity is None:
+            identity = Auth.get_identity_from_header(req.headers)
+            g.identity = identity
+        return identity
 
-        for role in user_role:
-            has_permission = PermissionViewRoleModel.get_permission(
-                role.role_id, view_id, action_id
-            )
+    @staticmethod
+    def get_identity_from_header(headers):
+        """
+        returns the identity of the user from the headers of the request.
+        The identity is cached by the id of the user and the version of its identity for a short time,
+        so the changes made through any worker (see :func:`invalidate_identity`) are seen by all of them.
 
-            if has_permission:
-                return True
+        :return: the identity of the user
+        :rtype: :class:`Identity`
+        """
+        token = Auth.get_token_from_header(headers)
+        user_id = Auth.decode_token(token)["user_id"]
+        version = CacheVersionModel.get_version(IDENTITY_CACHE.format(user_id))
+        cache = get_identity_cache()
+        identity = cache.get((user_id, version))
+        if identity is None:
+            user = UserModel.get_one_user(user_id)
+            if user is None:
+                raise ObjectDoesNotExist("User does not exist, invalid token")
+            identity = Identity.from_user(user)
+            cache.set((user_id, version), identity)
+        return identity
+
+    @staticmethod
+    def get_permission_for_request(req, identity):
+        method, url = Auth.get_request_info(req)
+        action_id = PERMISSION_METHOD_MAP[method]
+        if get_permission_matrix().has_permission(identity.role_ids, url, action_id):
+            return True
 
         raise NoPermission("You do not have permission to access this endpoint")
 
@@ -115,9 +183,8 @@ class Auth:
 
         @wraps(func)
         def decorated_user(*args, **kwargs):
-            user = Auth.get_user_obj_from_header(request.headers)
-            Auth.get_permission_for_request(request, user.id)
-            g.user = {"id": user.id}
+            identity = Auth.get_request_identity(request)
+            Auth.get_permission_for_request(request, identity)
             return func(*args, **kwargs)
 
         return decorated_user
@@ -126,3 +193,38 @@ class Auth:
     def return_user_from_token(token):
         user_id = Auth.decode_token(token)["user_id"]
         return user_id
+
+
+def get_identity_cache():
+    """
+    :return: the cache of identities of the current application
+    :rtype: :class:`TTLCache`
+    """
+    return current_app.extensions["identity_cache"]
+
+
+def invalidate_identity(user_id):
+    """
+    Marks the identity of a user as changed, so every worker loads it again.
+    It has to be called after its roles change or it gets deleted.
+
+    :param int user_id: the id of the user
+    """
+    CacheVersionModel.bump(IDENTITY_CACHE.format(user_id))
+    if has_request_context():
+        identity = g.get("identity")
+        if identity is not None and identity.id == user_id:
+            g.pop("identity")
+
+
+def init_identity_cache(flask_app):
+    """Initialize the cache of the identities of the users"""
+    flask_app.extensions["identity_cache"] = TTLCache(
+        maxsize=flask_app.config["IDENTITY_CACHE_SIZE"],
+        ttl=flask_app.config["IDENTITY_CACHE_TTL"],
+    )
+
+    @flask_app.teardown_request
+    def forget_identity(exception=None):
+        # the application context (and g) outlives the request when it was pushed before it
+        g.pop("identity", None)
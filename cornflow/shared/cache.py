@@ -0,0 +1,136 @@
+"""
+Simple in-process caches shared by the workers' requests
+"""
+# Import from libraries
+from collections import OrderedDict
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread safe LRU cache where each entry expires after some time.
+
+    :param int maxsize: maximum number of entries stored. The least recently used one gets discarded when full.
+    :param float ttl: seconds an entry is valid. If 0, nothing gets stored.
+    """
+
+    def __init__(self, maxsize=1000, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for the key if it has not expired
+
+        :param key: the key of the entry
+        :param default: the value returned if the entry does not exist or has expired
+        :return: the value stored
+        """
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Stores a value for the key
+
+        :param key: the key of the entry
+        :param value: the value to store
+        """
+        if not self.ttl or not self.maxsize:
+            return
+        with self.lock:
+            self.data[key] = (time.monotonic() + self.ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Removes the entry for the key, if it exists
+
+        :param key: the key of the entry
+        """
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all the entries
+        """
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class BytesCache:
+    """
+    Thread safe LRU cache of bytes values, limited by the total size of the values stored.
+
+    :param int max_bytes: maximum size of all the values stored. The least recently used ones get discarded when full.
+      Values bigger than this are never stored. If 0, nothing gets stored.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for the key
+
+        :param key: the key of the entry
+        :param default: the value returned if the entry does not exist
+        :return: the value stored
+        :rtype: bytes
+        """
+        with self.lock:
+            value = self.data.get(key)
+            if value is None:
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Stores a value for the key
+
+        :param key: the key of the entry
+        :param bytes value: the value to store
+        """
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            old_value = self.data.pop(key, None)
+            if old_value is not None:
+                self.size -= len(old_value)
+            self.data[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, discarded = self.data.popitem(last=False)
+                self.size -= len(discarded)
+
+    def clear(self):
+        """
+        Removes all the entries
+        """
+        with self.lock:
+            self.data.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.data)
@@ -1,6 +1,16 @@
 import functools
-from flask import after_this_request, current_app
+import zlib
+
+import brotli
+from flask import after_this_request, current_app, request, Response
 from flask_compress import Compress
+from flask_restful.representations.json import output_json
+
+from .cache import BytesCache
+from .streaming import stream_json
+
+# encodings of the payloads that are kept in the cache
+CACHED_ALGORITHMS = ["br", "gzip"]
 
 
 def compressed(f):
@@ -19,11 +29,216 @@ def compressed(f):
     return view_func
 
 
+def _choose_algorithm():
+    """
+    :return: the encoding accepted by the client or None if it does not accept compressed responses
+    :rtype: str
+    """
+    algorithms = current_app.config["COMPRESS_ALGORITHM"]
+    if isinstance(algorithms, str):
+        algorithms = [algorithm.strip() for algorithm in algorithms.split(",")]
+    # the best quality given by the client wins, ties are solved with the order of the config
+    best, best_quality = None, 0
+    for algorithm in algorithms:
+        quality = request.accept_encodings.quality(algorithm)
+        if quality > best_quality:
+            best, best_quality = algorithm, quality
+    return best
+
+
+def _get_compressor(algorithm, config):
+    """
+    Creates an incremental compressor with the levels set in the configuration of flask_compress
+
+    :param str algorithm: the encoding: br, gzip or deflate
+    :param config: the configuration of the application
+    :return: the function that compresses each chunk and the one that returns the end of the compressed content
+    :rtype: Tuple(Callable, Callable)
+    """
+    if algorithm == "br":
+        compressor = brotli.Compressor(
+            mode=config["COMPRESS_BR_MODE"],
+            quality=config["COMPRESS_BR_LEVEL"],
+            lgwin=config["COMPRESS_BR_WINDOW"],
+            lgblock=config["COMPRESS_BR_BLOCK"],
+        )
+        return compressor.process, compressor.finish
+    if algorithm == "gzip":
+        compressor = zlib.compressobj(
+            config["COMPRESS_LEVEL"], zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+    else:
+        compressor = zlib.compressobj(config["COMPRESS_DEFLATE_LEVEL"])
+    return compressor.compress, compressor.flush
+
+
+def _iter_compressed(chunks, algorithm, config):
+    """
+    Compresses some content chunk by chunk
+
+    :param chunks: the chunks of the content
+    :param str algorithm: the encoding: br, gzip or deflate
+    :param config: the configuration of the application
+    :return: the chunks of the compressed content
+    :rtype: Iterator[bytes]
+    """
+    process, finish = _get_compressor(algorithm, config)
+    for chunk in chunks:
+        compressed_chunk = process(chunk)
+        if compressed_chunk:
+            yield compressed_chunk
+    yield finish()
+
+
+def _compress(content, algorithm):
+    """
+    Compresses some content with the levels set in the configuration of flask_compress
+
+    :param bytes content: the content to compress
+    :param str algorithm: the encoding: br, gzip or deflate
+    :return: the compressed content
+    :rtype: bytes
+    """
+    return b"".join(_iter_compressed([content], algorithm, current_app.config))
+
+
+def _iter_and_cache(chunks, cache, key):
+    """
+    Sends the chunks of a compressed payload and keeps the whole payload in the cache once sent.
+    The chunks are only kept while they fit in the cache.
+
+    :param chunks: the chunks of the compressed payload
+    :param cache: the cache of compressed payloads
+    :param key: the key of the payload in the cache
+    :return: the same chunks
+    :rtype: Iterator[bytes]
+    """
+    kept, size = [], 0
+    for chunk in chunks:
+        if kept is not None:
+            size += len(chunk)
+            if size <= cache.max_bytes:
+                kept.append(chunk)
+            else:
+                kept = None
+        yield chunk
+    if kept is not None:
+        cache.set(key, b"".join(kept))
+
+
+def _get_cached_algorithm():
+    """
+    :return: the encoding accepted by the client, if its payloads are cached
+    :rtype: str
+    """
+    algorithm = _choose_algorithm()
+    if algorithm in CACHED_ALGORITHMS:
+        return algorithm
+    return None
+
+
+def get_cached_response(key):
+    """
+    Gets the response with the payload stored for a key, already compressed with the encoding accepted by the client
+
+    :param key: the key of the payload. It has to change whenever the payload changes
+    :return: the response or None if the payload has not been cached for the encoding accepted by the client
+    :rtype: :class:`Response`
+    """
+    algorithm = _get_cached_algorithm()
+    if algorithm is None:
+        return None
+    content = current_app.extensions["compressed_payloads"].get((key, algorithm))
+    if content is None:
+        return None
+    response = current_app.response_class(content, mimetype="application/json")
+    response.headers["Content-Encoding"] = algorithm
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def _compress_and_cache(key, response):
+    """
+    Compresses a response (if the client accepts it) and keeps the compressed content in the cache
+    """
+    response.headers["Vary"] = "Accept-Encoding"
+    algorithm = _choose_algorithm()
+    if algorithm is None or not 200 <= response.status_code < 300:
+        return response
+    content = response.get_data()
+    if len(content) < current_app.config["COMPRESS_MIN_SIZE"]:
+        return response
+    content = _compress(content, algorithm)
+    response.set_data(content)
+    response.headers["Content-Encoding"] = algorithm
+    if algorithm in CACHED_ALGORITHMS:
+        current_app.extensions["compressed_payloads"].set((key, algorithm), content)
+    return response
+
+
+def cache_response(key, payload, code=200):
+    """
+    Serializes and compresses a payload (if the client accepts it) and keeps the compressed content in the cache
+
+    :param key: the key of the payload. It has to change whenever the payload changes
+    :param payload: the json payload of the response
+    :param int code: the status code of the response
+    :return: the response
+    :rtype: :class:`Response`
+    """
+    response = output_json(payload, code)
+    response.mimetype = "application/json"
+    return _compress_and_cache(key, response)
+
+
+def cached_compressed(schema):
+    """
+    Decorator for the views that return an object with big json data.
+    The object gets serialized with the schema and compressed only once per version of the object:
+    the compressed payload is cached and sent again to the clients that accept the same encoding.
+    The json data of the object is streamed from its stored blobs (see :func:`stream_json`)
+    and compressed chunk by chunk as it is sent, so the whole payload is never built in memory
+    (only the compressed one, while it fits in the cache).
+
+    :param schema: the marshmallow schema used to serialize the object
+    """
+
+    def decorator(f):
+        @functools.wraps(f)
+        def view_func(*args, **kwargs):
+            obj = f(*args, **kwargs)
+            if obj is None or isinstance(obj, Response):
+                return obj
+            key = (request.endpoint, obj.get_version())
+            response = get_cached_response(key)
+            if response is not None:
+                return response
+            content = stream_json(obj, schema)
+            algorithm = _choose_algorithm()
+            if algorithm is not None:
+                content = _iter_compressed(content, algorithm, current_app.config)
+            if algorithm in CACHED_ALGORITHMS:
+                cache = current_app.extensions["compressed_payloads"]
+                content = _iter_and_cache(content, cache, (key, algorithm))
+            response = current_app.response_class(content, mimetype="application/json")
+            response.headers["Vary"] = "Accept-Encoding"
+            if algorithm is not None:
+                response.headers["Content-Encoding"] = algorithm
+            return response
+
+        return view_func
+
+    return decorator
+
+
 def init_compress(flask_app):
-    """Initialize flask_compress extension"""
+    """Initialize flask_compress extension and the cache of compressed payloads"""
     flask_app.config[
         "COMPRESS_REGISTER"
     ] = False  # disable default compression of all eligible requests
 
     compress = Compress(app=flask_app)
     flask_app.extensions["compress"] = compress
+    flask_app.extensions["compressed_payloads"] = BytesCache(
+        flask_app.config["COMPRESS_PAYLOAD_CACHE_SIZE"]
+    )
@@ -12,6 +12,8 @@ EXEC_STATE_ERROR_START = -3
 EXEC_STATE_NOT_RUN = -4
 EXEC_STATE_UNKNOWN = -5
 EXEC_STATE_SAVING = -6
+EXEC_STATE_QUEUED = -7
+EXEC_STATE_PENDING = -8
 
 EXECUTION_STATE_MESSAGE_DICT = {
     EXEC_STATE_CORRECT: "The execution has been solved correctly.",
@@ -23,6 +25,62 @@ EXECUTION_STATE_MESSAGE_DICT = {
     EXEC_STATE_UNKNOWN: "The execution has an unknown error.",
     EXEC_STATE_SAVING: "The execution executed ok but failed while saving it.",
     EXEC_STATE_MANUAL: "The execution was loaded manually.",
+    EXEC_STATE_QUEUED: "The execution is waiting for its instance to be validated.",
+    EXEC_STATE_PENDING: "The execution is waiting for its turn to run.",
+}
+
+# the changes of state allowed for the executions, by current state. The rest are refused:
+# a late poll of the status of a finished execution cannot set it back to running.
+# The executions are created running, and the states not listed are final
+EXECUTION_STATE_TRANSITIONS = {
+    EXEC_STATE_RUNNING: [
+        EXEC_STATE_RUNNING,
+        EXEC_STATE_CORRECT,
+        EXEC_STATE_ERROR,
+        EXEC_STATE_STOPPED,
+        EXEC_STATE_ERROR_START,
+        EXEC_STATE_NOT_RUN,
+        EXEC_STATE_UNKNOWN,
+        EXEC_STATE_SAVING,
+        EXEC_STATE_QUEUED,
+        EXEC_STATE_PENDING,
+    ],
+    EXEC_STATE_UNKNOWN: [
+        EXEC_STATE_RUNNING,
+        EXEC_STATE_CORRECT,
+        EXEC_STATE_ERROR,
+        EXEC_STATE_STOPPED,
+        EXEC_STATE_UNKNOWN,
+        EXEC_STATE_SAVING,
+    ],
+    # the executions that were not run can still be run from airflow, and write their results
+    EXEC_STATE_NOT_RUN: [
+        EXEC_STATE_RUNNING,
+        EXEC_STATE_CORRECT,
+        EXEC_STATE_ERROR,
+        EXEC_STATE_STOPPED,
+        EXEC_STATE_UNKNOWN,
+        EXEC_STATE_SAVING,
+    ],
+    EXEC_STATE_QUEUED: [
+        EXEC_STATE_RUNNING,
+        EXEC_STATE_PENDING,
+        EXEC_STATE_ERROR_START,
+        EXEC_STATE_STOPPED,
+    ],
+    EXEC_STATE_PENDING: [EXEC_STATE_RUNNING, EXEC_STATE_ERROR_START, EXEC_STATE_STOPPED],
+    EXEC_STATE_SAVING: [
+        EXEC_STATE_CORRECT,
+        EXEC_STATE_ERROR,
+        EXEC_STATE_SAVING,
+        EXEC_STATE_STOPPED,
+    ],
+}
+# the DAGs can also write the results of the executions that were set as failed while they ran
+# (by a check of the state that did not find their dag run), like when airflow retries them
+DAG_STATE_TRANSITIONS = {
+    **EXECUTION_STATE_TRANSITIONS,
+    EXEC_STATE_ERROR: [EXEC_STATE_CORRECT, EXEC_STATE_ERROR],
 }
 
 # derived constants
@@ -34,6 +92,24 @@ AIRFLOW_TO_STATE_MAP = dict(
     success=EXEC_STATE_CORRECT, running=EXEC_STATE_RUNNING, failed=EXEC_STATE_ERROR
 )
 
+# backends that run the executions
+EXECUTOR_AIRFLOW = "airflow"
+EXECUTOR_LOCAL = "local"
+
+# validation states for instances table
+INSTANCE_STATE_VALID = 1
+INSTANCE_STATE_QUEUED = 0
+INSTANCE_STATE_INVALID = -1
+
+INSTANCE_STATE_MESSAGE_DICT = {
+    INSTANCE_STATE_VALID: "The instance is valid.",
+    INSTANCE_STATE_QUEUED: "The instance is waiting to be validated.",
+    INSTANCE_STATE_INVALID: "The instance does not fit its schema.",
+}
+
+# validation mode of the instances that run it in the background (?validate=async)
+VALIDATION_MODE_ASYNC = "async"
+
 AUTH_DB = 1
 AUTH_LDAP = 2
 
@@ -97,4 +173,11 @@ EXTRA_PERMISSION_ASSIGNATION = [
     (VIEWER_ROLE, PUT_ACTION, "user-detail"),
     (PLANNER_ROLE, POST_ACTION, "dag-manual"),
     (SERVICE_ROLE, POST_ACTION, "dag-manual"),
+    (SERVICE_ROLE, POST_ACTION, "dag-progress"),
 ]
+
+# header with the cursor to the next page of a listing
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# mimetype of the logs of the executions streamed as text
+LOG_MIMETYPE = "text/plain"
@@ -0,0 +1,117 @@
+"""
+Conditional requests on the data endpoints.
+The responses carry a strong ETag built from the version of the objects (see :meth:`BaseDataModel.get_version`),
+so the clients that already have the payload get a 304 answer without the data being loaded.
+The 304 answers carry the same caching headers as the full responses, so a shared cache keeps each encoding apart.
+"""
+# Import from libraries
+import functools
+import hashlib
+from flask import after_this_request, current_app, request
+
+# the clients (and shared caches) have to revalidate the stored payloads with the ETag before using them
+CACHE_CONTROL = "no-cache"
+
+
+def get_etag(*versions):
+    """
+    Builds the ETag of a response from the versions of the objects it contains
+
+    :param str versions: the versions of the objects
+    :return: the ETag (without quotes)
+    :rtype: str
+    """
+    if len(versions) == 1:
+        return versions[0]
+    return hashlib.sha256("|".join(versions).encode("utf-8")).hexdigest()
+
+
+def _get_matching_etag(etag):
+    """
+    :param str etag: the ETag of the response
+    :return: the ETag in If-None-Match (with the encoding appended, if any) that matches the response, or None
+    :rtype: str
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return etag
+    for tag in if_none_match.as_set(include_weak=True):
+        if tag.split(":")[0] == etag:
+            return tag
+    return None
+
+
+def is_not_modified(etag):
+    """
+    Checks if the client already has the version of the response identified by the ETag.
+    Any content encoding appended to the ETags sent by the client (as in "etag:gzip") is ignored.
+
+    :param str etag: the ETag of the response
+    :return: True if one of the ETags in If-None-Match matches
+    :rtype: bool
+    """
+    return _get_matching_etag(etag) is not None
+
+
+def _set_cache_headers(response):
+    """
+    Adds the headers shared by the full and the 304 responses.
+    The ETag depends on the encoding of the response, so the response varies with Accept-Encoding.
+    """
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+
+
+def not_modified_response(etag):
+    """
+    :param str etag: the ETag of the response
+    :return: an empty 304 response, with the ETag of the encoding the client has and the caching headers
+    :rtype: :class:`Response`
+    """
+    response = current_app.response_class(status=304)
+    response.set_etag(_get_matching_etag(etag) or etag)
+    _set_cache_headers(response)
+    return response
+
+
+def set_etag(etag):
+    """
+    Adds the ETag to the response of the current request once it is built.
+    If the response is compressed, its encoding gets appended, so each encoding has its own ETag.
+
+    :param str etag: the ETag of the response
+    """
+
+    def add_etag(response):
+        if response.status_code != 200 or "ETag" in response.headers:
+            return response
+        encoding = response.headers.get("Content-Encoding")
+        if encoding is not None:
+            etag_encoded = "{}:{}".format(etag, encoding)
+        else:
+            etag_encoded = etag
+        response.set_etag(etag_encoded)
+        _set_cache_headers(response)
+        return response
+
+    after_this_request(add_etag)
+
+
+def with_etag(f):
+    """
+    Decorator for the views that return a model object: the response gets the version of the object as ETag
+    and the clients that send it in If-None-Match get a 304 answer
+    """
+
+    @functools.wraps(f)
+    def view_func(*args, **kwargs):
+        obj = f(*args, **kwargs)
+        if obj is None:
+            return obj
+        etag = get_etag(obj.get_version())
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        set_etag(etag)
+        return obj
+
+    return view_func
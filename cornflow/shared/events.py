@@ -0,0 +1,210 @@
+"""
+Push of the changes of state of the executions to the clients that watch them (long-poll and server-sent events).
+Each worker has a hub where the clients wait. It gets notified right away of the changes committed by the worker,
+and a single thread reads from the database the states of all the executions being watched, every
+STATUS_POLL_INTERVAL seconds, so the changes made by other workers reach the clients too.
+Watching an execution never calls airflow.
+"""
+# Import from libraries
+from collections import Counter
+from flask import current_app, has_app_context
+import json
+import logging as log
+from sqlalchemy import event, inspect
+import threading
+import time
+
+# Import from internal modules
+from ..models import ExecutionModel
+from ..models.execution import record_states
+from .const import (
+    EXEC_STATE_PENDING,
+    EXEC_STATE_QUEUED,
+    EXEC_STATE_RUNNING,
+    EXEC_STATE_UNKNOWN,
+    EXECUTION_STATE_MESSAGE_DICT,
+)
+from .utils import db
+
+SSE_MIMETYPE = "text/event-stream"
+# seconds between the comments sent to keep the event streams open
+SSE_HEARTBEAT = 15
+# the states that can still change
+WATCHED_STATES = [
+    EXEC_STATE_RUNNING,
+    EXEC_STATE_UNKNOWN,
+    EXEC_STATE_QUEUED,
+    EXEC_STATE_PENDING,
+]
+
+
+class ExecutionStateHub:
+    """
+    Latest state of the executions that the clients of the worker are watching
+
+    :param app: the flask application, used by the thread that reads the database
+    :param float poll_interval: seconds between reads of the database
+    """
+
+    def __init__(self, app, poll_interval=2):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.condition = threading.Condition()
+        # execution id: state
+        self.states = dict()
+        # execution id: number of clients waiting
+        self.watchers = Counter()
+        self.poller = None
+
+    def publish(self, execution_id, state):
+        """
+        Notifies the clients watching an execution of its state
+
+        :param str execution_id: ID of the execution
+        :param int state: the state of the execution
+        """
+        with self.condition:
+            if execution_id not in self.watchers:
+                return
+            if self.states.get(execution_id) != state:
+                self.states[execution_id] = state
+                self.condition.notify_all()
+
+    def wait(self, execution_id, state, timeout):
+        """
+        Waits until the state of an execution changes
+
+        :param str execution_id: ID of the execution
+        :param int state: the state of the execution known by the client
+        :param float timeout: maximum number of seconds to wait
+        :return: the new state or None if it did not change in time
+        :rtype: int
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.watchers[execution_id] += 1
+            self._start_poller()
+            try:
+                while True:
+                    current = self.states.get(execution_id)
+                    if current is not None and current != state:
+                        return current
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self.condition.wait(remaining)
+            finally:
+                self.watchers[execution_id] -= 1
+                if self.watchers[execution_id] <= 0:
+                    del self.watchers[execution_id]
+                    self.states.pop(execution_id, None)
+
+    def _start_poller(self):
+        if self.poller is None:
+            self.poller = threading.Thread(target=self._poll, daemon=True)
+            self.poller.start()
+
+    def _poll(self):
+        while True:
+            with self.condition:
+                ids = list(self.watchers)
+                if not ids:
+                    self.poller = None
+                    return
+            try:
+                with self.app.app_context():
+                    rows = (
+                        db.session.query(ExecutionModel.id, ExecutionModel.state)
+                        .filter(ExecutionModel.id.in_(ids))
+                        .all()
+                    )
+            except Exception as e:
+                log.warning("The states of the executions could not be read: {}".format(e))
+                rows = []
+            for execution_id, state in rows:
+                self.publish(execution_id, state)
+            time.sleep(self.poll_interval)
+
+
+def get_state_hub():
+    """
+    :return: the hub of the states of the executions of the current application
+    :rtype: :class:`ExecutionStateHub`
+    """
+    return current_app.extensions["execution_states"]
+
+
+def _format_event(execution_id, state):
+    data = dict(
+        id=execution_id, state=state, message=EXECUTION_STATE_MESSAGE_DICT[state]
+    )
+    return "event: state\ndata: {}\n\n".format(json.dumps(data)).encode("utf-8")
+
+
+def stream_states(execution, max_duration):
+    """
+    Builds a response with the server-sent events of the changes of state of an execution.
+    The stream ends when the execution finishes or after max_duration seconds
+
+    :param ExecutionModel execution: the execution
+    :param float max_duration: maximum number of seconds the stream is kept open
+    :return: the streamed response
+    :rtype: :class:`Response`
+    """
+    hub = get_state_hub()
+    execution_id = execution.id
+    state = execution.state
+
+    def generate():
+        deadline = time.monotonic() + max_duration
+        current = state
+        yield _format_event(execution_id, current)
+        while current in WATCHED_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            new = hub.wait(execution_id, current, min(SSE_HEARTBEAT, remaining))
+            if new is None:
+                yield b": keep-alive\n\n"
+                continue
+            current = new
+            yield _format_event(execution_id, current)
+
+    response = current_app.response_class(generate(), mimetype=SSE_MIMETYPE)
+    response.headers["Cache-Control"] = "no-cache"
+    # so the proxies do not buffer the events
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_states(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, ExecutionModel):
+            continue
+        if inspect(obj).attrs.state.history.has_changes():
+            record_states(session, {obj.id: obj.state})
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_states(session):
+    states = session.info.pop("execution_states", None)
+    if not states or not has_app_context():
+        return
+    hub = current_app.extensions.get("execution_states")
+    if hub is None:
+        return
+    for execution_id, state in states.items():
+        hub.publish(execution_id, state)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_states(session):
+    session.info.pop("execution_states", None)
+
+
+def init_state_hub(flask_app):
+    """Initialize the hub where the clients wait for the changes of state of the executions"""
+    flask_app.extensions["execution_states"] = ExecutionStateHub(
+        flask_app, flask_app.config["STATUS_POLL_INTERVAL"]
+    )
@@ -45,6 +45,21 @@ class InvalidPatch(InvalidUsage):
     error = "The json patch sent is not valid"
 
 
+class InvalidCursor(InvalidUsage):
+    status_code = 400
+    error = "The pagination cursor sent is not valid"
+
+
+class PayloadTooLarge(InvalidUsage):
+    status_code = 413
+    error = "The data sent is too large"
+
+
+class InvalidStateTransition(InvalidUsage):
+    status_code = 409
+    error = "The state of the execution cannot be changed"
+
+
 def _initialize_errorhandlers(app):
     @app.errorhandler(InvalidUsage)
     @app.errorhandler(ObjectDoesNotExist)
@@ -54,6 +69,9 @@ def _initialize_errorhandlers(app):
     @app.errorhandler(AirflowError)
     @app.errorhandler(InvalidData)
     @app.errorhandler(InvalidPatch)
+    @app.errorhandler(InvalidCursor)
+    @app.errorhandler(PayloadTooLarge)
+    @app.errorhandler(InvalidStateTransition)
     def handle_invalid_usage(error):
         response = jsonify(error.to_dict())
         response.status_code = error.status_code
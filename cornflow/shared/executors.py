@@ -0,0 +1,392 @@
+"""
+Backends that run the executions once they have been validated:
+
+- airflow: creates a dag run of the DAG of the execution, that asks cornflow for the data and writes back the solution.
+- local: runs the solve function of the DAG (a callable like model_functions.solve, that takes the data and the
+  config and returns the solution, the log and the log as a json) inside cornflow,
+  in a queue by priority with a bounded number of executions running at the same time.
+  It avoids the latency of airflow for the small models.
+  The functions run in a pool of processes by default. They can run in threads of the worker instead,
+  but not with the gevent workers of gunicorn: there the threads are greenlets, so a solver blocks every request
+  of the worker and gunicorn kills the worker when it does not answer in time.
+  The queue is kept in memory: the executions waiting when the worker stops are not run.
+  While an execution is in the queue its updated_at is moved every LOCAL_EXECUTOR_HEARTBEAT seconds,
+  so the reconciler can tell the ones lost by a worker that stopped (see :func:`expire_local_executions`).
+
+The backend used for the new executions is EXECUTOR_BACKEND. Each execution keeps the backend that runs it,
+so it can be cancelled.
+"""
+# Import from libraries
+from concurrent.futures import ProcessPoolExecutor
+from cornflow_client.airflow.api import validate_and_continue
+from cornflow_client.constants import SOLUTION_SCHEMA
+from flask import current_app
+import importlib
+import itertools
+import logging as log
+import queue
+import threading
+import time
+
+# Import from internal modules
+from ..models import ExecutionModel
+from .airflow import get_airflow_client
+from .const import (
+    EXEC_STATE_CORRECT,
+    EXEC_STATE_ERROR,
+    EXEC_STATE_ERROR_START,
+    EXEC_STATE_RUNNING,
+    EXECUTION_STATE_MESSAGE_DICT,
+    EXECUTOR_AIRFLOW,
+    EXECUTOR_LOCAL,
+)
+from .exceptions import AirflowError, InvalidData, InvalidUsage
+from .schema_registry import get_schema
+from .utils import db
+
+
+def _fail_to_start(
+    execution, error, state=EXEC_STATE_ERROR_START, exception=AirflowError
+):
+    log.error(error)
+    execution.update_state(state)
+    raise exception(
+        error=error,
+        payload=dict(message=EXECUTION_STATE_MESSAGE_DICT[state], state=state),
+    )
+
+
+class AirflowExecutor:
+    """
+    Runs the executions as dag runs of airflow
+    """
+
+    name = EXECUTOR_AIRFLOW
+
+    def check(self, execution):
+        """
+        Checks that airflow is alive and that the DAG of the execution exists and is not paused.
+        If it is not possible to run the execution, its state is updated and an error is raised
+
+        :param ExecutionModel execution: the execution
+        :return: nothing
+        """
+        af_client = get_airflow_client()
+        if not af_client.is_alive():
+            _fail_to_start(execution, "Airflow is not accessible")
+        # ask airflow if dag_name exists
+        info = af_client.get_dag_info(execution.schema).json()
+        if info["is_paused"]:
+            _fail_to_start(execution, "The dag exists but it is paused in airflow")
+
+    def launch(self, execution, instance):
+        """
+        Creates the dag run of an execution
+
+        :param ExecutionModel execution: the execution, already checked
+        :param InstanceModel instance: the instance it solves
+        :return: nothing
+        """
+        try:
+            response = get_airflow_client().run_dag(
+                execution.id, dag_name=execution.schema
+            )
+        except AirflowError as err:
+            _fail_to_start(
+                execution,
+                "Airflow responded with an error: {}".format(err),
+                state=EXEC_STATE_ERROR,
+            )
+
+        # if we succeed, we register the dag_run_id in the execution table,
+        # even if the state changes meanwhile, so the dag run can be stopped
+        af_data = response.json()
+        execution.update(dict(dag_run_id=af_data["dag_run_id"], executor=self.name))
+        execution.update_state(EXEC_STATE_RUNNING)
+
+    def cancel(self, execution):
+        """
+        Sets the dag run of an execution to failed
+
+        :param ExecutionModel execution: the execution
+        :return: nothing
+        """
+        af_client = get_airflow_client()
+        if not af_client.is_alive():
+            raise AirflowError(error="Airflow is not accessible")
+        af_client.set_dag_run_to_fail(
+            dag_name=execution.schema, dag_run_id=execution.dag_run_id
+        )
+
+
+class LocalExecutor:
+    """
+    Runs the solve functions of the DAGs inside cornflow
+
+    :param app: the flask application, where the results are written
+    :param dict functions: the solve function of each DAG, by DAG name
+    :param int max_workers: the number of executions that run at the same time
+    :param bool processes: if True, the functions run in a pool of processes instead of in the threads of the queue.
+      The threads cannot be used with gevent (see :func:`init_executors`)
+    :param float heartbeat: seconds between the marks of the executions in the queue as alive
+    """
+
+    name = EXECUTOR_LOCAL
+
+    def __init__(
+        self, app, functions=None, max_workers=2, processes=False, heartbeat=60
+    ):
+        self.app = app
+        self.functions = dict(functions or dict())
+        self.max_workers = max_workers
+        self.heartbeat = heartbeat
+        self.heartbeat_thread = None
+        self.process_pool = ProcessPoolExecutor(max_workers) if processes else None
+        # (-priority, order, execution id, dag name, data, config)
+        self.queue = queue.PriorityQueue()
+        self.order = itertools.count()
+        self.lock = threading.Lock()
+        # the executions waiting in the queue or running, and the ones of them cancelled
+        self.in_flight = set()
+        self.cancelled = set()
+        self.threads = []
+        self.listeners = []
+
+    def register(self, dag_name, function):
+        """
+        Sets the solve function of a DAG
+
+        :param str dag_name: the name of the DAG
+        :param function: a function that takes the data and the config and returns
+          the solution, the log and the log as a json
+        """
+        self.functions[dag_name] = function
+
+    def add_listener(self, function):
+        """
+        Adds a function that is called (without arguments) each time an execution ends
+
+        :param function: the function
+        """
+        self.listeners.append(function)
+
+    def check(self, execution):
+        """
+        Checks that there is a solve function for the DAG of the execution.
+        If there is not, its state is updated and an error is raised
+
+        :param ExecutionModel execution: the execution
+        :return: nothing
+        """
+        if execution.schema not in self.functions:
+            _fail_to_start(
+                execution,
+                "The dag {} cannot be run by cornflow".format(execution.schema),
+                exception=InvalidData,
+            )
+
+    def launch(self, execution, instance):
+        """
+        Puts an execution in the queue
+
+        :param ExecutionModel execution: the execution, already checked
+        :param InstanceModel instance: the instance it solves
+        :return: nothing
+        """
+        execution.executor = self.name
+        execution.update_state(EXEC_STATE_RUNNING)
+        with self.lock:
+            self.in_flight.add(execution.id)
+        self.queue.put(
+            (
+                -execution.priority,
+                next(self.order),
+                execution.id,
+                execution.schema,
+                instance.data,
+                dict(execution.config),
+            )
+        )
+        with self.lock:
+            while len(self.threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+            if self.heartbeat_thread is None:
+                self.heartbeat_thread = threading.Thread(target=self._beat, daemon=True)
+                self.heartbeat_thread.start()
+
+    def cancel(self, execution):
+        """
+        Cancels an execution. If it is waiting it does not run,
+        and if it is running its result is discarded.
+        Nothing happens if it is not in the queue of this worker
+
+        :param ExecutionModel execution: the execution
+        :return: nothing
+        """
+        with self.lock:
+            if execution.id in self.in_flight:
+                self.cancelled.add(execution.id)
+
+    def wait(self):
+        """
+        Waits until all the executions in the queue have finished
+        """
+        self.queue.join()
+
+    def mark_alive(self):
+        """
+        Moves the updated_at of the executions in the queue that are still running,
+        so the reconciler does not take them as lost
+
+        :return: the number of executions marked
+        :rtype: int
+        """
+        with self.lock:
+            ids = list(self.in_flight)
+        if not ids:
+            return 0
+        with self.app.app_context():
+            marked = ExecutionModel.touch(ids, [EXEC_STATE_RUNNING])
+            db.session.commit()
+        return marked
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat)
+            try:
+                self.mark_alive()
+            except Exception as e:
+                log.error(
+                    "The local executions could not be marked as alive: {}".format(e)
+                )
+
+    def _work(self):
+        while True:
+            _, _, execution_id, dag_name, data, config = self.queue.get()
+            try:
+                with self.lock:
+                    cancelled = execution_id in self.cancelled
+                if not cancelled:
+                    self._solve(execution_id, dag_name, data, config)
+            except Exception as e:
+                log.error("Execution {} failed: {}".format(execution_id, e))
+            finally:
+                with self.lock:
+                    self.in_flight.discard(execution_id)
+                    self.cancelled.discard(execution_id)
+                self.queue.task_done()
+
+    def _solve(self, execution_id, dag_name, data, config):
+        function = self.functions[dag_name]
+        try:
+            if self.process_pool is not None:
+                result = self.process_pool.submit(function, data, config).result()
+            else:
+                result = function(data, config)
+        except Exception as e:
+            log.error("Execution {} failed: {}".format(execution_id, e))
+            result = None
+        with self.app.app_context():
+            self._save(execution_id, dag_name, result)
+            for listener in self.listeners:
+                try:
+                    listener()
+                except Exception as e:
+                    log.error("Listener of the executions failed: {}".format(e))
+
+    def _save(self, execution_id, dag_name, result):
+        execution = ExecutionModel.query.get(execution_id)
+        with self.lock:
+            cancelled = execution_id in self.cancelled
+        if execution is None or execution.state != EXEC_STATE_RUNNING or cancelled:
+            return
+        if result is None:
+            execution.update_state(EXEC_STATE_ERROR)
+            return
+        solution, log_text, log_json = result
+        if solution:
+            try:
+                validate_and_continue(get_schema(dag_name, SOLUTION_SCHEMA)(), solution)
+            except InvalidUsage as e:
+                log.error(
+                    "The solution of execution {} is not valid: {}".format(
+                        execution_id, e.error
+                    )
+                )
+                execution.update_state(EXEC_STATE_ERROR)
+                return
+            execution.data = solution
+        execution.set_log(log_text)
+        execution.log_json = log_json
+        # it is not stored if the execution was stopped meanwhile
+        execution.update_state(EXEC_STATE_CORRECT)
+
+
+def get_executor(name=None):
+    """
+    :param str name: the name of the backend, by default the one configured for the new executions
+    :return: the backend that runs the executions
+    """
+    executors = current_app.extensions["executors"]
+    if name is None:
+        name = current_app.config["EXECUTOR_BACKEND"]
+    return executors[name]
+
+
+def parse_executor_functions(value):
+    """
+    Imports the solve function of each DAG
+
+    :param str value: comma separated pairs dag_name=module:function
+    :return: the function of each DAG
+    :rtype: dict
+    """
+    functions = dict()
+    for pair in value.split(","):
+        if not pair.strip():
+            continue
+        dag_name, path = (element.strip() for element in pair.split("=", 1))
+        module_name, function_name = path.split(":", 1)
+        module = importlib.import_module(module_name)
+        functions[dag_name] = getattr(module, function_name)
+    return functions
+
+
+def is_gevent_patched():
+    """
+    :return: if the threads are greenlets of gevent (like in the gevent workers of gunicorn)
+    :rtype: bool
+    """
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+def init_executors(flask_app):
+    """Initialize the backends that run the executions"""
+    config = flask_app.config
+    if config["EXECUTOR_BACKEND"] not in [EXECUTOR_AIRFLOW, EXECUTOR_LOCAL]:
+        raise ValueError("Unknown executor: {}".format(config["EXECUTOR_BACKEND"]))
+    if (
+        config["EXECUTOR_BACKEND"] == EXECUTOR_LOCAL
+        and not config["LOCAL_EXECUTOR_PROCESSES"]
+        and is_gevent_patched()
+    ):
+        raise ValueError(
+            "The local executor cannot run the executions in threads with gevent: "
+            "set LOCAL_EXECUTOR_PROCESSES=1"
+        )
+    flask_app.extensions["executors"] = {
+        EXECUTOR_AIRFLOW: AirflowExecutor(),
+        EXECUTOR_LOCAL: LocalExecutor(
+            flask_app,
+            functions=parse_executor_functions(config["LOCAL_EXECUTOR_FUNCTIONS"]),
+            max_workers=config["LOCAL_EXECUTOR_WORKERS"],
+            processes=config["LOCAL_EXECUTOR_PROCESSES"],
+            heartbeat=config["LOCAL_EXECUTOR_HEARTBEAT"],
+        ),
+    }
@@ -0,0 +1,111 @@
+"""
+In-process cache of the permissions that each role has over the views of the REST API.
+Each worker compiles the whole matrix once and checks it in memory on every request.
+The matrix gets rebuilt when its version counter (stored in the database) changes.
+"""
+# Import from libraries
+from flask import current_app, has_app_context
+import threading
+import time
+
+# Import from internal modules
+from ..models import ApiViewModel, CacheVersionModel, PermissionViewRoleModel
+from .utils import db
+
+PERMISSIONS_CACHE = "permissions"
+
+
+class PermissionMatrix:
+    """
+    Compiled set of (role_id, url_rule, action_id) with all the permissions defined in the database.
+
+    :param int ttl: seconds between checks of the version counter in the database
+    """
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.permissions = frozenset()
+        self.version = None
+        self.checked_at = None
+
+    @staticmethod
+    def build():
+        """
+        Reads the permission_view and api_view tables and builds the matrix
+
+        :return: the set with all the permissions
+        :rtype: frozenset
+        """
+        rows = (
+            db.session.query(
+                PermissionViewRoleModel.role_id,
+                ApiViewModel.url_rule,
+                PermissionViewRoleModel.action_id,
+            )
+            .join(ApiViewModel, PermissionViewRoleModel.api_view_id == ApiViewModel.id)
+            .filter(PermissionViewRoleModel.deleted_at == None)
+            .all()
+        )
+        return frozenset((role, url, action) for role, url, action in rows)
+
+    def refresh(self):
+        """
+        Rebuilds the matrix if it has been invalidated or if the version in the database has changed.
+        The database is only checked once every ttl seconds.
+        """
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < self.ttl:
+            return
+        version = CacheVersionModel.get_version(PERMISSIONS_CACHE)
+        with self.lock:
+            if self.checked_at is None or self.version != version:
+                self.permissions = self.build()
+                self.version = version
+            self.checked_at = now
+
+    def invalidate(self):
+        """
+        Forces the matrix to be rebuilt on the next check
+        """
+        with self.lock:
+            self.checked_at = None
+
+    def has_permission(self, role_ids, url_rule, action_id):
+        """
+        Checks if any of the roles has permission to do the action over the view
+
+        :param role_ids: the roles of the user
+        :param str url_rule: the url rule of the view
+        :param int action_id: the id of the action
+        :return: if the permission exists
+        :rtype: bool
+        """
+        self.refresh()
+        permissions = self.permissions
+        return any((role_id, url_rule, action_id) in permissions for role_id in role_ids)
+
+
+def get_permission_matrix():
+    """
+    :return: the permission matrix of the current application
+    :rtype: :class:`PermissionMatrix`
+    """
+    return current_app.extensions["permission_matrix"]
+
+
+def bump_permissions_version():
+    """
+    Marks the permissions as changed so every worker rebuilds its matrix.
+    It has to be called after any change to the roles, views or permissions.
+    """
+    CacheVersionModel.bump(PERMISSIONS_CACHE)
+    if has_app_context() and "permission_matrix" in current_app.extensions:
+        get_permission_matrix().invalidate()
+
+
+def init_permissions(flask_app):
+    """Initialize the permission matrix of the application"""
+    flask_app.extensions["permission_matrix"] = PermissionMatrix(
+        ttl=flask_app.config["PERMISSION_CACHE_TTL"]
+    )
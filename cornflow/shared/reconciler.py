@@ -0,0 +1,209 @@
+"""
+Synchronization of the state of the running executions with the state of their dag runs in airflow.
+The reconciler lists the dag runs of each DAG in bulk and writes all the changes with a single UPDATE,
+so, when it runs in the background (see the reconcile_executions command),
+the status endpoints can just read the database (STATUS_FROM_DB).
+The executions of the local backend are not in airflow: the reconciler only sets as failed the ones
+that the worker running them stopped marking as alive.
+"""
+# Import from libraries
+from collections import defaultdict
+import datetime
+from flask import current_app
+import logging as log
+import sqlalchemy as sa
+from sqlalchemy.orm import load_only
+
+# Import from internal modules
+from ..models import ExecutionModel
+from ..models.execution import record_states
+from .airflow import get_airflow_client
+from .const import (
+    AIRFLOW_TO_STATE_MAP,
+    EXEC_STATE_ERROR,
+    EXEC_STATE_RUNNING,
+    EXEC_STATE_UNKNOWN,
+    EXECUTION_STATE_MESSAGE_DICT,
+    EXECUTOR_LOCAL,
+)
+from .exceptions import AirflowError
+from .utils import db
+
+# how much earlier than its execution the dag run of an execution can appear to be created
+DAG_RUN_CLOCK_SKEW = datetime.timedelta(hours=1)
+# how long an execution can be running without a dag run while it is being launched
+LAUNCH_GRACE_PERIOD = datetime.timedelta(minutes=10)
+# the states that airflow can change
+ACTIVE_STATES = [EXEC_STATE_RUNNING, EXEC_STATE_UNKNOWN]
+
+
+def is_being_launched(execution, now=None):
+    """
+    Checks if an execution without a dag run can still be getting it: the dag run is created (and stored)
+    right after the execution is set as running, so it is only missing for a while
+
+    :param ExecutionModel execution: the execution, with its updated_at loaded
+    :param datetime now: the current time, by default utcnow
+    :return: if the execution changed less than LAUNCH_GRACE_PERIOD ago
+    :rtype: bool
+    """
+    if now is None:
+        now = datetime.datetime.utcnow()
+    return execution.updated_at >= now - LAUNCH_GRACE_PERIOD
+
+
+def get_dag_run_states(af_client, dag_name, executions):
+    """
+    Asks airflow the state of some executions of a DAG, with one listing of its dag runs
+
+    :param af_client: the airflow client
+    :param str dag_name: the name of the DAG
+    :param list executions: the executions, with their dag runs
+    :return: the state of each execution, by id. The executions whose dag run is not found are unknown
+    :rtype: dict
+    """
+    # the dag runs are created after the executions (allowing for some clock skew)
+    since = min(execution.created_at for execution in executions)
+    dag_runs = af_client.get_dag_runs(
+        dag_name,
+        [execution.dag_run_id for execution in executions],
+        execution_date_gte=since - DAG_RUN_CLOCK_SKEW,
+    )
+    return {
+        execution.id: AIRFLOW_TO_STATE_MAP.get(
+            dag_runs.get(execution.dag_run_id, dict()).get("state"), EXEC_STATE_UNKNOWN
+        )
+        for execution in executions
+    }
+
+
+def update_states(states):
+    """
+    Stores the new states of some executions with a single UPDATE.
+    The executions that are not active anymore (someone else finished them) are not changed,
+    and the state_version of the rest goes up if their state changes.
+    Only the executions that end up in the new state are published to the watchers
+
+    :param dict states: the new state of each execution, by id
+    :return: the number of executions updated
+    :rtype: int
+    """
+    model = ExecutionModel
+    messages = {
+        idx: EXECUTION_STATE_MESSAGE_DICT[state] for idx, state in states.items()
+    }
+    new_state = sa.case(states, value=model.id)
+    updated = model.query.filter(
+        model.id.in_(list(states)), model.state.in_(ACTIVE_STATES)
+    ).update(
+        dict(
+            state=new_state,
+            state_message=sa.case(messages, value=model.id),
+            state_version=sa.case(
+                [(model.state == new_state, model.state_version)],
+                else_=model.state_version + 1,
+            ),
+            updated_at=datetime.datetime.utcnow(),
+        ),
+        synchronize_session=False,
+    )
+    # the bulk update goes around the session, so the watchers are told explicitly
+    stored = (
+        db.session.query(model.id)
+        .filter(model.id.in_(list(states)), model.state == new_state)
+        .all()
+    )
+    record_states(db.session, {idx: states[idx] for idx, in stored})
+    db.session.commit()
+    return updated
+
+
+def expire_local_executions(timeout=None):
+    """
+    Sets as failed the executions of the local backend that have not been marked as alive for some time:
+    the worker that had them in its queue stopped (see :class:`LocalExecutor`)
+
+    :param float timeout: seconds without being marked as alive. By default, LOCAL_EXECUTOR_TIMEOUT
+    :return: the number of executions updated
+    :rtype: int
+    """
+    if timeout is None:
+        timeout = current_app.config["LOCAL_EXECUTOR_TIMEOUT"]
+    alive_since = datetime.datetime.utcnow() - datetime.timedelta(seconds=timeout)
+    lost = (
+        db.session.query(ExecutionModel.id)
+        .filter(
+            ExecutionModel.deleted_at == None,
+            ExecutionModel.state.in_(ACTIVE_STATES),
+            ExecutionModel.executor == EXECUTOR_LOCAL,
+            ExecutionModel.updated_at < alive_since,
+        )
+        .all()
+    )
+    if not lost:
+        return 0
+    log.warning("{} local executions were lost by their worker".format(len(lost)))
+    return update_states({idx: EXEC_STATE_ERROR for idx, in lost})
+
+
+def reconcile_executions(af_client=None):
+    """
+    Brings the state of all the active executions up to date with airflow
+    (nothing is changed while airflow is not accessible)
+    and sets as failed the local executions that were lost (see :func:`expire_local_executions`)
+
+    :param af_client: the airflow client, by default the one of the application
+    :return: the number of executions updated
+    :rtype: int
+    """
+    expired = expire_local_executions()
+    executions = (
+        ExecutionModel.query.options(
+            load_only(
+                "id", "schema", "dag_run_id", "created_at", "updated_at", "state"
+            )
+        )
+        .filter(
+            ExecutionModel.deleted_at == None,
+            ExecutionModel.state.in_(ACTIVE_STATES),
+            # the local backend writes the state of its executions itself
+            sa.or_(
+                ExecutionModel.executor == None,
+                ExecutionModel.executor != EXECUTOR_LOCAL,
+            ),
+        )
+        .all()
+    )
+    if not executions:
+        return expired
+    if af_client is None:
+        af_client = get_airflow_client()
+    if not af_client.is_alive():
+        log.warning("Airflow is not accessible: the executions are not reconciled")
+        return expired
+
+    states = dict()
+    by_dag = defaultdict(list)
+    now = datetime.datetime.utcnow()
+    for execution in executions:
+        if not execution.dag_run_id:
+            # the executions being launched do not have their dag run yet,
+            # but it's safe to say we will never get anything for the old ones
+            if not is_being_launched(execution, now):
+                states[execution.id] = EXEC_STATE_ERROR
+            continue
+        by_dag[execution.schema].append(execution)
+    for dag_name, dag_executions in by_dag.items():
+        try:
+            states.update(get_dag_run_states(af_client, dag_name, dag_executions))
+        except AirflowError as err:
+            log.error("Airflow responded with an error: {}".format(err))
+
+    changed = {
+        execution.id: states[execution.id]
+        for execution in executions
+        if execution.id in states and states[execution.id] != execution.state
+    }
+    if not changed:
+        return expired
+    return expired + update_states(changed)
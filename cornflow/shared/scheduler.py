@@ -0,0 +1,262 @@
+"""
+Fair-share scheduling of the executions.
+With the scheduler enabled (EXECUTION_SCHEDULER), the new executions wait as pending in the database
+and they are released to the backend (airflow or local) while there is room for them:
+at most SCHEDULER_CAPACITY executions run at the same time, and each user has a quota of running executions
+(SCHEDULER_USER_QUOTA, or a bigger one given to the roles of the user in SCHEDULER_ROLE_QUOTAS).
+The next execution released is the one of the user that uses the smallest part of its quota,
+and the executions of each user go by priority and then by age, so a big batch of one user
+does not hold back the executions of the others.
+
+The pending executions are released when new ones are submitted and when an execution finishes
+(when airflow writes its results, it is stopped or the local backend ends it),
+and the reconcile_executions command releases them periodically too.
+Each execution is claimed with a conditional update before it is launched, so it only gets launched once,
+but two workers that release executions at the same time can go slightly over the capacity.
+"""
+# Import from libraries
+from collections import defaultdict, deque
+from flask import current_app
+import datetime
+import heapq
+import logging as log
+import sqlalchemy as sa
+
+# Import from internal modules
+from ..models import ExecutionModel, InstanceModel, UserRoleModel
+from .const import EXEC_STATE_PENDING, EXEC_STATE_RUNNING, EXECUTION_STATE_MESSAGE_DICT
+from .utils import db
+
+
+class ExecutionScheduler:
+    """
+    Releases the pending executions to the backend, fairly between users
+
+    :param launch: function that launches an execution already claimed, with its instance.
+      It returns True if the execution started
+    :param bool enabled: if False, the executions are not queued: they are launched as soon as they are created
+    :param int capacity: maximum number of executions running at the same time
+    :param int user_quota: maximum number of executions of a user running at the same time
+    :param dict role_quotas: the quota of the users of some roles, by role id.
+      The users with many roles get the biggest quota
+    """
+
+    def __init__(
+        self, launch, enabled=False, capacity=20, user_quota=5, role_quotas=None
+    ):
+        self.launch = launch
+        self.enabled = enabled
+        self.capacity = capacity
+        self.user_quota = user_quota
+        self.role_quotas = dict(role_quotas or dict())
+
+    def enqueue(self, executions):
+        """
+        Puts some executions in the queue and launches the ones that fit
+
+        :param list executions: the new executions
+        :return: nothing
+        """
+        for execution in executions:
+            execution.state = EXEC_STATE_PENDING
+            execution.state_message = EXECUTION_STATE_MESSAGE_DICT[EXEC_STATE_PENDING]
+        db.session.add_all(executions)
+        db.session.commit()
+        self.schedule()
+
+    def schedule(self):
+        """
+        Launches the pending executions that fit in the capacity and in the quotas of their users
+
+        :return: the number of executions launched
+        :rtype: int
+        """
+        if not self.enabled:
+            return 0
+        launched = 0
+        for execution_id in self.select():
+            claimed = ExecutionModel.change_state(
+                execution_id, EXEC_STATE_RUNNING, states=[EXEC_STATE_PENDING]
+            )
+            db.session.commit()
+            if not claimed:
+                continue
+            execution = ExecutionModel.query.get(execution_id)
+            instance = InstanceModel.query.get(execution.instance_id)
+            if self.launch(execution, instance):
+                launched += 1
+        if launched:
+            log.info("The scheduler launched {} executions".format(launched))
+        return launched
+
+    def select(self):
+        """
+        Chooses the pending executions that go next
+
+        :return: the ids of the executions, in the order they are launched
+        :rtype: list
+        """
+        running = self.get_running()
+        free = self.capacity - sum(running.values())
+        if free <= 0:
+            return []
+        pending = (
+            db.session.query(
+                ExecutionModel.id,
+                ExecutionModel.user_id,
+                ExecutionModel.priority,
+                ExecutionModel.created_at,
+            )
+            .filter(
+                ExecutionModel.state == EXEC_STATE_PENDING,
+                ExecutionModel.deleted_at == None,
+            )
+            .order_by(ExecutionModel.priority.desc(), ExecutionModel.created_at)
+            .all()
+        )
+        by_user = defaultdict(deque)
+        for row in pending:
+            by_user[row.user_id].append(row)
+        quotas = self.get_quotas(list(by_user))
+
+        # (share of the quota in use, -priority, created_at, user id) of the next execution of each user
+        heap = []
+
+        def push(user_id):
+            if by_user[user_id] and running[user_id] < quotas[user_id]:
+                row = by_user[user_id][0]
+                share = running[user_id] / quotas[user_id]
+                heapq.heappush(heap, (share, -row.priority, row.created_at, user_id))
+
+        for user_id in by_user:
+            push(user_id)
+        selected = []
+        while heap and len(selected) < free:
+            user_id = heapq.heappop(heap)[3]
+            selected.append(by_user[user_id].popleft().id)
+            running[user_id] += 1
+            push(user_id)
+        return selected
+
+    def get_queue(self, user_id=None):
+        """
+        Gets the size of the queue and how long the pending executions have been waiting, by user
+
+        :param int user_id: the id of the user, to get only its executions
+        :return: for each user with executions pending or running: user_id, pending, running, quota,
+          max_wait and mean_wait (in seconds)
+        :rtype: list
+        """
+        query = db.session.query(
+            ExecutionModel.user_id, ExecutionModel.created_at
+        ).filter(
+            ExecutionModel.state == EXEC_STATE_PENDING,
+            ExecutionModel.deleted_at == None,
+        )
+        if user_id is not None:
+            query = query.filter(ExecutionModel.user_id == user_id)
+        now = datetime.datetime.utcnow()
+        waits = defaultdict(list)
+        for row in query.all():
+            waits[row.user_id].append((now - row.created_at).total_seconds())
+        running = self.get_running()
+        user_ids = set(waits) | {idx for idx, count in running.items() if count}
+        if user_id is not None:
+            user_ids &= {user_id}
+        quotas = self.get_quotas(list(user_ids))
+        return [
+            dict(
+                user_id=idx,
+                pending=len(waits[idx]),
+                running=running[idx],
+                quota=quotas[idx],
+                max_wait=max(waits[idx], default=0),
+                mean_wait=sum(waits[idx]) / len(waits[idx]) if waits[idx] else 0,
+            )
+            for idx in sorted(user_ids)
+        ]
+
+    @staticmethod
+    def get_running():
+        """
+        :return: the number of executions running, by user id
+        :rtype: dict
+        """
+        rows = (
+            db.session.query(ExecutionModel.user_id, sa.func.count(ExecutionModel.id))
+            .filter(
+                ExecutionModel.state == EXEC_STATE_RUNNING,
+                ExecutionModel.deleted_at == None,
+            )
+            .group_by(ExecutionModel.user_id)
+            .all()
+        )
+        running = defaultdict(int)
+        running.update(rows)
+        return running
+
+    def get_quotas(self, user_ids):
+        """
+        :param list user_ids: the ids of the users
+        :return: the quota of each user, by id
+        :rtype: dict
+        """
+        quotas = {user_id: self.user_quota for user_id in user_ids}
+        if not self.role_quotas or not user_ids:
+            return quotas
+        rows = (
+            db.session.query(UserRoleModel.user_id, UserRoleModel.role_id)
+            .filter(
+                UserRoleModel.user_id.in_(user_ids),
+                UserRoleModel.role_id.in_(list(self.role_quotas)),
+            )
+            .all()
+        )
+        role_quotas = defaultdict(list)
+        for user_id, role_id in rows:
+            role_quotas[user_id].append(self.role_quotas[role_id])
+        for user_id, values in role_quotas.items():
+            quotas[user_id] = max(values)
+        return quotas
+
+
+def parse_role_quotas(value):
+    """
+    :param str value: comma separated pairs role_id:quota
+    :return: the quota of each role, by id
+    :rtype: dict
+    """
+    quotas = dict()
+    for pair in value.split(","):
+        if not pair.strip():
+            continue
+        role_id, quota = pair.split(":", 1)
+        quotas[int(role_id)] = int(quota)
+    return quotas
+
+
+def get_scheduler():
+    """
+    :return: the scheduler of the executions of the current application
+    :rtype: :class:`ExecutionScheduler`
+    """
+    return current_app.extensions["execution_scheduler"]
+
+
+def init_scheduler(flask_app, launch):
+    """
+    Initialize the scheduler of the executions.
+    The local backend tells the scheduler when its executions end, so the next ones are released
+    """
+    config = flask_app.config
+    scheduler = ExecutionScheduler(
+        launch,
+        enabled=config["EXECUTION_SCHEDULER"],
+        capacity=config["SCHEDULER_CAPACITY"],
+        user_quota=config["SCHEDULER_USER_QUOTA"],
+        role_quotas=parse_role_quotas(config["SCHEDULER_ROLE_QUOTAS"]),
+    )
+    flask_app.extensions["execution_scheduler"] = scheduler
+    for executor in flask_app.extensions["executors"].values():
+        if hasattr(executor, "add_listener"):
+            executor.add_listener(scheduler.schedule)
@@ -0,0 +1,256 @@
+"""
+In-process registry of the marshmallow schemas built from the jsonschemas that the DAGs publish in Airflow.
+Each worker fetches the schemas of a DAG and builds their classes once, and keeps using them
+while they get fetched again in the background after SCHEMA_REGISTRY_TTL seconds.
+A class only gets rebuilt when the jsonschema it comes from changes.
+The classes are built with the validation engine configured for each DAG (see :mod:`validators`).
+"""
+# Import from libraries
+from cornflow_client import get_pulp_jsonschema
+from cornflow_client.constants import INSTANCE_SCHEMA, SOLUTION_SCHEMA
+from flask import current_app
+import logging as log
+import threading
+import time
+
+# Import from internal modules
+from .exceptions import AirflowError
+from .utils import hash_json_256
+from .validators import (
+    build_schema_class,
+    parse_validation_engines,
+    VALIDATION_ENGINES,
+    VALIDATION_MARSHMALLOW,
+)
+
+# schema stored inside cornflow, used for the instances and solutions of the pulp models
+PULP_SCHEMA = "pulp"
+
+
+class SchemaRegistry:
+    """
+    Marshmallow classes of the schemas of the DAGs, by DAG and schema type,
+    along with the jsonschema they were built from and its hash.
+
+    :param airflow_client: the client of the Airflow server (see :class:`AirflowClient`)
+    :param float ttl: seconds after which the schemas of a DAG get fetched again (in the background)
+    :param str default_engine: the validation engine used for the DAGs without a specific one
+    :param dict engines: the validation engine used for some DAGs
+    """
+
+    def __init__(
+        self,
+        airflow_client,
+        ttl=300,
+        default_engine=VALIDATION_MARSHMALLOW,
+        engines=None,
+    ):
+        self.airflow_client = airflow_client
+        self.ttl = ttl
+        self.default_engine = default_engine
+        self.engines = engines or dict()
+        self.lock = threading.Lock()
+        # dag_name: (fetched_at, {schema type: (hash of the jsonschema, marshmallow class, jsonschema)})
+        self.schemas = dict()
+        # schemas that are not fetched from airflow, with the same structure
+        self.local_schemas = dict()
+        self.refreshing = set()
+
+    def get_engine(self, dag_name):
+        """
+        :param str dag_name: the name of the DAG
+        :return: the validation engine used for the schemas of the DAG
+        :rtype: str
+        """
+        return self.engines.get(dag_name, self.default_engine)
+
+    def get(self, dag_name, schema_type=INSTANCE_SCHEMA):
+        """
+        Gets the marshmallow class of a schema of a DAG.
+        Airflow is only called the first time the DAG is used by the worker.
+
+        :param str dag_name: the name of the DAG
+        :param str schema_type: instance, solution or config
+        :return: the marshmallow class
+        """
+        return self.get_entry(dag_name, schema_type)[1]
+
+    def get_version(self, dag_name, schema_type=INSTANCE_SCHEMA):
+        """
+        Gets the version of a schema of a DAG: the hash of its jsonschema
+
+        :param str dag_name: the name of the DAG
+        :param str schema_type: instance, solution or config
+        :return: the hash of the jsonschema
+        :rtype: str
+        """
+        return self.get_entry(dag_name, schema_type)[0]
+
+    def get_source(self, dag_name, schema_type=INSTANCE_SCHEMA):
+        """
+        Gets what is needed to build the class of a schema of a DAG somewhere else (like in another process)
+
+        :param str dag_name: the name of the DAG
+        :param str schema_type: instance, solution or config
+        :return: the hash of the jsonschema, the jsonschema and the validation engine
+        :rtype: Tuple(str, dict, str)
+        """
+        schema_hash, _, jsonschema = self.get_entry(dag_name, schema_type)
+        return schema_hash, jsonschema, self.get_engine(dag_name)
+
+    def get_entry(self, dag_name, schema_type=INSTANCE_SCHEMA):
+        """
+        Gets a schema of a DAG, fetching it from Airflow if needed
+
+        :param str dag_name: the name of the DAG
+        :param str schema_type: instance, solution or config
+        :return: the hash of the jsonschema, the marshmallow class and the jsonschema
+        :rtype: Tuple(str, class, dict)
+        """
+        entry = self.local_schemas.get(dag_name)
+        if entry is None:
+            entry = self.schemas.get(dag_name)
+            if entry is None:
+                entry = self.refresh(dag_name)
+            elif entry[0] + self.ttl < time.monotonic():
+                self.refresh_in_background(dag_name)
+        if schema_type not in entry[1]:
+            raise AirflowError(
+                error="The DAG {} has no {} schema".format(dag_name, schema_type)
+            )
+        return entry[1][schema_type]
+
+    def refresh(self, dag_name):
+        """
+        Fetches the schemas of a DAG from Airflow
+
+        :param str dag_name: the name of the DAG
+        :return: the time they were fetched and the schemas
+        :rtype: Tuple(float, dict)
+        """
+        af_client = self.airflow_client
+        if not af_client.is_alive():
+            raise AirflowError(error="Airflow is not accessible")
+        return self.update(dag_name, af_client.get_schemas_for_dag_name(dag_name))
+
+    def refresh_in_background(self, dag_name):
+        """
+        Fetches the schemas of a DAG from Airflow in a new thread, unless they are already being fetched
+
+        :param str dag_name: the name of the DAG
+        """
+        with self.lock:
+            if dag_name in self.refreshing:
+                return
+            self.refreshing.add(dag_name)
+
+        def refresh():
+            try:
+                self.refresh(dag_name)
+            except Exception as e:
+                log.warning(
+                    "Schemas of {} could not be refreshed: {}".format(dag_name, e)
+                )
+            finally:
+                with self.lock:
+                    self.refreshing.discard(dag_name)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def update(self, dag_name, schemas):
+        """
+        Stores the schemas of a DAG. Only the classes of the schemas that changed get built
+
+        :param str dag_name: the name of the DAG
+        :param dict schemas: the jsonschemas of the DAG, by type
+        :return: the time they were stored and the schemas
+        :rtype: Tuple(float, dict)
+        """
+        entry = (time.monotonic(), self._build_classes(dag_name, schemas))
+        self.schemas[dag_name] = entry
+        return entry
+
+    def add_local(self, dag_name, schemas):
+        """
+        Stores the schemas of a DAG that are not fetched from airflow. They never expire
+
+        :param str dag_name: the name of the DAG
+        :param dict schemas: the jsonschemas of the DAG, by type
+        """
+        self.local_schemas[dag_name] = (None, self._build_classes(dag_name, schemas))
+
+    def _build_classes(self, dag_name, schemas):
+        _, previous = self.schemas.get(dag_name, (None, dict()))
+        engine = self.get_engine(dag_name)
+        classes = dict()
+        for schema_type, jsonschema in schemas.items():
+            if not isinstance(jsonschema, dict):
+                # the name of the DAG is also included
+                continue
+            schema_hash = hash_json_256(jsonschema)
+            if previous.get(schema_type, (None,))[0] == schema_hash:
+                classes[schema_type] = previous[schema_type]
+            else:
+                schema_class = build_schema_class(jsonschema, engine)
+                classes[schema_type] = (schema_hash, schema_class, jsonschema)
+        return classes
+
+    def clear(self):
+        """
+        Removes all the schemas, so they get fetched again when used
+        """
+        self.schemas.clear()
+
+
+def get_schema(dag_name, schema_type=INSTANCE_SCHEMA):
+    """
+    Gets the marshmallow class of a schema of a DAG from the registry of the current application
+
+    :param str dag_name: the name of the DAG
+    :param str schema_type: instance, solution or config
+    :return: the marshmallow class
+    """
+    return current_app.extensions["schema_registry"].get(dag_name, schema_type)
+
+
+def get_schema_version(dag_name, schema_type=INSTANCE_SCHEMA):
+    """
+    Gets the version of a schema of a DAG from the registry of the current application
+
+    :param str dag_name: the name of the DAG
+    :param str schema_type: instance, solution or config
+    :return: the hash of the jsonschema
+    :rtype: str
+    """
+    return current_app.extensions["schema_registry"].get_version(dag_name, schema_type)
+
+
+def get_schema_source(dag_name, schema_type=INSTANCE_SCHEMA):
+    """
+    Gets the source of a schema of a DAG from the registry of the current application (see :meth:`SchemaRegistry.get_source`)
+
+    :param str dag_name: the name of the DAG
+    :param str schema_type: instance, solution or config
+    :return: the hash of the jsonschema, the jsonschema and the validation engine
+    :rtype: Tuple(str, dict, str)
+    """
+    return current_app.extensions["schema_registry"].get_source(dag_name, schema_type)
+
+
+def init_schema_registry(flask_app):
+    """Initialize the registry of the schemas of the DAGs, with the schema of the pulp models"""
+    config = flask_app.config
+    default_engine = config["DEFAULT_VALIDATION_ENGINE"]
+    if default_engine not in VALIDATION_ENGINES:
+        raise ValueError("Unknown validation engine: {}".format(default_engine))
+    registry = SchemaRegistry(
+        airflow_client=flask_app.extensions["airflow_client"],
+        ttl=config["SCHEMA_REGISTRY_TTL"],
+        default_engine=default_engine,
+        engines=parse_validation_engines(config["VALIDATION_ENGINES"]),
+    )
+    pulp_schema = get_pulp_jsonschema()
+    registry.add_local(
+        PULP_SCHEMA, {INSTANCE_SCHEMA: pulp_schema, SOLUTION_SCHEMA: pulp_schema}
+    )
+    flask_app.extensions["schema_registry"] = registry
@@ -0,0 +1,281 @@
+"""
+Column types used to store the big json and text fields compressed in the database.
+The values are written with the algorithm configured in STORAGE_COMPRESSION (gzip by default, zstd if the
+zstandard package is installed or none) and each value is decompressed according to its own header,
+so rows written with different configurations (or before compressing) can be read at any time.
+"""
+# Import from libraries
+import gzip
+import io
+import json
+import zlib
+from flask import current_app, has_app_context
+from sqlalchemy import select
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+STORAGE_NONE = "none"
+STORAGE_GZIP = "gzip"
+STORAGE_ZSTD = "zstd"
+
+# headers of the compressed values. They cannot be the start of a valid utf-8 text,
+# so uncompressed values are never mistaken for compressed ones
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+DEFAULT_COMPRESSION = STORAGE_GZIP
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def get_compression_algorithm(raw):
+    """
+    Detects the algorithm used to compress a stored value
+
+    :param bytes raw: the value stored in the database
+    :return: the algorithm (none if the value is not compressed)
+    :rtype: str
+    """
+    if raw[:2] == GZIP_MAGIC:
+        return STORAGE_GZIP
+    if raw[:4] == ZSTD_MAGIC:
+        return STORAGE_ZSTD
+    return STORAGE_NONE
+
+
+def compress(raw, algorithm):
+    """
+    Compresses the bytes of a value with the given algorithm
+
+    :param bytes raw: the serialized value
+    :param str algorithm: none, gzip or zstd
+    :return: the compressed bytes
+    :rtype: bytes
+    """
+    if algorithm == STORAGE_GZIP:
+        return gzip.compress(raw)
+    if algorithm == STORAGE_ZSTD:
+        return zstandard.ZstdCompressor().compress(raw)
+    return raw
+
+
+def decompress(raw):
+    """
+    Decompresses a stored value, whatever the algorithm used to write it
+
+    :param bytes raw: the value stored in the database
+    :return: the serialized value
+    :rtype: bytes
+    """
+    if isinstance(raw, str):
+        # values written as text before the column was binary (sqlite keeps them as text)
+        return raw.encode("utf-8")
+    raw = bytes(raw)
+    algorithm = get_compression_algorithm(raw)
+    if algorithm == STORAGE_GZIP:
+        return gzip.decompress(raw)
+    if algorithm == STORAGE_ZSTD:
+        if zstandard is None:
+            raise ImportError("The zstandard package is needed to read zstd values")
+        return zstandard.ZstdDecompressor().decompress(raw)
+    return raw
+
+
+def iter_decompress(raw, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Decompresses a stored value in chunks, so the whole serialized value is never in memory
+
+    :param bytes raw: the value stored in the database
+    :param int chunk_size: the maximum size of each chunk
+    :return: the chunks of the serialized value
+    :rtype: Iterator[bytes]
+    """
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    raw = bytes(raw)
+    algorithm = get_compression_algorithm(raw)
+    if algorithm == STORAGE_GZIP:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        pending = raw
+        while pending:
+            chunk = decompressor.decompress(pending, chunk_size)
+            pending = decompressor.unconsumed_tail
+            if chunk:
+                yield chunk
+        chunk = decompressor.flush()
+        if chunk:
+            yield chunk
+    elif algorithm == STORAGE_ZSTD:
+        if zstandard is None:
+            raise ImportError("The zstandard package is needed to read zstd values")
+        yield from zstandard.ZstdDecompressor().read_to_iter(
+            io.BytesIO(raw), write_size=chunk_size
+        )
+    else:
+        for start in range(0, len(raw), chunk_size):
+            yield raw[start : start + chunk_size]
+
+
+def get_storage_config():
+    """
+    :return: the compression algorithm and the minimum size (in bytes) of the values to compress
+    :rtype: Tuple(str, int)
+    """
+    if not has_app_context():
+        return DEFAULT_COMPRESSION, DEFAULT_MIN_SIZE
+    config = current_app.config
+    return (
+        config.get("STORAGE_COMPRESSION", DEFAULT_COMPRESSION),
+        config.get("STORAGE_COMPRESSION_MIN_SIZE", DEFAULT_MIN_SIZE),
+    )
+
+
+class CompressedType(TypeDecorator):
+    """
+    Base type for the values stored as compressed bytes
+    """
+
+    impl = LargeBinary
+
+    def serialize(self, value):
+        raise NotImplementedError()
+
+    def deserialize(self, raw):
+        raise NotImplementedError()
+
+    def encode(self, value, algorithm=None, min_size=None):
+        """
+        Serializes and compresses a value
+
+        :param value: the value to store
+        :param str algorithm: the algorithm to use, by default the configured one
+        :param int min_size: values smaller than this are stored without compression
+        :return: the bytes to store
+        :rtype: bytes
+        """
+        default_algorithm, default_min_size = get_storage_config()
+        if algorithm is None:
+            algorithm = default_algorithm
+        if min_size is None:
+            min_size = default_min_size
+        raw = self.serialize(value)
+        if len(raw) < min_size:
+            return raw
+        return compress(raw, algorithm)
+
+    def decode(self, raw):
+        """
+        Decompresses and deserializes a stored value
+
+        :param bytes raw: the value stored in the database
+        :return: the value
+        """
+        return self.deserialize(decompress(raw))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self.encode(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.decode(value)
+
+
+class SerializedJSON:
+    """
+    Json that has already been serialized. :class:`CompressedJSON` stores it without serializing it again
+
+    :param bytes raw: the serialized json
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+
+
+class CompressedJSON(CompressedType):
+    """
+    Json stored as compressed bytes
+    """
+
+    def serialize(self, value):
+        if isinstance(value, SerializedJSON):
+            return value.raw
+        return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    def deserialize(self, raw):
+        return json.loads(raw.decode("utf-8"))
+
+
+class CompressedText(CompressedType):
+    """
+    Text stored as compressed bytes
+    """
+
+    def serialize(self, value):
+        return value.encode("utf-8")
+
+    def deserialize(self, raw):
+        return raw.decode("utf-8")
+
+
+def recompress_rows(
+    connection, table, key, column, column_type, algorithm, min_size, batch_size=100
+):
+    """
+    Rewrites the values of a column with the given compression, in batches ordered by the key of the table.
+    It is a generator that yields after each batch, so the caller can commit it.
+
+    :param connection: the connection to the database
+    :param table: the table, with the column declared as binary so the raw values are read and written
+    :param str key: the name of the primary key of the table
+    :param str column: the name of the column to rewrite
+    :param CompressedType column_type: the type of the values stored in the column
+    :param str algorithm: the algorithm to use
+    :param int min_size: values smaller than this are stored without compression
+    :param int batch_size: the number of rows of each batch
+    :return: the number of rows read and rewritten in each batch
+    :rtype: Iterator[Tuple(int, int)]
+    """
+    last_key = None
+    while True:
+        query = (
+            select([table.c[key], table.c[column]])
+            .where(table.c[column] != None)
+            .order_by(table.c[key])
+            .limit(batch_size)
+        )
+        if last_key is not None:
+            query = query.where(table.c[key] > last_key)
+        rows = connection.execute(query).fetchall()
+        if not rows:
+            return
+        rewritten = 0
+        for idx, raw in rows:
+            serialized = decompress(raw)
+            expected = algorithm if len(serialized) >= min_size else STORAGE_NONE
+            if isinstance(raw, bytes) and get_compression_algorithm(raw) == expected:
+                continue
+            new_raw = column_type.encode(
+                column_type.deserialize(serialized), algorithm, min_size
+            )
+            connection.execute(
+                table.update().where(table.c[key] == idx).values({column: new_raw})
+            )
+            rewritten += 1
+        last_key = rows[-1][0]
+        yield len(rows), rewritten
+
+
+def init_storage(flask_app):
+    """Check the compression of the stored data is correctly configured"""
+    algorithm = flask_app.config["STORAGE_COMPRESSION"]
+    if algorithm not in [STORAGE_NONE, STORAGE_GZIP, STORAGE_ZSTD]:
+        raise ValueError("Unknown storage compression: {}".format(algorithm))
+    if algorithm == STORAGE_ZSTD and zstandard is None:
+        raise ImportError("The zstandard package is needed to store zstd values")
@@ -0,0 +1,62 @@
+"""
+Streaming of the json payloads of the data endpoints.
+The json data of the objects is sent straight from the bytes stored in the data blobs, decompressed in chunks,
+so it is never deserialized and serialized again in memory.
+"""
+# Import from libraries
+from functools import lru_cache
+import json
+from marshmallow import fields
+
+# Import from internal modules
+from ..models.data_blob import DataBlobModel
+
+
+@lru_cache(maxsize=None)
+def _get_streamed_attributes(model, schema):
+    """
+    Gets the blob attributes of a model that a schema dumps as they are stored
+
+    :param model: the model class
+    :param schema: the marshmallow schema class
+    :return: the blob attributes
+    :rtype: tuple(:class:`BlobAttribute`)
+    """
+    dump_fields = schema().dump_fields
+    streamed = []
+    for blob in model.get_blob_attributes():
+        field = dump_fields.get(blob.name)
+        if type(field) is fields.Raw and (field.attribute or blob.name) == blob.name:
+            streamed.append(blob)
+    return tuple(streamed)
+
+
+def _iter_json(head, parts):
+    content = json.dumps(head)
+    yield content[:-1].encode("utf-8")
+    separator = ", " if head else ""
+    for name, chunks in parts:
+        yield "{}{}: ".format(separator, json.dumps(name)).encode("utf-8")
+        yield from chunks
+        separator = ", "
+    yield b"}"
+
+
+def stream_json(obj, schema):
+    """
+    Serializes an object with a schema, streaming its json data from the stored blobs.
+    The rest of the fields and the stored values are fetched right away,
+    the json data is decompressed as the result is iterated.
+
+    :param obj: the model object
+    :param schema: the marshmallow schema class used to serialize the object
+    :return: the chunks of the serialized object
+    :rtype: Iterator[bytes]
+    """
+    blobs = _get_streamed_attributes(type(obj), schema)
+    head = schema(exclude=[blob.name for blob in blobs]).dump(obj)
+    parts = [
+        (blob.name, DataBlobModel.iter_serialized_data(getattr(obj, blob.hash_column)))
+        for blob in blobs
+    ]
+    return _iter_json(head, parts)
@@ -0,0 +1,95 @@
+"""
+Reading of the bodies of the requests that upload big json data (instances and cases).
+The body is read and decompressed in chunks and the size limits (UPLOAD_MAX_SIZE and UPLOAD_MAX_INFLATED_SIZE)
+are enforced as soon as they are exceeded, before anything gets parsed.
+"""
+# Import from libraries
+import functools
+from io import BytesIO
+import zlib
+from flask import current_app, request
+from werkzeug.wsgi import get_content_length, get_input_stream
+
+# Import from internal modules
+from .exceptions import InvalidData, PayloadTooLarge
+
+CHUNK_SIZE = 64 * 1024
+GZIP_CONTENT_ENCODING = "gzip"
+
+
+def read_body(max_size, max_inflated_size):
+    """
+    Reads the body of the current request, decompressing it if it is gzipped
+
+    :param int max_size: maximum size of the body, as sent
+    :param int max_inflated_size: maximum size of the body, once decompressed
+    :return: the body, decompressed
+    :rtype: bytes
+    """
+    content_length = get_content_length(request.environ)
+    if content_length is not None and content_length > max_size:
+        raise PayloadTooLarge()
+    decompressor = None
+    if request.content_encoding == GZIP_CONTENT_ENCODING:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # the input is read from the environ, so the stream of the request can be built again from the body
+    stream = get_input_stream(request.environ)
+    chunks = []
+    read_size = 0
+    inflated_size = 0
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            read_size += len(chunk)
+            if read_size > max_size:
+                raise PayloadTooLarge()
+            if decompressor is not None:
+                # the output is limited so a small body cannot be inflated beyond the limit
+                chunk = decompressor.decompress(
+                    chunk, max_inflated_size - inflated_size + 1
+                )
+            inflated_size += len(chunk)
+            if inflated_size > max_inflated_size:
+                raise PayloadTooLarge()
+            chunks.append(chunk)
+        if decompressor is not None:
+            chunk = decompressor.flush()
+            inflated_size += len(chunk)
+            if inflated_size > max_inflated_size:
+                raise PayloadTooLarge()
+            chunks.append(chunk)
+    except zlib.error:
+        raise InvalidData("The data sent is not valid gzip")
+    return b"".join(chunks)
+
+
+def replace_body(body):
+    """
+    Replaces the input of the current request with a body already read,
+    so flask and webargs parse it as if it had been sent as it is
+
+    :param bytes body: the new body of the request, not compressed
+    """
+    environ = request.environ
+    environ["wsgi.input"] = BytesIO(body)
+    environ["CONTENT_LENGTH"] = str(len(body))
+    environ.pop("HTTP_CONTENT_ENCODING", None)
+
+
+def inflate_upload(f):
+    """
+    Decorator for the views that receive big json bodies, that can be gzipped.
+    It replaces flask_inflate's inflate: the body gets read with :func:`read_body`,
+    put back as the input of the request and then it is parsed as usual by flask and webargs.
+    """
+
+    @functools.wraps(f)
+    def view_func(*args, **kwargs):
+        config = current_app.config
+        body = read_body(config["UPLOAD_MAX_SIZE"], config["UPLOAD_MAX_INFLATED_SIZE"])
+        replace_body(body)
+        return f(*args, **kwargs)
+
+    return view_func
@@ -11,7 +11,20 @@ db = SQLAlchemy()
 bcrypt = Bcrypt()
 
 
+def serialize_json(data):
+    """
+    Serializes a json in its canonical form: sorted keys and no spaces
+
+    :param data: the json
+    :return: the serialized json
+    :rtype: bytes
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
 def hash_json_256(data):
-    return hashlib.sha256(
-        json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    ).hexdigest()
+    return hashlib.sha256(serialize_json(data)).hexdigest()
+
+
+# hash of a json without data (null)
+EMPTY_DATA_HASH = hash_json_256(None)
@@ -0,0 +1,512 @@
+"""
+Engines used to validate the json data of the instances and solutions against the schemas of the DAGs:
+
+- marshmallow: the jsonschema is turned into marshmallow classes by cornflow_client's SchemaManager,
+  that deserialize the whole data into new objects.
+- jsonschema: the jsonschema is compiled into python functions that check the data as it is,
+  without building any object (falling back to the jsonschema package for the keywords not compiled).
+
+Both engines build a class with the load method of a marshmallow schema,
+so the data is validated the same way with either of them (see validate_and_continue).
+The engine is chosen for each DAG with VALIDATION_ENGINES, or else it is DEFAULT_VALIDATION_ENGINE.
+"""
+# Import from libraries
+from cornflow_client import SchemaManager
+from cornflow_client.airflow.api import validate_and_continue
+from cornflow_client.constants import InvalidUsage
+from jsonschema.validators import validator_for
+from marshmallow import ValidationError
+
+VALIDATION_MARSHMALLOW = "marshmallow"
+VALIDATION_JSONSCHEMA = "jsonschema"
+VALIDATION_ENGINES = [VALIDATION_MARSHMALLOW, VALIDATION_JSONSCHEMA]
+
+
+# keywords that check the data but are not compiled: the jsonschema package is used for the schemas with them.
+# Any other unknown keyword is ignored, as the specification says
+UNSUPPORTED_KEYWORDS = {
+    "additionalItems",
+    "contains",
+    "dependencies",
+    "if",
+    "then",
+    "else",
+    "maxProperties",
+    "minProperties",
+    "multipleOf",
+    "not",
+    "pattern",
+    "patternProperties",
+    "propertyNames",
+    "uniqueItems",
+}
+# the drafts whose keywords the compiler knows
+COMPILED_DRAFTS = ["draft-04", "draft-06", "draft-07"]
+# keywords compiled that do not exist in some drafts (so they are ignored there)
+DRAFT_KEYWORDS = {"draft-04": {"const"}}
+
+
+class _Unsupported(Exception):
+    """The jsonschema uses a keyword that the compiler does not support"""
+
+
+class _Invalid(Exception):
+    """The data does not fit the jsonschema. The path is filled (backwards) as the error goes up"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+        self.path = []
+
+
+def _is_integer(value):
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+def _is_integer_draft4(value):
+    # draft-04 does not take the numbers with a zero fractional part as integers
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_equal(one, other):
+    # equality of JSON Schema: the booleans are not numbers and the numbers are compared by value
+    if isinstance(one, bool) or isinstance(other, bool):
+        return isinstance(one, bool) and isinstance(other, bool) and one == other
+    if isinstance(one, list) and isinstance(other, list):
+        return len(one) == len(other) and all(map(_is_equal, one, other))
+    if isinstance(one, dict) and isinstance(other, dict):
+        return one.keys() == other.keys() and all(
+            _is_equal(one[key], other[key]) for key in one
+        )
+    return one == other
+
+
+TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+    "number": _is_number,
+    "integer": _is_integer,
+}
+DRAFT_TYPE_CHECKS = {"draft-04": {**TYPE_CHECKS, "integer": _is_integer_draft4}}
+
+
+class _Compiler:
+    """
+    Turns a jsonschema into nested python functions that check the data.
+    The local references ($ref to "#/...") are compiled once, even if they are recursive.
+
+    :param dict root: the whole jsonschema
+    :param str draft: the draft of the jsonschema, one of COMPILED_DRAFTS
+    """
+
+    def __init__(self, root, draft):
+        self.root = root
+        self.references = dict()
+        self.type_checks = DRAFT_TYPE_CHECKS.get(draft, TYPE_CHECKS)
+        self.ignored_keywords = DRAFT_KEYWORDS.get(draft, set())
+
+    def compile(self, schema):
+        if schema is True or schema == dict():
+            return lambda value: None
+        if schema is False:
+            return self._fail("False schema does not allow {!r}")
+        if not isinstance(schema, dict):
+            raise _Unsupported()
+        if schema is not self.root and ("$id" in schema or "id" in schema):
+            # the references inside are resolved against another base
+            raise _Unsupported()
+        if "$ref" in schema:
+            return self._compile_reference(schema["$ref"])
+        checks = []
+        for keyword, argument in schema.items():
+            if keyword in UNSUPPORTED_KEYWORDS:
+                raise _Unsupported()
+            if keyword in self.ignored_keywords:
+                continue
+            method = getattr(self, "_keyword_" + keyword, None)
+            if method is None:
+                continue
+            check = method(argument, schema)
+            if check is not None:
+                checks.append(check)
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value):
+            for check in checks:
+                check(value)
+
+        return check_all
+
+    @staticmethod
+    def _fail(message):
+        def check(value):
+            raise _Invalid(message.format(value))
+
+        return check
+
+    def _compile_reference(self, reference):
+        if not reference.startswith("#"):
+            raise _Unsupported()
+        if reference not in self.references:
+            compiled = []
+            # placeholder, so recursive references use the function once it is compiled
+            self.references[reference] = lambda value: compiled[0](value)
+            target = self.root
+            for part in reference[1:].split("/")[1:]:
+                part = part.replace("~1", "/").replace("~0", "~")
+                target = target[int(part) if isinstance(target, list) else part]
+            compiled.append(self.compile(target))
+        return self.references[reference]
+
+    def _keyword_type(self, argument, schema):
+        types = [argument] if isinstance(argument, str) else list(argument)
+        if any(name not in self.type_checks for name in types):
+            raise _Unsupported()
+        type_checks = [self.type_checks[name] for name in types]
+        message = "{!r} is not of type " + ", ".join(repr(name) for name in types)
+
+        def check(value):
+            for type_check in type_checks:
+                if type_check(value):
+                    return
+            raise _Invalid(message.format(value))
+
+        return check
+
+    def _keyword_enum(self, argument, schema):
+        def check(value):
+            if not any(_is_equal(value, option) for option in argument):
+                raise _Invalid("{!r} is not one of {!r}".format(value, argument))
+
+        return check
+
+    def _keyword_const(self, argument, schema):
+        def check(value):
+            if not _is_equal(value, argument):
+                raise _Invalid("{!r} was expected".format(argument))
+
+        return check
+
+    def _keyword_properties(self, argument, schema):
+        properties = [
+            (name, self.compile(subschema)) for name, subschema in argument.items()
+        ]
+
+        def check(value):
+            if not isinstance(value, dict):
+                return
+            for name, check_property in properties:
+                if name in value:
+                    try:
+                        check_property(value[name])
+                    except _Invalid as error:
+                        error.path.append(name)
+                        raise
+
+        return check
+
+    def _keyword_required(self, argument, schema):
+        def check(value):
+            if not isinstance(value, dict):
+                return
+            for name in argument:
+                if name not in value:
+                    raise _Invalid("{!r} is a required property".format(name))
+
+        return check
+
+    def _keyword_additionalProperties(self, argument, schema):
+        if "patternProperties" in schema:
+            raise _Unsupported()
+        known = set(schema.get("properties", dict()))
+        check_additional = self.compile(argument)
+
+        def check(value):
+            if not isinstance(value, dict):
+                return
+            for name in value:
+                if name in known:
+                    continue
+                try:
+                    check_additional(value[name])
+                except _Invalid as error:
+                    if argument is False:
+                        message = "Additional property {!r} is not allowed"
+                        error.message = message.format(name)
+                    else:
+                        error.path.append(name)
+                    raise
+
+        return check
+
+    def _keyword_items(self, argument, schema):
+        if isinstance(argument, list):
+            raise _Unsupported()
+        check_item = self.compile(argument)
+
+        def check(value):
+            if not isinstance(value, list):
+                return
+            for position, item in enumerate(value):
+                try:
+                    check_item(item)
+                except _Invalid as error:
+                    error.path.append(position)
+                    raise
+
+        return check
+
+    def _check_size(self, kind, size, compare, message):
+        def check(value):
+            if isinstance(value, kind) and compare(len(value), size):
+                raise _Invalid(message.format(value, size))
+
+        return check
+
+    def _keyword_minItems(self, argument, schema):
+        return self._check_size(list, argument, int.__lt__, "{!r} is too short")
+
+    def _keyword_maxItems(self, argument, schema):
+        return self._check_size(list, argument, int.__gt__, "{!r} is too long")
+
+    def _keyword_minLength(self, argument, schema):
+        return self._check_size(str, argument, int.__lt__, "{!r} is too short")
+
+    def _keyword_maxLength(self, argument, schema):
+        return self._check_size(str, argument, int.__gt__, "{!r} is too long")
+
+    @staticmethod
+    def _check_limit(limit, is_outside, message):
+        if isinstance(limit, bool):
+            # draft-04 exclusive limits
+            raise _Unsupported()
+
+        def check(value):
+            if _is_number(value) and is_outside(value, limit):
+                raise _Invalid(message.format(value, limit))
+
+        return check
+
+    def _keyword_minimum(self, argument, schema):
+        if schema.get("exclusiveMinimum") is True:
+            raise _Unsupported()
+        return self._check_limit(
+            argument, lambda a, b: a < b, "{!r} is less than the minimum of {!r}"
+        )
+
+    def _keyword_maximum(self, argument, schema):
+        if schema.get("exclusiveMaximum") is True:
+            raise _Unsupported()
+        return self._check_limit(
+            argument, lambda a, b: a > b, "{!r} is more than the maximum of {!r}"
+        )
+
+    def _keyword_exclusiveMinimum(self, argument, schema):
+        return self._check_limit(
+            argument,
+            lambda a, b: a <= b,
+            "{!r} is less than or equal to the minimum of {!r}",
+        )
+
+    def _keyword_exclusiveMaximum(self, argument, schema):
+        return self._check_limit(
+            argument,
+            lambda a, b: a >= b,
+            "{!r} is more than or equal to the maximum of {!r}",
+        )
+
+    def _keyword_allOf(self, argument, schema):
+        subchecks = [self.compile(subschema) for subschema in argument]
+
+        def check(value):
+            for subcheck in subchecks:
+                subcheck(value)
+
+        return check
+
+    def _count_valid(self, subchecks, value):
+        valid = 0
+        for subcheck in subchecks:
+            try:
+                subcheck(value)
+            except _Invalid:
+                continue
+            valid += 1
+        return valid
+
+    def _keyword_anyOf(self, argument, schema):
+        subchecks = [self.compile(subschema) for subschema in argument]
+
+        def check(value):
+            for subcheck in subchecks:
+                try:
+                    subcheck(value)
+                    return
+                except _Invalid:
+                    continue
+            raise _Invalid(
+                "{!r} is not valid under any of the given schemas".format(value)
+            )
+
+        return check
+
+    def _keyword_oneOf(self, argument, schema):
+        subchecks = [self.compile(subschema) for subschema in argument]
+
+        def check(value):
+            if self._count_valid(subchecks, value) != 1:
+                message = "{!r} is not valid under exactly one of the given schemas"
+                raise _Invalid(message.format(value))
+
+        return check
+
+
+def compile_jsonschema(jsonschema):
+    """
+    Compiles a jsonschema (draft 4, 6 or 7) into a python function that checks the data against it.
+
+    :param dict jsonschema: the jsonschema
+    :return: a function that returns the error (path and message) of the data or None if it is valid.
+      None if the jsonschema uses keywords that cannot be compiled
+    """
+    schema_uri = COMPILED_DRAFTS[-1]
+    if isinstance(jsonschema, dict):
+        schema_uri = jsonschema.get("$schema", schema_uri)
+    draft = next((name for name in COMPILED_DRAFTS if name in schema_uri), None)
+    if draft is None:
+        return None
+    try:
+        check = _Compiler(jsonschema, draft).compile(jsonschema)
+    except _Unsupported:
+        return None
+
+    def validate(data):
+        try:
+            check(data)
+        except _Invalid as error:
+            return list(reversed(error.path)), error.message
+        return None
+
+    return validate
+
+
+class JsonSchemaValidator:
+    """
+    Base class of the validators built by :func:`jsonschema_to_validator`
+    """
+
+    # the function that returns the error of the data, shared by all the objects of the class
+    validate = None
+
+    def load(self, data):
+        """
+        Validates the data
+
+        :param data: the data to validate
+        :return: the same data, if it is valid
+        """
+        error = type(self).validate(data)
+        if error is not None:
+            path, message = error
+            path = "/".join(str(element) for element in path)
+            raise ValidationError({path or "_schema": [message]})
+        return data
+
+
+def jsonschema_to_validator(jsonschema):
+    """
+    Compiles a jsonschema into a validator class.
+    The jsonschemas that the compiler does not support are checked with the jsonschema package.
+
+    :param dict jsonschema: the jsonschema
+    :return: the validator class
+    """
+    validator_class = validator_for(jsonschema)
+    validator_class.check_schema(jsonschema)
+    validate = compile_jsonschema(jsonschema)
+    if validate is None:
+        validator = validator_class(jsonschema)
+
+        def validate(data):
+            error = next(validator.iter_errors(data), None)
+            if error is None:
+                return None
+            return list(error.absolute_path), error.message
+
+    return type(
+        "JsonSchemaValidator",
+        (JsonSchemaValidator,),
+        dict(validate=staticmethod(validate)),
+    )
+
+
+def build_schema_class(jsonschema, engine=VALIDATION_MARSHMALLOW):
+    """
+    Builds the class that validates the data of a jsonschema with an engine
+
+    :param dict jsonschema: the jsonschema
+    :param str engine: marshmallow or jsonschema
+    :return: the class, with the load method of a marshmallow schema
+    """
+    if engine == VALIDATION_JSONSCHEMA:
+        return jsonschema_to_validator(jsonschema)
+    return SchemaManager(jsonschema).jsonschema_to_flask()
+
+
+# classes built by validate_data in each process, by hash of the jsonschema and engine
+_built_classes = dict()
+MAX_BUILT_CLASSES = 32
+
+
+def validate_data(schema_hash, jsonschema, engine, data):
+    """
+    Validates some data against a jsonschema. It can run in another process (see :func:`run_in_process`):
+    the class of the jsonschema is built there the first time it is used
+
+    :param str schema_hash: the hash of the jsonschema
+    :param dict jsonschema: the jsonschema
+    :param str engine: marshmallow or jsonschema
+    :param data: the data to validate
+    :return: the error found or None if the data is valid
+    :rtype: str
+    """
+    schema_class = _built_classes.get((schema_hash, engine))
+    if schema_class is None:
+        if len(_built_classes) >= MAX_BUILT_CLASSES:
+            _built_classes.clear()
+        schema_class = build_schema_class(jsonschema, engine)
+        _built_classes[(schema_hash, engine)] = schema_class
+    try:
+        validate_and_continue(schema_class(), data)
+    except InvalidUsage as e:
+        return e.error
+    return None
+
+
+def parse_validation_engines(value):
+    """
+    Reads the engines to use for each DAG
+
+    :param str value: comma separated pairs dag_name=engine
+    :return: the engine of each DAG
+    :rtype: dict
+    """
+    engines = dict()
+    for pair in value.split(","):
+        if not pair.strip():
+            continue
+        dag_name, engine = (element.strip() for element in pair.split("=", 1))
+        if engine not in VALIDATION_ENGINES:
+            raise ValueError("Unknown validation engine: {}".format(engine))
+        engines[dag_name] = engine
+    return engines
@@ -0,0 +1,112 @@
+"""
+Pool of threads that run the background tasks of each worker (like the asynchronous validation of the instances),
+so the CPU-heavy steps are taken off the request path.
+Each task runs inside its own application context, so it gets its own database session.
+The CPU-heavy steps of the tasks run in a pool of processes (see :meth:`WorkerPool.run_in_process`):
+with the gevent workers of gunicorn the threads are greenlets, that would block every request of the worker.
+The tasks are kept in memory: the ones pending when the worker stops are lost,
+so their effects have to be recovered by someone else (like the reconcile_executions command).
+"""
+# Import from libraries
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from flask import current_app
+import logging as log
+import threading
+
+
+class WorkerPool:
+    """
+    Threads that run the tasks submitted by the endpoints
+
+    :param app: the flask application the tasks run in
+    :param int max_workers: the number of threads (and processes)
+    :param bool processes: if True, the CPU-heavy steps of the tasks run in a pool of processes
+    """
+
+    def __init__(self, app, max_workers=4, processes=False):
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="cornflow-worker"
+        )
+        self.process_pool = ProcessPoolExecutor(max_workers) if processes else None
+        self.lock = threading.Lock()
+        self.pending = set()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Runs a function in one of the threads of the pool
+
+        :param func: the function to run
+        :return: the future of its result
+        :rtype: :class:`Future`
+        """
+        future = self.executor.submit(self._run, func, *args, **kwargs)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def run_in_process(self, func, *args):
+        """
+        Runs a CPU-heavy function in the pool of processes and waits for its result.
+        The function and its arguments have to be picklable.
+        Without a pool of processes, it runs in the calling thread
+
+        :param func: the function to run
+        :return: the result of the function
+        """
+        if self.process_pool is None:
+            return func(*args)
+        return self.process_pool.submit(func, *args).result()
+
+    def _run(self, func, *args, **kwargs):
+        with self.app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                log.error("Background task {} failed: {}".format(func.__name__, e))
+                raise
+
+    def _done(self, future):
+        with self.lock:
+            self.pending.discard(future)
+
+    def wait(self, timeout=None):
+        """
+        Waits until the tasks submitted so far have finished
+
+        :param float timeout: maximum number of seconds to wait
+        """
+        with self.lock:
+            pending = list(self.pending)
+        wait(pending, timeout)
+
+
+def submit_task(func, *args, **kwargs):
+    """
+    Runs a function in the worker pool of the current application
+
+    :param func: the function to run
+    :return: the future of its result
+    :rtype: :class:`Future`
+    """
+    return current_app.extensions["worker_pool"].submit(func, *args, **kwargs)
+
+
+def run_in_process(func, *args):
+    """
+    Runs a CPU-heavy function in the pool of processes of the current application (see :meth:`WorkerPool.run_in_process`)
+
+    :param func: the function to run
+    :return: the result of the function
+    """
+    return current_app.extensions["worker_pool"].run_in_process(func, *args)
+
+
+def init_worker_pool(flask_app):
+    """Initialize the pool of threads (and processes) that run the background tasks"""
+    flask_app.extensions["worker_pool"] = WorkerPool(
+        flask_app,
+        flask_app.config["WORKER_POOL_SIZE"],
+        processes=flask_app.config["WORKER_POOL_PROCESSES"],
+    )
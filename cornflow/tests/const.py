@@ -29,6 +29,8 @@ FULL_CASE_LIST = [FULL_CASE_PATH, _get_file("./data/full_case_raw_2.json")]
 JSON_PATCH_GOOD_PATH = _get_file("./data/json_patch_good.json")
 JSON_PATCH_BAD_PATH = _get_file("./data/json_patch_bad.json")
 FULL_CASE_JSON_PATCH_1 = _get_file("./data/full_case_patch.json")
+# cases in the format of the JSON-Schema-Test-Suite for the keywords of the compiled validator
+JSONSCHEMA_SUITE_PATH = _get_file("./data/jsonschema_suite.json")
 
 LOGIN_URL = PREFIX + "/login/"
 SIGNUP_URL = PREFIX + "/signup/"
@@ -15,7 +15,12 @@ from cornflow.app import create_app
 from cornflow.commands import AccessInitialization
 from cornflow.models import UserModel, UserRoleModel
 from cornflow.shared.authentication import Auth
-from cornflow.shared.const import ADMIN_ROLE, PLANNER_ROLE, SERVICE_ROLE
+from cornflow.shared.const import (
+    ADMIN_ROLE,
+    NEXT_CURSOR_HEADER,
+    PLANNER_ROLE,
+    SERVICE_ROLE,
+)
 from cornflow.shared.utils import db
 from cornflow.tests.const import LOGIN_URL, SIGNUP_URL, USER_URL, USER_ROLE_URL
 
@@ -322,6 +327,37 @@ class BaseTestCases:
             allrows = self.get_rows(self.url, data_many)
             self.apply_filter(self.url, dict(offset=1, limit=2), allrows.json[1:3])
 
+        def test_opt_filters_cursor(self):
+            # we create 4 instances
+            data_many = [self.payload for _ in range(4)]
+            allrows = self.get_rows(self.url, data_many)
+            response = self.client.get(
+                self.url.split("?")[0],
+                follow_redirects=True,
+                query_string=dict(limit=2),
+                headers=self.get_header_with_auth(self.token),
+            )
+            self.assertEqual(response.json, allrows.json[:2])
+            cursor = response.headers[NEXT_CURSOR_HEADER]
+            self.apply_filter(self.url, dict(cursor=cursor, limit=2), allrows.json[2:])
+            # the last page is smaller than the limit so it has no cursor
+            response = self.client.get(
+                self.url.split("?")[0],
+                follow_redirects=True,
+                query_string=dict(cursor=cursor, limit=3),
+                headers=self.get_header_with_auth(self.token),
+            )
+            self.assertNotIn(NEXT_CURSOR_HEADER, response.headers)
+
+        def test_opt_filters_bad_cursor(self):
+            response = self.client.get(
+                self.url.split("?")[0],
+                follow_redirects=True,
+                query_string=dict(cursor="not-a-cursor"),
+                headers=self.get_header_with_auth(self.token),
+            )
+            self.assertEqual(400, response.status_code)
+
         @patch("cornflow.endpoints.instance.get_schema")
         def test_opt_filters_schema(self, get_schema):
             # (we patch the request to airflow to check if the schema is valid)
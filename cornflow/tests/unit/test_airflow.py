@@ -0,0 +1,79 @@
+"""
+Unit test for the airflow client shared by the requests
+"""
+
+# Import from libraries
+import unittest
+from unittest.mock import Mock
+
+import requests
+
+# Import from internal modules
+from cornflow.shared.airflow import AirflowClient
+from cornflow.shared.exceptions import AirflowError
+
+
+class TestAirflowClient(unittest.TestCase):
+    def setUp(self):
+        self.client = AirflowClient("http://localhost:8080", "admin", "admin")
+        self.session = self.client.session = Mock()
+        healthy = dict(status="healthy")
+        self.session.get.return_value.json.return_value = dict(
+            metadatabase=healthy, scheduler=healthy
+        )
+
+    def test_alive_cached(self):
+        self.assertTrue(self.client.is_alive())
+        self.assertTrue(self.client.is_alive())
+        self.session.get.assert_called_once()
+        self.client.alive_ttl = 0
+        self.assertTrue(self.client.is_alive())
+        self.assertEqual(2, self.session.get.call_count)
+
+    def test_not_alive(self):
+        self.session.get.side_effect = requests.ConnectionError()
+        self.assertFalse(self.client.is_alive())
+
+    def test_dag_info_cached(self):
+        self.session.request.return_value.status_code = 200
+        response = self.client.get_dag_info("solve_model_dag")
+        self.assertIs(response, self.client.get_dag_info("solve_model_dag"))
+        self.session.request.assert_called_once()
+        self.client.get_dag_info("timer")
+        self.assertEqual(2, self.session.request.call_count)
+
+    def test_connection_error(self):
+        self.assertTrue(self.client.is_alive())
+        self.session.request.side_effect = requests.ConnectionError()
+        self.assertRaises(AirflowError, self.client.run_dag, "exec_id")
+        # the health is checked again after the failure
+        self.client.is_alive()
+        self.assertEqual(2, self.session.get.call_count)
+
+    def test_get_dag_runs(self):
+        pages = [
+            [dict(dag_run_id="run_{}".format(i), state="success") for i in range(2)],
+            [dict(dag_run_id="run_2", state="running")],
+        ]
+        self.session.request.return_value.status_code = 200
+        self.session.request.return_value.json.side_effect = [
+            dict(dag_runs=page) for page in pages
+        ]
+        dag_runs = self.client.get_dag_runs(
+            "solve_model_dag", ["run_0", "run_2", "run_5"], page_limit=2
+        )
+        self.assertEqual({"run_0", "run_2"}, set(dag_runs))
+        self.assertEqual("running", dag_runs["run_2"]["state"])
+        self.assertEqual(2, self.session.request.call_count)
+        payload = self.session.request.call_args[1]["json"]
+        self.assertEqual(["solve_model_dag"], payload["dag_ids"])
+
+    def test_pooled_connections(self):
+        client = AirflowClient("http://localhost:8080", "admin", "admin", pool_size=5)
+        adapter = client.session.get_adapter("http://localhost:8080/api/v1/health")
+        self.assertEqual(5, adapter._pool_maxsize)
+        self.assertEqual(3, adapter.max_retries.total)
+
+
+if __name__ == "__main__":
+    unittest.main()
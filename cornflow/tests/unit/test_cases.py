@@ -12,7 +12,14 @@ import zlib
 
 
 # Import from internal modules
-from cornflow.models import CaseModel, ExecutionModel, InstanceModel, UserModel
+from cornflow.commands import CleanDataBlobs
+from cornflow.models import (
+    CaseModel,
+    DataBlobModel,
+    ExecutionModel,
+    InstanceModel,
+    UserModel,
+)
 from cornflow.shared.utils import hash_json_256
 from cornflow.tests.const import (
     INSTANCE_URL,
@@ -270,6 +277,24 @@ class TestCaseCopyEndpoint(CustomTestCase):
         for key in self.new_items:
             self.assertNotEqual(getattr(original_case, key), getattr(new_case, key))
 
+    def test_copy_shares_data_blobs(self):
+        blobs = DataBlobModel.query.count()
+        new_case = self.create_new_row(
+            self.url + str(self.case_id) + "/copy/", self.model, {}, check_payload=False
+        )
+        self.assertEqual(blobs, DataBlobModel.query.count())
+        case = CaseModel.query.get(new_case["id"])
+        for data_hash in [case.data_hash, case.solution_hash]:
+            self.assertEqual(2, DataBlobModel.query.get(data_hash).ref_count)
+
+    def test_delete_releases_data_blobs(self):
+        case = CaseModel.query.get(self.case_id)
+        data_hash = case.data_hash
+        self.delete_row(self.url + str(self.case_id) + "/")
+        self.assertEqual(0, DataBlobModel.query.get(data_hash).ref_count)
+        CleanDataBlobs().run()
+        self.assertIsNone(DataBlobModel.query.get(data_hash))
+
 
 class TestCaseListEndpoint(BaseTestCases.ListFilters):
     def setUp(self):
@@ -342,6 +367,8 @@ class TestCaseToInstanceEndpoint(CustomTestCase):
             "executions",
             "data_hash",
             "schema",
+            "validation_state",
+            "validation_message",
         }
 
     def test_case_to_new_instance(self):
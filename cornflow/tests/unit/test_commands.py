@@ -1,7 +1,10 @@
 from flask_testing import TestCase
+from sqlalchemy import text
 
 from cornflow.app import create_app
 from cornflow.commands import (
+    BenchmarkValidation,
+    CompressStoredData,
     RegisterBasePermissions,
     CreateAdminUser,
     CreateServiceUser,
@@ -14,6 +17,7 @@ from cornflow.endpoints import resources
 from cornflow.models import (
     ActionModel,
     ApiViewModel,
+    DataBlobModel,
     PermissionViewRoleModel,
     RoleModel,
     UserModel,
@@ -23,7 +27,9 @@ from cornflow.shared.const import (
     ROLES_MAP,
     BASE_PERMISSION_ASSIGNATION,
 )
+from cornflow.shared.storage import GZIP_MAGIC
 from cornflow.shared.utils import db
+from cornflow.shared.validators import VALIDATION_ENGINES
 
 
 class TestCommands(TestCase):
@@ -181,3 +187,21 @@ class TestCommands(TestCase):
 
         for r in roles:
             self.assertEqual(ROLES_MAP[r.id], r.name)
+
+    def test_compress_stored_data(self):
+        self.app.config["STORAGE_COMPRESSION"] = "none"
+        data = {"a": "b" * 2000}
+        db.session.execute(
+            DataBlobModel.__table__.insert().values(hash="hash", data=data, ref_count=1)
+        )
+        db.session.commit()
+        get_raw = lambda: db.session.execute(text("SELECT data FROM data_blobs")).scalar()
+        self.assertNotEqual(GZIP_MAGIC, get_raw()[:2])
+
+        CompressStoredData().run(algorithm="gzip", batch_size=1)
+        self.assertEqual(GZIP_MAGIC, get_raw()[:2])
+        self.assertEqual(data, DataBlobModel.get_data("hash"))
+
+    def test_benchmark_validation(self):
+        times = BenchmarkValidation().run(size=10, repeat=1)
+        self.assertEqual(set(VALIDATION_ENGINES), set(times))
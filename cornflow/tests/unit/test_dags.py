@@ -3,12 +3,22 @@ Unit test for the DAG endpoints
 """
 
 # Import from libraries
+import datetime
 import json
+from unittest.mock import patch
 
 # Import from internal modules
-from cornflow.shared.const import EXEC_STATE_CORRECT, EXEC_STATE_MANUAL
+from cornflow.models import ExecutionLogChunkModel, ExecutionProgressModel
+from cornflow.shared.const import (
+    EXEC_STATE_CORRECT,
+    EXEC_STATE_MANUAL,
+    EXEC_STATE_NOT_RUN,
+    EXEC_STATE_RUNNING,
+)
+from cornflow.shared.utils import db
 from cornflow.tests.const import (
     DAG_URL,
+    EXECUTION_URL,
     EXECUTION_URL_NORUN,
     CASE_PATH,
     INSTANCE_URL,
@@ -108,3 +118,160 @@ class TestDagDetailEndpoint(TestExecutionsDetailEndpointMock):
         self.assertEqual(data["data"], instance_data["data"])
         self.assertEqual(data["config"], self.payload["config"])
         return
+
+    def test_get_dag_etag(self):
+        idx = self.create_new_row(EXECUTION_URL_NORUN, self.model, self.payload)
+        token = self.create_service_user()
+        headers = self.get_header_with_auth(token)
+        response = self.client.get(DAG_URL + idx + "/", headers=headers)
+        headers["If-None-Match"] = response.headers["ETag"]
+        response = self.client.get(DAG_URL + idx + "/", headers=headers)
+        self.assertEqual(304, response.status_code)
+        # new results of the execution change the ETag
+        self.client.put(
+            DAG_URL + idx + "/",
+            json=dict(state=EXEC_STATE_CORRECT),
+            headers=self.get_header_with_auth(token),
+        )
+        response = self.client.get(DAG_URL + idx + "/", headers=headers)
+        self.assertEqual(200, response.status_code)
+
+
+class TestDagProgressEndpoint(TestExecutionsDetailEndpointMock):
+    def setUp(self):
+        super().setUp()
+        self.idx = self.create_new_row(EXECUTION_URL_NORUN, self.model, self.payload)
+        self.service_token = self.create_service_user()
+        with open(CASE_PATH) as f:
+            self.solution = json.load(f)["data"]
+
+    def set_running(self):
+        self.model.change_state(self.idx, EXEC_STATE_RUNNING)
+        db.session.commit()
+
+    def post_progress(self, payload, token=None, expected_status=201):
+        response = self.client.post(
+            DAG_URL + self.idx + "/progress/",
+            json=payload,
+            headers=self.get_header_with_auth(token or self.service_token),
+        )
+        self.assertEqual(expected_status, response.status_code)
+        return response.json
+
+    def test_progress(self):
+        self.set_running()
+        response = self.post_progress(
+            dict(
+                progress=[dict(time=1, gap=0.5), dict(time=2, gap=0.2)],
+                log_text="first chunk\n",
+            )
+        )
+        self.assertEqual(2, response["progress"])
+        self.assertEqual(1, response["log"])
+        response = self.post_progress(
+            dict(
+                solution=self.solution,
+                solution_schema="pulp",
+                progress=[dict(time=3, gap=0.1)],
+                log_text="second chunk\n",
+            )
+        )
+        self.assertEqual(3, response["progress"])
+        self.assertEqual(2, response["log"])
+        chunks = ExecutionLogChunkModel.get_after(self.idx)
+        self.assertEqual(
+            ["first chunk\n", "second chunk\n"], [chunk.content for chunk in chunks]
+        )
+        # the users only get the rows they do not have
+        response = self.client.get(
+            EXECUTION_URL + self.idx + "/progress/?after=1",
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([2, 3], [row["position"] for row in response.json])
+        self.assertEqual(dict(time=3, gap=0.1), response.json[1]["values"])
+        # the best solution so far is the data of the execution
+        response = self.client.get(
+            EXECUTION_URL + self.idx + "/data/",
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(self.solution, response.json["data"])
+        # and the final call only sets the state
+        response = self.client.put(
+            DAG_URL + self.idx + "/",
+            json=dict(state=EXEC_STATE_CORRECT),
+            headers=self.get_header_with_auth(self.service_token),
+        )
+        self.assertEqual(200, response.status_code)
+        execution = self.model.query.get(self.idx)
+        self.assertEqual(EXEC_STATE_CORRECT, execution.state)
+        self.assertEqual(self.solution, execution.data)
+
+    def test_final_log(self):
+        self.set_running()
+        self.post_progress(dict(log_text="first chunk\n"))
+        self.post_progress(dict(log_text="second chunk\n"))
+        execution = self.model.query.get(self.idx)
+        self.assertEqual("first chunk\nsecond chunk\n", execution.get_log())
+        # the whole log sent at the end replaces the chunks
+        response = self.client.put(
+            DAG_URL + self.idx + "/",
+            json=dict(state=EXEC_STATE_CORRECT, log_text="whole log\n"),
+            headers=self.get_header_with_auth(self.service_token),
+        )
+        self.assertEqual(200, response.status_code)
+        execution = self.model.query.get(self.idx)
+        self.assertEqual("whole log\n", execution.get_log())
+        self.assertEqual(1, ExecutionLogChunkModel.query.count())
+
+    def test_progress_concurrent(self):
+        self.set_running()
+        get_last_position = ExecutionProgressModel.get_last_position
+        table = ExecutionProgressModel.__table__
+        calls = []
+
+        def get_last_position_and_append(execution_id):
+            position = get_last_position(execution_id)
+            if not calls:
+                # another request appends its row meanwhile
+                db.engine.execute(
+                    table.insert().values(
+                        execution_id=execution_id,
+                        position=position + 1,
+                        created_at=datetime.datetime.utcnow(),
+                        content=dict(time=1),
+                    )
+                )
+            calls.append(position)
+            return position
+
+        with patch.object(
+            ExecutionProgressModel, "get_last_position", get_last_position_and_append
+        ):
+            response = self.post_progress(dict(progress=[dict(time=2)]))
+        # the positions are taken again
+        self.assertEqual([0, 1], calls)
+        self.assertEqual(2, response["progress"])
+        rows = ExecutionProgressModel.get_after(self.idx)
+        self.assertEqual([dict(time=1), dict(time=2)], [row.content for row in rows])
+
+    def test_progress_not_running(self):
+        response = self.post_progress(
+            dict(progress=[dict(time=1)]), expected_status=409
+        )
+        self.assertEqual(EXEC_STATE_NOT_RUN, response["state"])
+        self.assertEqual([], ExecutionProgressModel.get_after(self.idx))
+
+    def test_progress_invalid_solution(self):
+        self.set_running()
+        self.post_progress(
+            dict(solution=dict(wrong=1), solution_schema="pulp"), expected_status=400
+        )
+
+    def test_progress_planner(self):
+        self.set_running()
+        self.post_progress(
+            dict(progress=[dict(time=1)]),
+            token=self.create_planner(),
+            expected_status=403,
+        )
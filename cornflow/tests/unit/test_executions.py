@@ -3,11 +3,55 @@ Unit test for the executions endpoints
 """
 
 # Import from libraries
+from cornflow_client import get_pulp_jsonschema
+from cornflow_client.airflow.api import validate_and_continue
+from cornflow_client.constants import INSTANCE_SCHEMA, SOLUTION_SCHEMA
+import datetime
 import json
+import sqlalchemy as sa
+import threading
+from unittest.mock import Mock, patch
 
 # Import from internal modules
-from cornflow.models import ExecutionModel, InstanceModel
+from cornflow.endpoints.instance import revalidate_instances, validate_instance
+from cornflow.models import (
+    ExecutionLogChunkModel,
+    ExecutionModel,
+    InstanceModel,
+    ValidationResultModel,
+)
+from cornflow.shared.exceptions import AirflowError
+from cornflow.shared.executors import (
+    AirflowExecutor,
+    LocalExecutor,
+    init_executors,
+)
+from cornflow.shared.events import ExecutionStateHub, SSE_MIMETYPE
+from cornflow.shared.reconciler import (
+    expire_local_executions,
+    LAUNCH_GRACE_PERIOD,
+    reconcile_executions,
+    update_states,
+)
+from cornflow.shared.utils import db
+from cornflow.shared.const import (
+    EXEC_STATE_CORRECT,
+    EXEC_STATE_ERROR,
+    EXEC_STATE_ERROR_START,
+    EXEC_STATE_NOT_RUN,
+    EXEC_STATE_PENDING,
+    EXEC_STATE_QUEUED,
+    EXEC_STATE_RUNNING,
+    EXEC_STATE_STOPPED,
+    EXEC_STATE_UNKNOWN,
+    EXECUTOR_LOCAL,
+    INSTANCE_STATE_QUEUED,
+    INSTANCE_STATE_VALID,
+    LOG_MIMETYPE,
+    PLANNER_ROLE,
+)
 from cornflow.tests.const import (
+    DAG_URL,
     INSTANCE_PATH,
     EXECUTION_PATH,
     EXECUTIONS_LIST,
@@ -52,6 +96,146 @@ class TestExecutionsListEndpoint(BaseTestCases.ListFilters):
         self.assertEqual(404, response.status_code)
         self.assertTrue("error" in response.json)
 
+    @patch("cornflow.endpoints.execution.get_schema_version", Mock(return_value="v1"))
+    @patch("cornflow.endpoints.execution.get_schema")
+    @patch("cornflow.shared.executors.get_airflow_client")
+    @patch("cornflow.endpoints.instance.submit_task")
+    def test_new_execution_queued(self, submit_task, get_airflow_client, get_schema):
+        with open(INSTANCE_PATH) as f:
+            payload = json.load(f)
+        instance_id = self.create_new_row(
+            INSTANCE_URL + "?validate=async", InstanceModel, payload
+        )
+        submit_task.assert_called_once_with(
+            validate_instance, instance_id, "solve_model_dag"
+        )
+        get_schema.return_value = lambda: Mock()
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_info.return_value.json.return_value = dict(is_paused=False)
+        af_client.run_dag.return_value.json.return_value = dict(dag_run_id="run")
+        self.payload["instance_id"] = instance_id
+        # the execution waits for the instance to be validated
+        idx = self.create_new_row(EXECUTION_URL, self.model, self.payload)
+        self.assertEqual(EXEC_STATE_QUEUED, self.model.query.get(idx).state)
+        af_client.run_dag.assert_not_called()
+        validate_instance(instance_id, "solve_model_dag")
+        execution = self.model.query.get(idx)
+        self.assertEqual(EXEC_STATE_RUNNING, execution.state)
+        self.assertEqual("run", execution.dag_run_id)
+        af_client.run_dag.assert_called_once()
+
+    @patch("cornflow.endpoints.execution.get_schema_version", Mock(return_value="v1"))
+    @patch("cornflow.endpoints.execution.get_schema", Mock(return_value=Mock))
+    @patch("cornflow.shared.executors.get_airflow_client")
+    @patch("cornflow.endpoints.instance.submit_task")
+    def test_new_execution_queued_retried(self, submit_task, get_airflow_client):
+        with open(INSTANCE_PATH) as f:
+            payload = json.load(f)
+        instance_id = self.create_new_row(
+            INSTANCE_URL + "?validate=async", InstanceModel, payload
+        )
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_info.return_value.json.return_value = dict(is_paused=False)
+        af_client.run_dag.return_value.json.return_value = dict(dag_run_id="run")
+        self.payload["instance_id"] = instance_id
+        idx = self.create_new_row(EXECUTION_URL, self.model, self.payload)
+        # the schema cannot be fetched: the instance is not taken as invalid
+        with patch("cornflow.endpoints.instance.get_schema_source") as source:
+            source.side_effect = AirflowError(error="Airflow is not accessible")
+            self.assertEqual(
+                INSTANCE_STATE_QUEUED, validate_instance(instance_id, "solve_model_dag")
+            )
+        self.assertEqual(
+            INSTANCE_STATE_QUEUED, InstanceModel.query.get(instance_id).validation_state
+        )
+        self.assertEqual(EXEC_STATE_QUEUED, self.model.query.get(idx).state)
+        # the reconciler validates it again once it has waited long enough
+        self.assertEqual(0, revalidate_instances())
+        self.assertEqual(1, revalidate_instances(retry_after=0))
+        db.session.expire_all()
+        self.assertEqual(
+            INSTANCE_STATE_VALID, InstanceModel.query.get(instance_id).validation_state
+        )
+        self.assertEqual(EXEC_STATE_RUNNING, self.model.query.get(idx).state)
+        self.assertEqual(0, revalidate_instances(retry_after=0))
+
+    @patch("cornflow.endpoints.execution.validate_and_continue")
+    @patch("cornflow.shared.executors.get_airflow_client")
+    def test_new_execution_validation_cached(self, get_airflow_client, validate):
+        validate.side_effect = validate_and_continue
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_info.return_value.json.return_value = dict(is_paused=False)
+        af_client.run_dag.return_value.json.return_value = dict(dag_run_id="run")
+        registry = self.app.extensions["schema_registry"]
+        jsonschema = get_pulp_jsonschema()
+        registry.add_local("solve_model_dag", {INSTANCE_SCHEMA: jsonschema})
+        self.payload["schema"] = "solve_model_dag"
+        # the instance is validated only once
+        for _ in range(2):
+            self.create_new_row(EXECUTION_URL, self.model, self.payload)
+        self.assertEqual(1, validate.call_count)
+        self.assertEqual(1, ValidationResultModel.query.count())
+        # until the schema changes
+        jsonschema = dict(jsonschema, description="new version")
+        registry.add_local("solve_model_dag", {INSTANCE_SCHEMA: jsonschema})
+        self.create_new_row(EXECUTION_URL, self.model, self.payload)
+        self.assertEqual(2, validate.call_count)
+        self.assertEqual(2, ValidationResultModel.query.count())
+
+    @patch("cornflow.shared.executors.get_airflow_client")
+    def test_new_execution_result_cache(self, get_airflow_client):
+        get_airflow_client.return_value.is_alive.return_value = False
+        solved = self.model.query.get(
+            self.create_new_row(self.url, self.model, self.payload)
+        )
+        solved.data = dict(solution=1)
+        solved.set_log("solved")
+        solved.update_state(EXEC_STATE_CORRECT)
+        self.app.config["EXECUTION_RESULT_CACHE"] = True
+        try:
+            idx = self.create_new_row(EXECUTION_URL, self.model, self.payload)
+            execution = self.model.query.get(idx)
+            self.assertEqual(EXEC_STATE_CORRECT, execution.state)
+            self.assertEqual(solved.data_hash, execution.data_hash)
+            self.assertEqual(dict(solution=1), execution.data)
+            self.assertEqual("solved", execution.get_log())
+            get_airflow_client.assert_not_called()
+            # other configuration, or skipping the cache, goes to airflow
+            payload = dict(self.payload, config=dict(timeLimit=1))
+            for url, data in [
+                (EXECUTION_URL, payload),
+                (EXECUTION_URL + "?cache=0", self.payload),
+            ]:
+                response = self.client.post(
+                    url,
+                    data=json.dumps(data),
+                    headers=self.get_header_with_auth(self.token),
+                )
+                self.assertEqual(400, response.status_code)
+            self.assertEqual(2, get_airflow_client.call_count)
+        finally:
+            self.app.config["EXECUTION_RESULT_CACHE"] = False
+
+    @patch("cornflow.endpoints.instance.submit_task")
+    def test_new_execution_invalid_instance(self, submit_task):
+        with open(INSTANCE_PATH) as f:
+            payload = json.load(f)
+        del payload["data"]["parameters"]
+        instance_id = self.create_new_row(
+            INSTANCE_URL + "?validate=async", InstanceModel, payload
+        )
+        self.payload["instance_id"] = instance_id
+        idx = self.create_new_row(EXECUTION_URL, self.model, self.payload)
+        validate_instance(instance_id, "solve_model_dag")
+        self.assertEqual(EXEC_STATE_ERROR_START, self.model.query.get(idx).state)
+        # the new executions of the invalid instance are rejected
+        response = self.client.post(
+            EXECUTION_URL,
+            data=json.dumps(self.payload),
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(400, response.status_code)
+
     def test_get_executions(self):
         self.get_rows(self.url, self.payloads)
 
@@ -146,6 +330,822 @@ class TestExecutionsDetailEndpoint(
         )
 
 
+class TestExecutionsBatchEndpoint(TestExecutionsDetailEndpointMock):
+    def setUp(self):
+        super().setUp()
+        self.url = EXECUTION_URL + "batch/"
+        with open(INSTANCE_PATH) as f:
+            payload = json.load(f)
+        self.instance_ids = [
+            self.payload["instance_id"],
+            self.create_new_row(INSTANCE_URL, InstanceModel, payload),
+        ]
+
+    def post_batch(self, instance_ids, url=None, expected_status=201):
+        payload = dict(
+            executions=[
+                {**self.payload, "instance_id": idx, "config": {"timeLimit": number}}
+                for number, idx in enumerate(instance_ids)
+            ]
+        )
+        response = self.client.post(
+            url or self.url,
+            data=json.dumps(payload),
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(expected_status, response.status_code)
+        return response.json
+
+    @patch("cornflow.endpoints.execution.get_schema_version", Mock(return_value="v1"))
+    @patch("cornflow.endpoints.execution.get_schema")
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_new_executions(self, get_airflow_client, get_schema):
+        get_schema.return_value = lambda: Mock()
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_info.return_value.json.return_value = dict(is_paused=False)
+        af_client.run_dag.side_effect = lambda idx, dag_name: Mock(
+            json=Mock(return_value=dict(dag_run_id="run_" + idx))
+        )
+        first, second = self.instance_ids
+        results = self.post_batch([first, first, second, "missing", first])
+        self.assertEqual(5, len(results))
+        self.assertIn("error", results[3])
+        self.assertNotIn("id", results[3])
+        created = [result for result in results if "id" in result]
+        self.assertEqual(4, len({result["id"] for result in created}))
+        self.assertEqual(4, self.model.query.count())
+        for result in created:
+            self.assertEqual(EXEC_STATE_RUNNING, result["state"])
+            execution = self.model.query.get(result["id"])
+            self.assertEqual("run_" + execution.id, execution.dag_run_id)
+            self.assertEqual(result["instance_id"], execution.instance_id)
+        # each DAG and each instance are checked once
+        af_client.is_alive.assert_called_once()
+        af_client.get_dag_info.assert_called_once()
+        self.assertEqual(2, get_schema.call_count)
+        self.assertEqual(4, af_client.run_dag.call_count)
+
+    @patch("cornflow.endpoints.execution.get_schema_version", Mock(return_value="v1"))
+    @patch("cornflow.endpoints.execution.get_schema")
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_new_executions_airflow_error(self, get_airflow_client, get_schema):
+        get_schema.return_value = lambda: Mock()
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_info.return_value.json.return_value = dict(is_paused=False)
+        af_client.run_dag.side_effect = [
+            Mock(json=Mock(return_value=dict(dag_run_id="run"))),
+            AirflowError(error="dag run not created"),
+        ]
+        # the dag runs are created concurrently, so any of them can fail
+        results = sorted(self.post_batch(self.instance_ids), key=lambda r: r["state"])
+        self.assertEqual(
+            [EXEC_STATE_ERROR, EXEC_STATE_RUNNING],
+            [result["state"] for result in results],
+        )
+        self.assertIn("dag run not created", results[0]["error"])
+        self.assertIsNone(results[1]["error"])
+        self.assertEqual(EXEC_STATE_ERROR, self.model.query.get(results[0]["id"]).state)
+
+    @patch("cornflow.endpoints.execution.get_schema_version", Mock(return_value="v1"))
+    @patch("cornflow.endpoints.execution.get_schema")
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_new_executions_airflow_bad_answer(self, get_airflow_client, get_schema):
+        get_schema.return_value = lambda: Mock()
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_info.return_value.json.return_value = dict(is_paused=False)
+        af_client.run_dag.side_effect = [
+            Mock(json=Mock(return_value=dict(dag_run_id="run"))),
+            Mock(json=Mock(return_value=dict())),
+        ]
+        results = sorted(self.post_batch(self.instance_ids), key=lambda r: r["state"])
+        self.assertEqual(
+            [EXEC_STATE_ERROR, EXEC_STATE_RUNNING],
+            [result["state"] for result in results],
+        )
+        self.assertIn("dag_run_id", results[0]["error"])
+        self.assertEqual(EXEC_STATE_ERROR, self.model.query.get(results[0]["id"]).state)
+        # the dag run created is stored
+        self.assertEqual("run", self.model.query.get(results[1]["id"]).dag_run_id)
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_new_executions_airflow_down(self, get_airflow_client):
+        get_airflow_client.return_value.is_alive.return_value = False
+        results = self.post_batch(self.instance_ids)
+        self.assertEqual(
+            [EXEC_STATE_ERROR_START] * 2, [result["state"] for result in results]
+        )
+        get_airflow_client.return_value.run_dag.assert_not_called()
+
+    def test_new_executions_no_run(self):
+        results = self.post_batch([self.instance_ids[0]] * 20, url=self.url + "?run=0")
+        self.assertEqual(20, len({result["id"] for result in results}))
+        self.assertEqual(
+            [EXEC_STATE_NOT_RUN] * 20, [result["state"] for result in results]
+        )
+
+    def test_new_executions_too_many(self):
+        max_size = self.app.config["EXECUTION_BATCH_MAX_SIZE"]
+        self.app.config["EXECUTION_BATCH_MAX_SIZE"] = 1
+        try:
+            self.post_batch(self.instance_ids, expected_status=400)
+        finally:
+            self.app.config["EXECUTION_BATCH_MAX_SIZE"] = max_size
+        self.assertEqual(0, self.model.query.count())
+
+
+class TestExecutionsLocalExecutor(TestExecutionsDetailEndpointMock):
+    def setUp(self):
+        super().setUp()
+        self.app.config["EXECUTOR_BACKEND"] = EXECUTOR_LOCAL
+        jsonschema = get_pulp_jsonschema()
+        self.app.extensions["schema_registry"].add_local(
+            "solve_model_dag",
+            {INSTANCE_SCHEMA: jsonschema, SOLUTION_SCHEMA: jsonschema},
+        )
+        self.payload["schema"] = "solve_model_dag"
+        # the executions run one after the other, once the test releases them
+        self.executor = LocalExecutor(self.app, max_workers=1)
+        self.executor.register("solve_model_dag", self.solve)
+        self.app.extensions["executors"][EXECUTOR_LOCAL] = self.executor
+        self.release = threading.Event()
+        self.solved = []
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.wait()
+        self.app.config["EXECUTOR_BACKEND"] = "airflow"
+        super().tearDown()
+
+    def solve(self, data, config):
+        self.release.wait(10)
+        self.solved.append(config["timeLimit"])
+        if config["timeLimit"] < 0:
+            raise ValueError("the solver failed")
+        # the pulp models are valid solutions
+        return data, "log of {}".format(config["timeLimit"]), None
+
+    def create_execution(self, time_limit, priority=0, token=None, instance_id=None):
+        payload = dict(
+            self.payload, config=dict(timeLimit=time_limit), priority=priority
+        )
+        if instance_id is not None:
+            payload["instance_id"] = instance_id
+        return self.create_new_row(EXECUTION_URL, self.model, payload, token=token)
+
+    def test_threads_with_gevent(self):
+        self.app.config["LOCAL_EXECUTOR_PROCESSES"] = False
+        # the threads would be greenlets that the solvers block
+        with patch("cornflow.shared.executors.is_gevent_patched", return_value=True):
+            self.assertRaises(ValueError, init_executors, self.app)
+        self.app.config["LOCAL_EXECUTOR_PROCESSES"] = True
+        with patch("cornflow.shared.executors.is_gevent_patched", return_value=True):
+            init_executors(self.app)
+        self.assertIsNotNone(
+            self.app.extensions["executors"][EXECUTOR_LOCAL].process_pool
+        )
+
+    @patch("cornflow.shared.executors.get_airflow_client")
+    def test_run(self, get_airflow_client):
+        idx = self.create_execution(1)
+        self.assertEqual(EXEC_STATE_RUNNING, self.model.query.get(idx).state)
+        self.release.set()
+        self.executor.wait()
+        execution = self.model.query.get(idx)
+        self.assertEqual(EXEC_STATE_CORRECT, execution.state)
+        self.assertEqual(EXECUTOR_LOCAL, execution.executor)
+        self.assertEqual("log of 1", execution.get_log())
+        instance = InstanceModel.query.get(execution.instance_id)
+        self.assertEqual(instance.data, execution.data)
+        get_airflow_client.assert_not_called()
+
+    def test_priority(self):
+        self.create_execution(1)
+        self.create_execution(2)
+        self.create_execution(3, priority=10)
+        self.release.set()
+        self.executor.wait()
+        self.assertEqual([1, 3, 2], self.solved)
+
+    def test_cancel(self):
+        self.create_execution(1)
+        idx = self.create_execution(2)
+        response = self.client.post(
+            EXECUTION_URL + idx + "/", headers=self.get_header_with_auth(self.token)
+        )
+        self.assertEqual(200, response.status_code)
+        self.release.set()
+        self.executor.wait()
+        self.assertEqual([1], self.solved)
+        self.assertEqual(EXEC_STATE_STOPPED, self.model.query.get(idx).state)
+
+    def test_cancel_finished(self):
+        idx = self.create_execution(1)
+        self.release.set()
+        self.executor.wait()
+        # the executions that are not in the queue are not kept
+        self.executor.cancel(self.model.query.get(idx))
+        self.assertEqual(set(), self.executor.cancelled)
+        self.assertEqual(set(), self.executor.in_flight)
+
+    def test_error(self):
+        idx = self.create_execution(-1)
+        self.release.set()
+        self.executor.wait()
+        self.assertEqual(EXEC_STATE_ERROR, self.model.query.get(idx).state)
+
+    def test_unknown_dag(self):
+        self.executor.functions.clear()
+        payload = dict(self.payload)
+        response = self.client.post(
+            EXECUTION_URL,
+            data=json.dumps(payload),
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(EXEC_STATE_ERROR_START, response.json["state"])
+
+
+    def test_lost_execution(self):
+        idx = self.create_execution(1)
+        table = self.model.__table__
+        long_ago = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+        db.engine.execute(
+            table.update().where(table.c.id == idx).values(updated_at=long_ago)
+        )
+        # the worker that runs it marks it as alive
+        self.assertEqual(1, self.executor.mark_alive())
+        self.assertEqual(0, expire_local_executions(timeout=600))
+        # the worker stops: nobody marks it anymore
+        db.engine.execute(
+            table.update().where(table.c.id == idx).values(updated_at=long_ago)
+        )
+        self.assertEqual(1, expire_local_executions(timeout=600))
+        db.session.expire_all()
+        self.assertEqual(EXEC_STATE_ERROR, self.model.query.get(idx).state)
+        self.release.set()
+        self.executor.wait()
+        self.assertEqual(EXEC_STATE_ERROR, self.model.query.get(idx).state)
+
+
+class TestExecutionsScheduler(TestExecutionsLocalExecutor):
+    # the tests of the local backend run with the scheduler too
+    def setUp(self):
+        super().setUp()
+        self.scheduler = self.app.extensions["execution_scheduler"]
+        self.scheduler.enabled = True
+        self.executor.add_listener(self.scheduler.schedule)
+
+    def get_state(self, idx):
+        return self.model.query.get(idx).state
+
+    def test_capacity(self):
+        self.scheduler.capacity = 1
+        first = self.create_execution(1)
+        second = self.create_execution(2)
+        self.assertEqual(EXEC_STATE_RUNNING, self.get_state(first))
+        self.assertEqual(EXEC_STATE_PENDING, self.get_state(second))
+        # the second one is launched when the first one ends
+        self.release.set()
+        self.executor.wait()
+        self.assertEqual([1, 2], self.solved)
+        self.assertEqual(EXEC_STATE_CORRECT, self.get_state(second))
+
+    def test_fair_share(self):
+        self.scheduler.capacity = 1
+        first = self.create_execution(1)
+        pending = [self.create_execution(2), self.create_execution(3, priority=5)]
+        token = self.create_planner()
+        with open(INSTANCE_PATH) as f:
+            instance_id = self.create_new_row(
+                INSTANCE_URL, InstanceModel, json.load(f), token=token
+            )
+        other = self.create_execution(4, token=token, instance_id=instance_id)
+        self.assertEqual(EXEC_STATE_RUNNING, self.get_state(first))
+        self.assertEqual(EXEC_STATE_PENDING, self.get_state(other))
+        # the user with nothing running goes first, even if its execution is the newest
+        self.scheduler.capacity = 2
+        self.assertEqual(1, self.scheduler.schedule())
+        self.assertEqual(EXEC_STATE_RUNNING, self.get_state(other))
+        for idx in pending:
+            self.assertEqual(EXEC_STATE_PENDING, self.get_state(idx))
+        self.release.set()
+        self.executor.wait()
+        # and the executions of each user go by priority
+        self.assertEqual([1, 2, 3, 4], sorted(self.solved))
+        self.assertLess(self.solved.index(3), self.solved.index(2))
+
+    def test_role_quota(self):
+        self.scheduler.user_quota = 1
+        first = self.create_execution(1)
+        second = self.create_execution(2)
+        self.assertEqual(EXEC_STATE_RUNNING, self.get_state(first))
+        self.assertEqual(EXEC_STATE_PENDING, self.get_state(second))
+        self.create_role(self.user, PLANNER_ROLE)
+        self.scheduler.role_quotas = {PLANNER_ROLE: 2}
+        self.assertEqual(1, self.scheduler.schedule())
+        self.assertEqual(EXEC_STATE_RUNNING, self.get_state(second))
+
+    def test_queue(self):
+        self.scheduler.capacity = 1
+        self.create_execution(1)
+        self.create_execution(2)
+        self.create_execution(3)
+        response = self.client.get(
+            EXECUTION_URL + "queue/", headers=self.get_header_with_auth(self.token)
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(1, len(response.json))
+        queue = response.json[0]
+        self.assertEqual(self.user, queue["user_id"])
+        self.assertEqual(2, queue["pending"])
+        self.assertEqual(1, queue["running"])
+        self.assertEqual(5, queue["quota"])
+        self.assertGreaterEqual(queue["max_wait"], queue["mean_wait"])
+        # the admins see the queues of every user
+        response = self.client.get(
+            EXECUTION_URL + "queue/",
+            headers=self.get_header_with_auth(self.create_admin()),
+        )
+        self.assertEqual([self.user], [row["user_id"] for row in response.json])
+        response = self.client.get(
+            EXECUTION_URL + "queue/",
+            headers=self.get_header_with_auth(self.create_planner()),
+        )
+        self.assertEqual([], response.json)
+
+    @patch("cornflow.shared.executors.get_airflow_client")
+    def test_stop_pending(self, get_airflow_client):
+        self.scheduler.capacity = 1
+        self.create_execution(1)
+        idx = self.create_execution(2)
+        response = self.client.post(
+            EXECUTION_URL + idx + "/", headers=self.get_header_with_auth(self.token)
+        )
+        self.assertEqual(200, response.status_code)
+        self.release.set()
+        self.executor.wait()
+        self.assertEqual([1], self.solved)
+        self.assertEqual(EXEC_STATE_STOPPED, self.get_state(idx))
+        get_airflow_client.assert_not_called()
+
+    def test_unknown_dag(self):
+        # the errors found when the execution is launched are kept in its state
+        self.executor.functions.clear()
+        idx = self.create_execution(1)
+        self.assertEqual(EXEC_STATE_ERROR_START, self.get_state(idx))
+
+
+class TestExecutionsStateTransitions(TestExecutionsDetailEndpointMock):
+    def setUp(self):
+        super().setUp()
+        self.idx = self.create_new_row(EXECUTION_URL_NORUN, self.model, self.payload)
+
+    def get_execution(self):
+        return self.model.query.get(self.idx)
+
+    def test_change_state(self):
+        version = self.get_execution().state_version
+        self.assertTrue(self.model.change_state(self.idx, EXEC_STATE_CORRECT))
+        db.session.commit()
+        execution = self.get_execution()
+        self.assertEqual(EXEC_STATE_CORRECT, execution.state)
+        self.assertEqual(version + 1, execution.state_version)
+        # a finished execution cannot be set back to running
+        self.assertFalse(self.model.change_state(self.idx, EXEC_STATE_RUNNING))
+        db.session.commit()
+        self.assertEqual(EXEC_STATE_CORRECT, self.get_execution().state)
+
+    def test_change_state_version(self):
+        version = self.get_execution().state_version
+        self.assertTrue(self.model.change_state(self.idx, EXEC_STATE_RUNNING))
+        db.session.commit()
+        # someone that read the execution before the change cannot overwrite it
+        self.assertFalse(
+            self.model.change_state(self.idx, EXEC_STATE_UNKNOWN, version=version)
+        )
+        self.assertTrue(
+            self.model.change_state(self.idx, EXEC_STATE_UNKNOWN, version=version + 1)
+        )
+        db.session.commit()
+        self.assertEqual(EXEC_STATE_UNKNOWN, self.get_execution().state)
+
+    def test_update_state_not_allowed(self):
+        self.model.change_state(self.idx, EXEC_STATE_STOPPED)
+        db.session.commit()
+        execution = self.get_execution()
+        execution.log_text = "late log"
+        self.assertFalse(execution.update_state(EXEC_STATE_CORRECT))
+        # none of the changes are stored
+        execution = self.get_execution()
+        self.assertEqual(EXEC_STATE_STOPPED, execution.state)
+        self.assertIsNone(execution.log_text)
+
+    def test_dag_results_after_stop(self):
+        self.model.change_state(self.idx, EXEC_STATE_STOPPED)
+        db.session.commit()
+        response = self.client.put(
+            DAG_URL + self.idx + "/",
+            json=dict(state=EXEC_STATE_CORRECT, log_text="late log"),
+            headers=self.get_header_with_auth(self.create_service_user()),
+        )
+        self.assertEqual(409, response.status_code)
+        self.assertEqual(EXEC_STATE_STOPPED, response.json["state"])
+        self.assertEqual("", self.get_execution().get_log())
+
+    def test_same_state_version(self):
+        self.model.change_state(self.idx, EXEC_STATE_RUNNING)
+        db.session.commit()
+        version = self.get_execution().state_version
+        # writing the same state again does not count as a change
+        self.assertTrue(self.model.change_state(self.idx, EXEC_STATE_RUNNING))
+        db.session.commit()
+        self.assertEqual(version, self.get_execution().state_version)
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_status_poll_running(self, get_airflow_client):
+        client = get_airflow_client.return_value
+        client.get_dag_run_status.return_value.json.return_value = dict(
+            state="running"
+        )
+        execution = self.get_execution()
+        execution.update(dict(dag_run_id="run"))
+        self.model.change_state(self.idx, EXEC_STATE_RUNNING)
+        db.session.commit()
+        version = self.get_execution().state_version
+        response = self.client.get(
+            EXECUTION_URL + self.idx + "/status/",
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(EXEC_STATE_RUNNING, response.json["state"])
+        self.assertEqual(version, self.get_execution().state_version)
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_status_poll_launching(self, get_airflow_client):
+        self.model.change_state(self.idx, EXEC_STATE_RUNNING)
+        db.session.commit()
+        # the execution is being launched: it does not have its dag run yet
+        response = self.client.get(
+            EXECUTION_URL + self.idx + "/status/",
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(EXEC_STATE_RUNNING, self.get_execution().state)
+        get_airflow_client.assert_not_called()
+        table = self.model.__table__
+        db.engine.execute(
+            table.update()
+            .where(table.c.id == self.idx)
+            .values(updated_at=datetime.datetime.utcnow() - LAUNCH_GRACE_PERIOD)
+        )
+        db.session.expire_all()
+        response = self.client.get(
+            EXECUTION_URL + self.idx + "/status/",
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(EXEC_STATE_ERROR, self.get_execution().state)
+
+    def test_dag_results_after_error(self):
+        self.model.change_state(self.idx, EXEC_STATE_ERROR)
+        db.session.commit()
+        # airflow retries the execution that was set as failed and sends its results
+        response = self.client.put(
+            DAG_URL + self.idx + "/",
+            json=dict(state=EXEC_STATE_CORRECT, log_text="late log"),
+            headers=self.get_header_with_auth(self.create_service_user()),
+        )
+        self.assertEqual(200, response.status_code)
+        execution = self.get_execution()
+        self.assertEqual(EXEC_STATE_CORRECT, execution.state)
+        self.assertEqual("late log", execution.get_log())
+        # the rest of the changes of state are not allowed from an error
+        self.assertFalse(self.model.change_state(self.idx, EXEC_STATE_RUNNING))
+
+    def test_dag_results_after_poll(self):
+        self.model.change_state(self.idx, EXEC_STATE_RUNNING)
+        db.session.commit()
+        get_one_object_from_user = self.model.get_one_object_from_user
+        table = self.model.__table__
+
+        def load_and_poll(*args, **kwargs):
+            execution = get_one_object_from_user(*args, **kwargs)
+            # another request checks the state of the execution meanwhile
+            db.engine.execute(
+                table.update()
+                .where(table.c.id == self.idx)
+                .values(state_version=table.c.state_version + 1)
+            )
+            return execution
+
+        with patch.object(self.model, "get_one_object_from_user", load_and_poll):
+            response = self.client.put(
+                DAG_URL + self.idx + "/",
+                json=dict(state=EXEC_STATE_CORRECT, log_text="final log"),
+                headers=self.get_header_with_auth(self.create_service_user()),
+            )
+        self.assertEqual(200, response.status_code)
+        execution = self.get_execution()
+        self.assertEqual(EXEC_STATE_CORRECT, execution.state)
+        self.assertEqual("final log", execution.get_log())
+
+    @patch("cornflow.shared.executors.get_airflow_client")
+    def test_launch_after_stop(self, get_airflow_client):
+        client = get_airflow_client.return_value
+        client.run_dag.return_value.json.return_value = dict(dag_run_id="run")
+        execution = self.get_execution()
+        instance = InstanceModel.query.get(execution.instance_id)
+        self.model.change_state(self.idx, EXEC_STATE_STOPPED)
+        db.session.commit()
+        AirflowExecutor().launch(execution, instance)
+        # the dag run is kept even if the state is not changed, so it can be stopped
+        execution = self.get_execution()
+        self.assertEqual(EXEC_STATE_STOPPED, execution.state)
+        self.assertEqual("run", execution.dag_run_id)
+
+    def test_stop_finished(self):
+        self.model.change_state(self.idx, EXEC_STATE_CORRECT)
+        db.session.commit()
+        response = self.client.post(
+            EXECUTION_URL + self.idx + "/",
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(409, response.status_code)
+        self.assertEqual(EXEC_STATE_CORRECT, self.get_execution().state)
+
+
+class TestExecutionsStatusListEndpoint(TestExecutionsDetailEndpointMock):
+    def setUp(self):
+        super().setUp()
+        self.ids = [
+            self.create_new_row(EXECUTION_URL_NORUN, self.model, self.payload)
+            for _ in range(3)
+        ]
+        # the first two are running in airflow
+        for number, idx in enumerate(self.ids[:2]):
+            execution = self.model.query.get(idx)
+            execution.dag_run_id = "run_{}".format(number)
+            execution.update_state(EXEC_STATE_RUNNING)
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_get_status_running(self, get_airflow_client):
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_runs.return_value = dict(
+            run_0=dict(dag_run_id="run_0", state="success"),
+            run_1=dict(dag_run_id="run_1", state="running"),
+        )
+        response = self.client.get(
+            EXECUTION_URL + "status/", headers=self.get_header_with_auth(self.token)
+        )
+        self.assertEqual(200, response.status_code)
+        states = {row["id"]: row["state"] for row in response.json}
+        self.assertEqual(
+            {self.ids[0]: EXEC_STATE_CORRECT, self.ids[1]: EXEC_STATE_RUNNING}, states
+        )
+        # one listing for all the executions of the DAG
+        af_client.get_dag_runs.assert_called_once()
+        self.assertEqual(
+            {"run_0", "run_1"}, set(af_client.get_dag_runs.call_args[0][1])
+        )
+        self.assertEqual(EXEC_STATE_CORRECT, self.model.query.get(self.ids[0]).state)
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_get_status_launching(self, get_airflow_client):
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_runs.return_value = dict()
+        table = self.model.__table__
+        db.engine.execute(
+            table.update()
+            .where(table.c.id.in_(self.ids[1:]))
+            .values(state=EXEC_STATE_RUNNING, dag_run_id=None)
+        )
+        db.engine.execute(
+            table.update()
+            .where(table.c.id == self.ids[1])
+            .values(updated_at=datetime.datetime.utcnow() - LAUNCH_GRACE_PERIOD)
+        )
+        db.session.expire_all()
+        response = self.client.get(
+            EXECUTION_URL + "status/?id={}&id={}".format(self.ids[1], self.ids[2]),
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(200, response.status_code)
+        states = {row["id"]: row["state"] for row in response.json}
+        # only the one launched long ago is set as failed
+        self.assertEqual(
+            {self.ids[1]: EXEC_STATE_ERROR, self.ids[2]: EXEC_STATE_RUNNING}, states
+        )
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_get_status_ids(self, get_airflow_client):
+        af_client = get_airflow_client.return_value
+        af_client.get_dag_runs.return_value = dict()
+        response = self.client.get(
+            EXECUTION_URL + "status/?id={}&id={}".format(self.ids[1], self.ids[2]),
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(200, response.status_code)
+        states = {row["id"]: row["state"] for row in response.json}
+        # the dag run was not found in airflow
+        self.assertEqual(
+            {self.ids[1]: EXEC_STATE_UNKNOWN, self.ids[2]: EXEC_STATE_NOT_RUN}, states
+        )
+
+
+class TestExecutionsReconciler(TestExecutionsDetailEndpointMock):
+    def setUp(self):
+        super().setUp()
+        self.ids = [
+            self.create_new_row(EXECUTION_URL_NORUN, self.model, self.payload)
+            for _ in range(3)
+        ]
+        for number, idx in enumerate(self.ids[:2]):
+            execution = self.model.query.get(idx)
+            execution.dag_run_id = "run_{}".format(number)
+            execution.update_state(EXEC_STATE_RUNNING)
+
+    def test_reconcile(self):
+        af_client = Mock()
+        af_client.get_dag_runs.return_value = dict(
+            run_0=dict(dag_run_id="run_0", state="failed")
+        )
+        self.assertEqual(2, reconcile_executions(af_client))
+        af_client.get_dag_runs.assert_called_once()
+        states = [self.model.query.get(idx).state for idx in self.ids]
+        self.assertEqual(
+            [EXEC_STATE_ERROR, EXEC_STATE_UNKNOWN, EXEC_STATE_NOT_RUN], states
+        )
+        # the unknown execution is asked again, but nothing changes
+        self.assertEqual(0, reconcile_executions(af_client))
+
+    def test_reconcile_launching(self):
+        af_client = Mock()
+        af_client.get_dag_runs.return_value = dict()
+        execution = self.model.query.get(self.ids[2])
+        execution.update_state(EXEC_STATE_RUNNING)
+        # the execution is being launched: it does not have its dag run yet
+        reconcile_executions(af_client)
+        self.assertEqual(EXEC_STATE_RUNNING, self.model.query.get(self.ids[2]).state)
+        table = self.model.__table__
+        db.engine.execute(
+            table.update()
+            .where(table.c.id == self.ids[2])
+            .values(updated_at=datetime.datetime.utcnow() - LAUNCH_GRACE_PERIOD)
+        )
+        db.session.expire_all()
+        reconcile_executions(af_client)
+        self.assertEqual(EXEC_STATE_ERROR, self.model.query.get(self.ids[2]).state)
+
+    def test_update_states_finished(self):
+        self.model.change_state(self.ids[0], EXEC_STATE_STOPPED)
+        db.session.commit()
+        hub = self.app.extensions["execution_states"]
+        with patch.object(hub, "publish") as publish:
+            updated = update_states(
+                {self.ids[0]: EXEC_STATE_ERROR, self.ids[1]: EXEC_STATE_UNKNOWN}
+            )
+        self.assertEqual(1, updated)
+        # the watchers are not told a state the execution does not have
+        publish.assert_called_once_with(self.ids[1], EXEC_STATE_UNKNOWN)
+        self.assertEqual(EXEC_STATE_STOPPED, self.model.query.get(self.ids[0]).state)
+
+    def test_reconcile_airflow_down(self):
+        af_client = Mock()
+        af_client.is_alive.return_value = False
+        self.assertEqual(0, reconcile_executions(af_client))
+        af_client.get_dag_runs.assert_not_called()
+        self.assertEqual(EXEC_STATE_RUNNING, self.model.query.get(self.ids[0]).state)
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_status_from_db(self, get_airflow_client):
+        self.app.config["STATUS_FROM_DB"] = True
+        try:
+            response = self.client.get(
+                EXECUTION_URL + self.ids[0] + "/status/",
+                headers=self.get_header_with_auth(self.token),
+            )
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(EXEC_STATE_RUNNING, response.json["state"])
+            response = self.client.get(
+                EXECUTION_URL + "status/", headers=self.get_header_with_auth(self.token)
+            )
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(2, len(response.json))
+        finally:
+            self.app.config["STATUS_FROM_DB"] = False
+        get_airflow_client.assert_not_called()
+
+
+class TestExecutionsStatusWatch(TestExecutionsDetailEndpointMock):
+    def setUp(self):
+        super().setUp()
+        self.idx = self.create_new_row(EXECUTION_URL_NORUN, self.model, self.payload)
+        self.model.query.get(self.idx).update_state(EXEC_STATE_RUNNING)
+        self.status_url = EXECUTION_URL + self.idx + "/status/"
+
+    def finish_later(self, delay=0.3):
+        def finish():
+            with self.app.app_context():
+                self.model.query.get(self.idx).update_state(EXEC_STATE_CORRECT)
+
+        timer = threading.Timer(delay, finish)
+        timer.start()
+        return timer
+
+    def test_hub_publish(self):
+        hub = ExecutionStateHub(self.app, poll_interval=60)
+        # nobody watches the execution
+        hub.publish(self.idx, EXEC_STATE_CORRECT)
+        self.assertEqual(dict(), hub.states)
+        timer = threading.Timer(0.2, hub.publish, (self.idx, EXEC_STATE_CORRECT))
+        timer.start()
+        state = hub.wait(self.idx, EXEC_STATE_RUNNING, 5)
+        timer.join()
+        self.assertEqual(EXEC_STATE_CORRECT, state)
+        self.assertEqual(0, len(hub.watchers))
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_wait_change(self, get_airflow_client):
+        timer = self.finish_later()
+        response = self.client.get(
+            self.status_url + "?wait=10&state={}".format(EXEC_STATE_RUNNING),
+            headers=self.get_header_with_auth(self.token),
+        )
+        timer.join()
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(EXEC_STATE_CORRECT, response.json["state"])
+        get_airflow_client.assert_not_called()
+
+    def test_wait_timeout(self):
+        response = self.client.get(
+            self.status_url + "?wait=0.2",
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(EXEC_STATE_RUNNING, response.json["state"])
+
+    def test_wait_connection(self):
+        connections = []
+
+        def checkout(*args):
+            connections.append(1)
+
+        def checkin(*args):
+            connections.append(-1)
+
+        def wait(*args):
+            # the watchers do not keep a connection of the pool
+            self.assertLessEqual(sum(connections), 0)
+
+        sa.event.listen(db.engine, "checkout", checkout)
+        sa.event.listen(db.engine, "checkin", checkin)
+        hub = self.app.extensions["execution_states"]
+        try:
+            with patch.object(hub, "wait", side_effect=wait):
+                response = self.client.get(
+                    self.status_url + "?wait=10",
+                    headers=self.get_header_with_auth(self.token),
+                )
+        finally:
+            sa.event.remove(db.engine, "checkout", checkout)
+            sa.event.remove(db.engine, "checkin", checkin)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(EXEC_STATE_RUNNING, response.json["state"])
+
+    def test_wait_known_state_old(self):
+        # the client knows an older state: the answer does not wait
+        response = self.client.get(
+            self.status_url + "?wait=60&state={}".format(EXEC_STATE_NOT_RUN),
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(EXEC_STATE_RUNNING, response.json["state"])
+
+    @patch("cornflow.endpoints.execution.get_airflow_client")
+    def test_stream(self, get_airflow_client):
+        timer = self.finish_later()
+        response = self.client.get(
+            self.status_url,
+            headers={
+                **self.get_header_with_auth(self.token),
+                "Accept": SSE_MIMETYPE,
+            },
+        )
+        timer.join()
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(SSE_MIMETYPE, response.mimetype)
+        events = [
+            json.loads(line[len("data: ") :])
+            for line in response.get_data(as_text=True).splitlines()
+            if line.startswith("data: ")
+        ]
+        self.assertEqual(
+            [EXEC_STATE_RUNNING, EXEC_STATE_CORRECT],
+            [event["state"] for event in events],
+        )
+        get_airflow_client.assert_not_called()
+
+
 class TestExecutionsDataEndpoint(TestExecutionsDetailEndpointMock):
     def setUp(self):
         super().setUp()
@@ -186,6 +1186,80 @@ class TestExecutionsLogEndpoint(TestExecutionsDetailEndpointMock):
         token = self.create_service_user()
         self.get_one_row(EXECUTION_URL + idx + "/log/", payload, token=token)
 
+    def create_log(self, text):
+        idx = self.create_new_row(EXECUTION_URL_NORUN, self.model, self.payload)
+        execution = self.model.query.get(idx)
+        execution.set_log(text)
+        execution.update(dict())
+        return idx
+
+    def get_log(self, idx, query="", headers=None):
+        response = self.client.get(
+            EXECUTION_URL + idx + "/log/" + query,
+            headers=dict(self.get_header_with_auth(self.token), **(headers or dict())),
+        )
+        self.assertEqual(200, response.status_code)
+        return response
+
+    @patch.object(ExecutionLogChunkModel, "CHUNKS_PER_QUERY", 2)
+    @patch.object(ExecutionLogChunkModel, "CHUNK_SIZE", 4)
+    def test_get_log_range(self):
+        text = "".join("line {}\n".format(line) for line in range(10))
+        idx = self.create_log(text)
+        self.assertEqual(18, ExecutionLogChunkModel.query.count())
+        # without a range only the size is sent
+        response = self.get_log(idx)
+        self.assertEqual(len(text), response.json["log_size"])
+        self.assertNotIn("log_text", response.json)
+        response = self.get_log(idx, "?offset=9&length=10")
+        self.assertEqual(9, response.json["log_offset"])
+        self.assertEqual(text[9:19], response.json["log_text"])
+        response = self.get_log(idx, "?offset=60")
+        self.assertEqual(text[60:], response.json["log_text"])
+        response = self.get_log(idx, "?offset=100")
+        self.assertEqual("", response.json["log_text"])
+
+    @patch.object(ExecutionLogChunkModel, "CHUNKS_PER_QUERY", 2)
+    @patch.object(ExecutionLogChunkModel, "CHUNK_SIZE", 4)
+    def test_get_log_tail(self):
+        text = "".join("line {}\n".format(line) for line in range(10))
+        idx = self.create_log(text)
+        response = self.get_log(idx, "?tail=3")
+        self.assertEqual("line 7\nline 8\nline 9\n", response.json["log_text"])
+        self.assertEqual(text.index("line 7"), response.json["log_offset"])
+        response = self.get_log(idx, "?tail=20")
+        self.assertEqual(text, response.json["log_text"])
+        self.assertEqual(0, response.json["log_offset"])
+        # the last line does not need to be finished
+        self.model.query.get(idx).set_log(text + "line 10")
+        db.session.commit()
+        response = self.get_log(idx, "?tail=2")
+        self.assertEqual("line 9\nline 10", response.json["log_text"])
+
+    @patch.object(ExecutionLogChunkModel, "CHUNKS_PER_QUERY", 2)
+    @patch.object(ExecutionLogChunkModel, "CHUNK_SIZE", 4)
+    def test_stream_log(self):
+        text = "".join("line {}\n".format(line) for line in range(10))
+        idx = self.create_log(text)
+        response = self.get_log(idx, headers=dict(Accept=LOG_MIMETYPE))
+        self.assertEqual(LOG_MIMETYPE, response.mimetype)
+        self.assertEqual(text, response.get_data(as_text=True))
+        response = self.get_log(idx, "?offset=33", headers=dict(Accept=LOG_MIMETYPE))
+        self.assertEqual(text[33:], response.get_data(as_text=True))
+
+    def test_get_log_not_chunked(self):
+        # the executions that ended before the logs were chunked
+        idx = self.create_new_row(EXECUTION_URL_NORUN, self.model, self.payload)
+        execution = self.model.query.get(idx)
+        execution.update(dict(log_text="first\nsecond\nthird"))
+        response = self.get_log(idx, "?tail=2")
+        self.assertEqual("second\nthird", response.json["log_text"])
+        self.assertEqual(6, response.json["log_offset"])
+        response = self.get_log(idx, "?offset=6&length=6")
+        self.assertEqual("second", response.json["log_text"])
+        response = self.get_log(idx, headers=dict(Accept=LOG_MIMETYPE))
+        self.assertEqual("first\nsecond\nthird", response.get_data(as_text=True))
+
 
 class TestExecutionsModel(TestExecutionsDetailEndpointMock):
     def test_repr_method(self):
@@ -3,13 +3,28 @@ Unit test for the instances endpoints
 """
 
 # Import from libraries
+import gzip
 import hashlib
 import json
 import zlib
+from unittest.mock import patch
+
+import brotli
+
+from cornflow_client import get_pulp_jsonschema
+from cornflow_client.constants import INSTANCE_SCHEMA
+from sqlalchemy import inspect
 
 # Import from internal modules
-from cornflow.models import InstanceModel
-from cornflow.shared.utils import hash_json_256
+from cornflow.models import DataBlobModel, InstanceModel, UserModel
+from cornflow.schemas.instance import (
+    InstanceDataEndpointResponse,
+    InstanceEndpointResponse,
+)
+from cornflow.shared.const import INSTANCE_STATE_INVALID, INSTANCE_STATE_VALID
+from cornflow.shared.schema_registry import get_schema, PULP_SCHEMA
+from cornflow.shared.utils import db, hash_json_256
+from cornflow.shared.validators import JsonSchemaValidator, VALIDATION_JSONSCHEMA
 from cornflow.tests.const import INSTANCE_URL, INSTANCES_LIST, INSTANCE_PATH
 from cornflow.tests.custom_test_case import CustomTestCase, BaseTestCases
 
@@ -57,6 +72,66 @@ class TestInstancesListEndpoint(BaseTestCases.ListFilters):
         self.assertEqual(400, response.status_code)
         self.assertTrue("error" in response.json)
 
+    def test_new_instance_gzip(self):
+        headers = self.get_header_with_auth(self.token)
+        headers["Content-Encoding"] = "gzip"
+        response = self.client.post(
+            self.url,
+            data=gzip.compress(json.dumps(self.payload).encode("utf-8")),
+            headers=headers,
+        )
+        self.assertEqual(201, response.status_code)
+        instance = self.model.query.get(response.json["id"])
+        self.assertEqual(self.payload["data"], instance.data)
+
+    def test_new_instance_too_large(self):
+        headers = self.get_header_with_auth(self.token)
+        body = json.dumps(self.payload).encode("utf-8")
+        self.app.config["UPLOAD_MAX_SIZE"] = len(body) - 1
+        response = self.client.post(self.url, data=body, headers=headers)
+        self.assertEqual(413, response.status_code)
+        # the limit of the decompressed body applies to the gzipped ones
+        self.app.config["UPLOAD_MAX_SIZE"] = len(body)
+        self.app.config["UPLOAD_MAX_INFLATED_SIZE"] = len(body) - 1
+        headers["Content-Encoding"] = "gzip"
+        response = self.client.post(self.url, data=gzip.compress(body), headers=headers)
+        self.assertEqual(413, response.status_code)
+        self.assertEqual(0, self.model.query.count())
+
+    def test_new_instance_jsonschema_engine(self):
+        registry = self.app.extensions["schema_registry"]
+        registry.engines[PULP_SCHEMA] = VALIDATION_JSONSCHEMA
+        registry.add_local(PULP_SCHEMA, {INSTANCE_SCHEMA: get_pulp_jsonschema()})
+        self.assertTrue(issubclass(get_schema(PULP_SCHEMA), JsonSchemaValidator))
+        self.create_new_row(self.url, self.model, self.payload)
+        del self.payload["data"]["parameters"]
+        self.create_new_row(
+            self.url, self.model, self.payload, expected_status=400, check_payload=False
+        )
+
+    def test_new_instance_async(self):
+        idx = self.create_new_row(self.url + "?validate=async", self.model, self.payload)
+        self.app.extensions["worker_pool"].wait(timeout=10)
+        instance = self.model.query.get(idx)
+        self.assertEqual(INSTANCE_STATE_VALID, instance.validation_state)
+        # the invalid instances are stored too, with the errors found
+        del self.payload["data"]["parameters"]
+        idx = self.create_new_row(self.url + "?validate=async", self.model, self.payload)
+        self.app.extensions["worker_pool"].wait(timeout=10)
+        db.session.expire_all()
+        instance = self.model.query.get(idx)
+        self.assertEqual(INSTANCE_STATE_INVALID, instance.validation_state)
+        self.assertIn("parameters", instance.validation_message)
+
+    def test_new_instance_validation_mode(self):
+        response = self.client.post(
+            self.url + "?validate=later",
+            data=json.dumps(self.payload),
+            headers=self.get_header_with_auth(self.token),
+        )
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(0, self.model.query.count())
+
     def test_get_instances(self):
         self.get_rows(self.url, self.payloads)
 
@@ -123,6 +198,8 @@ class TestInstancesDetailEndpointBase(CustomTestCase):
             "executions",
             "data_hash",
             "schema",
+            "validation_state",
+            "validation_message",
         }
         # we only check name and description because this endpoint does not return data
         self.items_to_check = ["name", "description", "schema"]
@@ -138,7 +215,7 @@ class TestInstancesDataEndpoint(TestInstancesDetailEndpointBase):
     def setUp(self):
         super().setUp()
         self.response_items.add("data")
-        self.response_items.remove("executions")
+        self.response_items -= {"executions", "validation_state", "validation_message"}
         self.items_to_check += ["data"]
 
     def test_get_one_instance(self):
@@ -162,6 +239,107 @@ class TestInstancesDataEndpoint(TestInstancesDetailEndpointBase):
         self.assertEqual(self.payload["data"], response["data"])
         # self.assertEqual(resp.headers[], 'br')
 
+    def test_instance_compression_preference(self):
+        idx = self.create_new_row(self.url, self.model, self.payload)
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": "Bearer " + self.token,
+            "Accept-Encoding": "br;q=0.5, gzip",
+        }
+        url = INSTANCE_URL + idx + "/data/"
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
+        headers["Accept-Encoding"] = "gzip, br"
+        response = self.client.get(url, headers=headers)
+        self.assertEqual(response.headers["Content-Encoding"], "br")
+        raw = brotli.decompress(response.data).decode("utf-8")
+        self.assertEqual(self.payload["data"], json.loads(raw)["data"])
+        headers["Accept-Encoding"] = "gzip;q=0, identity"
+        response = self.client.get(url, headers=headers)
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertEqual(response.headers["Vary"], "Accept-Encoding")
+        self.assertEqual(self.payload["data"], response.json["data"])
+
+    def test_instance_compression_cached(self):
+        idx = self.create_new_row(self.url, self.model, self.payload)
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": "Bearer " + self.token,
+            "Accept-Encoding": "gzip",
+        }
+        url = INSTANCE_URL + idx + "/data/"
+        first = self.client.get(url, headers=headers)
+        # the payload is cached once it has been sent
+        first_data = first.data
+        with patch.object(InstanceDataEndpointResponse, "dump") as dump:
+            second = self.client.get(url, headers=headers)
+            dump.assert_not_called()
+        self.assertEqual(second.headers["Content-Encoding"], "gzip")
+        self.assertEqual(first_data, second.data)
+        # a new version of the instance gets serialized again
+        self.client.put(
+            INSTANCE_URL + idx + "/", json={"name": "new_name"}, headers=headers
+        )
+        response = self.client.get(url, headers=headers)
+        raw = zlib.decompress(response.data, 16 + zlib.MAX_WBITS).decode("utf-8")
+        self.assertEqual("new_name", json.loads(raw)["name"])
+
+    def test_instance_data_streamed(self):
+        idx = self.create_new_row(self.url, self.model, self.payload)
+        with patch.object(DataBlobModel, "get_data") as get_data:
+            response = self.client.get(
+                INSTANCE_URL + idx + "/data/",
+                headers=self.get_header_with_auth(self.token),
+            )
+            get_data.assert_not_called()
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertEqual(self.payload["data"], response.json["data"])
+        self.assertEqual(self.payload["name"], response.json["name"])
+
+    def test_instance_data_streamed_compressed(self):
+        idx = self.create_new_row(self.url, self.model, self.payload)
+        headers = {**self.get_header_with_auth(self.token), "Accept-Encoding": "gzip"}
+        with patch.object(DataBlobModel, "get_data") as get_data:
+            response = self.client.get(INSTANCE_URL + idx + "/data/", headers=headers)
+            get_data.assert_not_called()
+            raw = gzip.decompress(response.data).decode("utf-8")
+        self.assertNotIn("Content-Length", response.headers)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(self.payload["data"], json.loads(raw)["data"])
+
+    def test_instance_etag(self):
+        idx = self.create_new_row(self.url, self.model, self.payload)
+        url = INSTANCE_URL + idx + "/data/"
+        headers = self.get_header_with_auth(self.token)
+        response = self.client.get(url, headers=headers)
+        etag = response.headers["ETag"]
+        with patch.object(DataBlobModel, "get_data") as get_data:
+            response = self.client.get(url, headers={**headers, "If-None-Match": etag})
+            get_data.assert_not_called()
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.data)
+        # the compressed response has its own ETag, based on the same version
+        headers_gzip = {**headers, "Accept-Encoding": "gzip"}
+        response = self.client.get(url, headers=headers_gzip)
+        etag_gzip = response.headers["ETag"]
+        self.assertEqual(etag[:-1] + ':gzip"', etag_gzip)
+        # the 304 keeps the ETag of the encoding and the caching headers of the full response
+        response = self.client.get(
+            url, headers={**headers_gzip, "If-None-Match": etag_gzip}
+        )
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag_gzip, response.headers["ETag"])
+        self.assertEqual("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual("no-cache", response.headers["Cache-Control"])
+        # a new version of the instance gets a new ETag
+        self.client.put(
+            INSTANCE_URL + idx + "/", json={"name": "new_name"}, headers=headers
+        )
+        response = self.client.get(url, headers={**headers, "If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers["ETag"])
+
     def test_get_one_instance_superadmin(self):
         idx = self.create_new_row(self.url, self.model, self.payload)
         token = self.create_service_user()
@@ -184,3 +362,19 @@ class TestInstanceModelMethods(CustomTestCase):
     def test_str_method(self):
         idx = self.create_new_row(self.url, self.model, self.payload)
         self.str_method(idx, "<id {}>".format(idx))
+
+    def test_response_schema_defers_data(self):
+        idx = self.create_new_row(self.url, self.model, self.payload)
+        db.session.expunge_all()
+        user = UserModel.get_one_user(self.user)
+        instances = self.model.get_all_objects(
+            user, response_schema=InstanceEndpointResponse
+        )
+        self.assertEqual(len(instances), 1)
+        state = inspect(instances[0])
+        self.assertIn("updated_at", state.unloaded)
+        self.assertNotIn("name", state.unloaded)
+        self.assertNotIn("data_hash", state.unloaded)
+        self.assertEqual(instances[0].id, idx)
+        # the data is fetched from its blob when it is accessed
+        self.assertEqual(instances[0].data, self.payload["data"])
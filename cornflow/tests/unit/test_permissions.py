@@ -4,7 +4,10 @@ Unit test for the permissions table
 
 # Import from internal modules
 from cornflow.endpoints import PermissionsViewRoleEndpoint
-from cornflow.shared.const import ROLES_MAP
+from cornflow.models import CacheVersionModel, PermissionViewRoleModel
+from cornflow.shared.const import ADMIN_ROLE, ROLES_MAP
+from cornflow.shared.permissions import PERMISSIONS_CACHE, bump_permissions_version
+from cornflow.shared.utils import db
 from cornflow.tests.const import PERMISSION_URL
 from cornflow.tests.custom_test_case import CustomTestCase
 
@@ -46,3 +49,42 @@ class TestPermissionsViewRoleEndpoint(CustomTestCase):
                 )
 
                 self.assertEqual(403, response.status_code)
+
+
+class TestPermissionMatrix(CustomTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = self.create_user_with_role(ADMIN_ROLE)
+
+    def get_permissions(self):
+        return self.client.get(
+            PERMISSION_URL,
+            follow_redirects=True,
+            headers=self.get_header_with_auth(self.token),
+        )
+
+    def test_permissions_are_cached(self):
+        self.assertEqual(200, self.get_permissions().status_code)
+        # a change not notified does not reach the matrix
+        PermissionViewRoleModel.query.filter_by(role_id=ADMIN_ROLE).delete()
+        db.session.commit()
+        self.assertEqual(200, self.get_permissions().status_code)
+
+    def test_bump_version_rebuilds_matrix(self):
+        self.assertEqual(200, self.get_permissions().status_code)
+        PermissionViewRoleModel.query.filter_by(role_id=ADMIN_ROLE).delete()
+        db.session.commit()
+        bump_permissions_version()
+        self.assertEqual(403, self.get_permissions().status_code)
+
+    def test_bump_version_created_by_other_worker(self):
+        table = CacheVersionModel.__table__
+        db.engine.execute(table.delete().where(table.c.name == PERMISSIONS_CACHE))
+        self.assertEqual(0, CacheVersionModel.get_version(PERMISSIONS_CACHE))
+        # another worker creates the row of the version after it was read
+        db.engine.execute(table.insert().values(name=PERMISSIONS_CACHE, version=1))
+        bump_permissions_version()
+        self.assertEqual(2, CacheVersionModel.get_version(PERMISSIONS_CACHE))
+        db.engine.execute(table.delete().where(table.c.name == PERMISSIONS_CACHE))
+        bump_permissions_version()
+        self.assertEqual(1, CacheVersionModel.get_version(PERMISSIONS_CACHE))
@@ -9,14 +9,16 @@ from cornflow.endpoints import (
     UserRoleListEndpoint,
     UserRoleDetailEndpoint,
 )
-from cornflow.models import RoleModel, UserRoleModel
+from cornflow.models import CacheVersionModel, RoleModel, UserRoleModel
+from cornflow.shared.authentication import IDENTITY_CACHE, invalidate_identity
 from cornflow.shared.const import (
     ADMIN_ROLE,
     PLANNER_ROLE,
     ROLES_MAP,
     VIEWER_ROLE,
 )
-from cornflow.tests.const import ROLES_URL, USER_ROLE_URL
+from cornflow.shared.utils import db
+from cornflow.tests.const import INSTANCE_URL, ROLES_URL, USER_ROLE_URL
 from cornflow.tests.custom_test_case import CustomTestCase
 
 
@@ -385,3 +387,42 @@ class TestUserRolesDetailEndpoint(CustomTestCase):
         UserRoleModel.del_one_user(user_id)
         all_roles = UserRoleModel.get_one_user(user_id)
         self.assertEqual(all_roles, [])
+
+
+class TestIdentityCache(CustomTestCase):
+    def get_url(self, url, token):
+        return self.client.get(
+            url, follow_redirects=True, headers=self.get_header_with_auth(token)
+        )
+
+    def test_identity_is_cached(self):
+        self.assertEqual(200, self.get_url(INSTANCE_URL, self.token).status_code)
+        # a change not notified does not reach the cached identity
+        UserRoleModel.query.filter_by(user_id=self.user).delete()
+        db.session.commit()
+        self.assertEqual(200, self.get_url(INSTANCE_URL, self.token).status_code)
+        invalidate_identity(self.user)
+        self.assertEqual(403, self.get_url(INSTANCE_URL, self.token).status_code)
+
+    def test_identity_changed_by_other_worker(self):
+        self.assertEqual(200, self.get_url(INSTANCE_URL, self.token).status_code)
+        UserRoleModel.query.filter_by(user_id=self.user).delete()
+        db.session.commit()
+        # the version is bumped by another worker: this one has nothing to clear
+        name = IDENTITY_CACHE.format(self.user)
+        table = CacheVersionModel.__table__
+        db.engine.execute(table.insert().values(name=name, version=1))
+        self.assertEqual(403, self.get_url(INSTANCE_URL, self.token).status_code)
+
+    def test_role_assignment_refreshes_identity(self):
+        admin_token = self.create_admin()
+        self.assertEqual(403, self.get_url(ROLES_URL, self.token).status_code)
+        response = self.create_role_endpoint(self.user, ADMIN_ROLE, admin_token)
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(200, self.get_url(ROLES_URL, self.token).status_code)
+        response = self.client.delete(
+            USER_ROLE_URL + "{}/{}/".format(self.user, ADMIN_ROLE),
+            follow_redirects=True,
+            headers=self.get_header_with_auth(admin_token),
+        )
+        self.assertEqual(200, response.status_code)
@@ -2,12 +2,22 @@ import unittest
 import json
 
 from cornflow.tests.custom_test_case import CustomTestCase
-from cornflow.tests.const import SCHEMA_URL
+from cornflow.tests.const import JSONSCHEMA_SUITE_PATH, SCHEMA_URL
 from unittest.mock import patch, Mock
 from cornflow_client.schema.dict_functions import gen_schema, ParameterSchema, sort_dict
 from cornflow_client import get_pulp_jsonschema
+from jsonschema import Draft7Validator
+from jsonschema.validators import validator_for
 from marshmallow import ValidationError, Schema, fields
 
+from cornflow.commands import BenchmarkValidation
+from cornflow.shared.validators import (
+    build_schema_class,
+    compile_jsonschema,
+    COMPILED_DRAFTS,
+    VALIDATION_JSONSCHEMA,
+)
+
 
 class SchemaGenerator(unittest.TestCase):
     data1 = [
@@ -154,11 +164,9 @@ class TestSchemaEndpoint(CustomTestCase):
         self.schema = get_pulp_jsonschema()
         self.url = SCHEMA_URL
 
-    # TODO: for some reason this does not work and we have to call the schemas.Airflow
-    #  @patch("cornflow_client.airflow.api.Airflow")
-    @patch("cornflow.endpoints.schemas.Airflow")
-    def test_get_schema(self, Airflow):
-        instance = Airflow.return_value
+    @patch("cornflow.endpoints.schemas.get_airflow_client")
+    def test_get_schema(self, get_airflow_client):
+        instance = get_airflow_client.return_value
         instance.is_alive.return_value = True
         instance.get_dag_info.return_value = {}
         instance.get_schemas_for_dag_name.return_value = dict(
@@ -176,5 +184,117 @@ class TestSchemaEndpoint(CustomTestCase):
         instance.get_schemas_for_dag_name.assert_called_once()
 
 
+class TestSchemaRegistry(CustomTestCase):
+    def setUp(self):
+        super().setUp()
+        self.schema = get_pulp_jsonschema()
+        self.registry = self.app.extensions["schema_registry"]
+
+    def test_schema_cached(self):
+        instance = self.registry.airflow_client = Mock()
+        instance.is_alive.return_value = True
+        instance.get_schemas_for_dag_name.return_value = dict(
+            instance=self.schema, solution=self.schema, name="solve_model_dag"
+        )
+        schema = self.registry.get("solve_model_dag", "instance")
+        self.assertIs(schema, self.registry.get("solve_model_dag", "instance"))
+        instance.get_schemas_for_dag_name.assert_called_once()
+        # the classes are only built again when the jsonschema changes
+        self.registry.update("solve_model_dag", dict(instance=self.schema))
+        self.assertIs(schema, self.registry.get("solve_model_dag", "instance"))
+        new_schema = dict(self.schema, required=[])
+        self.registry.update("solve_model_dag", dict(instance=new_schema))
+        self.assertIsNot(schema, self.registry.get("solve_model_dag", "instance"))
+        instance.get_schemas_for_dag_name.assert_called_once()
+
+    def test_schema_refreshed_in_background(self):
+        instance = self.registry.airflow_client = Mock()
+        instance.is_alive.return_value = True
+        instance.get_schemas_for_dag_name.return_value = dict(instance=self.schema)
+        schema = self.registry.get("solve_model_dag")
+        self.registry.ttl = 0
+        with patch.object(self.registry, "refresh_in_background") as refresh:
+            self.assertIs(schema, self.registry.get("solve_model_dag"))
+            refresh.assert_called_once_with("solve_model_dag")
+
+
+class TestJsonSchemaValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = build_schema_class(
+            get_pulp_jsonschema(), VALIDATION_JSONSCHEMA
+        )
+        self.data = BenchmarkValidation.build_model(10)
+
+    def test_compiled(self):
+        self.assertIsNotNone(compile_jsonschema(get_pulp_jsonschema()))
+        self.assertEqual(self.data, self.validator().load(self.data))
+
+    def test_errors(self):
+        self.data["constraints"][5]["coefficients"][1]["value"] = "a"
+        with self.assertRaises(ValidationError) as context:
+            self.validator().load(self.data)
+        self.assertEqual(
+            {"constraints/5/coefficients/1/value": ["'a' is not of type 'number'"]},
+            context.exception.messages,
+        )
+        del self.data["parameters"]
+        self.assertRaises(ValidationError, self.validator().load, self.data)
+
+    def test_equality(self):
+        # the compiled checks accept the same values as the jsonschema package
+        cases = [
+            (dict(enum=[1]), [1, 1.0, True, "1", [1]]),
+            (dict(enum=[True, "a"]), [True, 1, "a", False]),
+            (dict(const=False), [False, 0, 0.0, None]),
+            (dict(const=1.5), [1.5, 1, "1.5"]),
+            (dict(enum=[[1, True]]), [[1.0, True], [1, 1], [True, True], [1]]),
+            (
+                dict(const=dict(a=[1])),
+                [dict(a=[1.0]), dict(a=[True]), dict(a=[1], b=1)],
+            ),
+        ]
+        for jsonschema, values in cases:
+            check = compile_jsonschema(jsonschema)
+            expected = Draft7Validator(jsonschema)
+            for value in values:
+                self.assertEqual(
+                    expected.is_valid(value), check(value) is None, (jsonschema, value)
+                )
+
+    def test_suite(self):
+        # every keyword compiled behaves as the specification and the jsonschema package say
+        with open(JSONSCHEMA_SUITE_PATH) as f:
+            suite = json.load(f)
+        for draft in COMPILED_DRAFTS:
+            schema_uri = "http://json-schema.org/{}/schema#".format(draft)
+            for case in suite:
+                if draft not in case.get("drafts", COMPILED_DRAFTS):
+                    continue
+                schema = case["schema"]
+                if isinstance(schema, dict):
+                    schema = {"$schema": schema_uri, **schema}
+                check = compile_jsonschema(schema)
+                self.assertIsNotNone(check, (draft, case["description"]))
+                expected = validator_for(schema)(schema)
+                for test in case["tests"]:
+                    message = (draft, case["description"], test["description"])
+                    self.assertEqual(test["valid"], check(test["data"]) is None, message)
+                    self.assertEqual(test["valid"], expected.is_valid(test["data"]), message)
+
+    def test_unknown_type(self):
+        # the jsonschema package decides what to do with the types that are not compiled
+        jsonschema = dict(type="integer", items=dict(type="any"))
+        self.assertIsNone(compile_jsonschema(jsonschema))
+
+    def test_not_compiled(self):
+        # uniqueItems is checked by the jsonschema package
+        jsonschema = dict(type="array", items=dict(type="integer"), uniqueItems=True)
+        self.assertIsNone(compile_jsonschema(jsonschema))
+        validator = build_schema_class(jsonschema, VALIDATION_JSONSCHEMA)
+        self.assertEqual([1, 2], validator().load([1, 2]))
+        self.assertRaises(ValidationError, validator().load, [1, 1])
+        self.assertRaises(ValidationError, validator().load, [1, "a"])
+
+
 if __name__ == "__main__":
     unittest.main()
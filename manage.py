@@ -27,6 +27,10 @@ manager.add_command("update_views", UpdateViews)
 
 # Other commands
 manager.add_command("clean_historic_data", CleanHistoricData)
+manager.add_command("clean_data_blobs", CleanDataBlobs)
+manager.add_command("compress_stored_data", CompressStoredData)
+manager.add_command("reconcile_executions", ReconcileExecutions)
+manager.add_command("benchmark_validation", BenchmarkValidation)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+"""
+Changed the data blobs and the execution logs to binary columns so they can be stored compressed
+
+Revision ID: 5d2c7a9e1f38
+Revises: 3b8e6f2d9c1a
+Create Date: 2026-10-18 12:02:44.170352
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from cornflow.shared.storage import (
+    CompressedJSON,
+    CompressedText,
+    STORAGE_NONE,
+    recompress_rows,
+)
+
+# revision identifiers, used by Alembic.
+revision = "5d2c7a9e1f38"
+down_revision = "3b8e6f2d9c1a"
+branch_labels = None
+depends_on = None
+
+# (table, primary key, column, old type, type of the values, conversion to text in postgres)
+COLUMNS = [
+    (
+        "data_blobs",
+        "hash",
+        "data",
+        postgresql.JSON(astext_type=sa.Text()),
+        CompressedJSON(),
+        "data::text",
+    ),
+    ("executions", "id", "log_text", sa.TEXT(), CompressedText(), "log_text"),
+    (
+        "executions",
+        "id",
+        "log_json",
+        postgresql.JSON(astext_type=sa.Text()),
+        CompressedJSON(),
+        "log_json::text",
+    ),
+]
+
+
+def upgrade():
+    # The existing values are kept as they are (uncompressed utf-8).
+    # They can be compressed afterwards with the compress_stored_data command.
+    conn = op.get_bind()
+    for table, _, column, old_type, _, as_text in COLUMNS:
+        if conn.dialect.name == "postgresql":
+            op.alter_column(
+                table,
+                column,
+                existing_type=old_type,
+                type_=sa.LargeBinary(),
+                postgresql_using="convert_to({}, 'UTF8')".format(as_text),
+            )
+        else:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column(
+                    column, existing_type=old_type, type_=sa.LargeBinary()
+                )
+
+
+def downgrade():
+    conn = op.get_bind()
+    for table_name, key, column, old_type, column_type, _ in COLUMNS:
+        # first we need all the values uncompressed
+        table = sa.table(table_name, sa.column(key), sa.column(column, sa.LargeBinary))
+        for _ in recompress_rows(
+            conn, table, key, column, column_type, STORAGE_NONE, min_size=0
+        ):
+            pass
+        if conn.dialect.name == "postgresql":
+            cast = "::json" if isinstance(old_type, postgresql.JSON) else ""
+            op.alter_column(
+                table_name,
+                column,
+                existing_type=sa.LargeBinary(),
+                type_=old_type,
+                postgresql_using="convert_from({}, 'UTF8'){}".format(column, cast),
+            )
+        else:
+            # sqlite would cast the values to the type of the column (numeric for json),
+            # so the text is copied to a new column instead
+            tmp_column = column + "_tmp"
+            op.add_column(table_name, sa.Column(tmp_column, old_type, nullable=True))
+            conn.execute(
+                "UPDATE {} SET {} = CAST({} AS TEXT)".format(
+                    table_name, tmp_column, column
+                )
+            )
+            with op.batch_alter_table(table_name) as batch_op:
+                batch_op.drop_column(column)
+            with op.batch_alter_table(table_name) as batch_op:
+                batch_op.alter_column(
+                    tmp_column, existing_type=old_type, new_column_name=column
+                )